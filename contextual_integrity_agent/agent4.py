@@ -1,14 +1,40 @@
-from typing import TypedDict, List, Dict, Any
+from typing import TypedDict, List, Dict, Any, Callable
+import time
 import logging
-from tools4 import TriggerAnalyzer, VulnerabilityAssessor, TrustCalculator
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tools4 import TriggerAnalyzer, VulnerabilityAssessor, TrustCalculator, ContextExtractor
+from cache import get_integrity_cache
+from telemetry import begin_turn, record_span, record_usage, span, total_tokens, turn_spans
+from metrics import export_turn
+from rejection_bank import get_rejection_bank, rejection_system_prompt
+from pipeline import STAGE_GRAPH, FUSED_STAGE_GRAPH, arun_stages, run_stages_concurrent, run_stages_sequential
 import config
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from pathlib import Path
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def shared_executor(name: str) -> ThreadPoolExecutor:
+    """
+    Process-wide pool `name` ("stage" or "integrity"), shared by every agent.
+    Agents come and go with the client registry; the pool threads do not.
+    """
+    with _executors_lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(max_workers=config.STAGE_MAX_WORKERS, thread_name_prefix=name)
+        return _executors[name]
+
+
+REJECTION_FALLBACK = "I'm sorry, I cannot provide that information at this time. Please verify your identity through our official channels."
+
+
 class AgentState(TypedDict):
     user_input: str
     agent_response: str
@@ -23,42 +49,123 @@ class AgentState(TypedDict):
     
     requested_info: List[str]
     info_to_reveal: List[str]
+
+    detected_triggers: List[Dict[str, Any]]
+    pressure_score: float
     
     conversation_history: List[Dict]
     analysis_log: List[str]
+    stage_timings: Dict[str, float]
+    token_usage: Dict[str, Dict[str, int]]
+    spans: List[Dict[str, Any]]
 
 
 class VoiceFishingAgent:
-    def __init__(self, openai_client,data_folder="data"):
+    def __init__(self, openai_client,data_folder="data", concurrent=config.CONCURRENT_STAGES, async_client=None,
+                 fused_extraction=config.FUSED_EXTRACTION, rejection_mode=config.REJECTION_MODE):
 
         base_path = Path(__file__).parent
         data_path = base_path / data_folder
 
         
         self.openai_client = openai_client
-        self.trigger_analyzer = TriggerAnalyzer(openai_client,data_folder=data_path)
-        self.vulnerability_assessor = VulnerabilityAssessor(openai_client)
-        self.trust_calculator = TrustCalculator(openai_client,data_folder=data_path)
+        # Async client backing aprocess; derived from the sync client's credentials if not given
+        if async_client is None and isinstance(openai_client, OpenAI):
+            async_client = AsyncOpenAI(api_key=openai_client.api_key, base_url=openai_client.base_url)
+        self.async_client = async_client
+        self.concurrent = concurrent
+        # Separate pools so a stage waiting on its integrity calls can never starve them
+        self.stage_executor = shared_executor("stage") if concurrent else None
+        integrity_executor = shared_executor("integrity") if concurrent else None
+
+        self.trigger_analyzer = TriggerAnalyzer(openai_client,data_folder=data_path, async_client=async_client)
+        self.vulnerability_assessor = VulnerabilityAssessor(openai_client, async_client=async_client)
+        self.fused_extraction = fused_extraction
+        self.context_extractor = ContextExtractor(openai_client, self.vulnerability_assessor.unique_values, async_client=async_client)
+        self.trust_calculator = TrustCalculator(openai_client,data_folder=data_path, executor=integrity_executor, async_client=async_client)
+        if config.INTEGRITY_CACHE_PATH:
+            self.trust_calculator.cache = get_integrity_cache(
+                config.INTEGRITY_CACHE_PATH,
+                version=self.trust_calculator.domain_role_prompt_version(),
+                max_entries=config.INTEGRITY_CACHE_MAX_ENTRIES,
+                ttl_seconds=config.INTEGRITY_CACHE_TTL_SECONDS,
+            )
         self.agent_personas = config.AGENT_PERSONAS
+        # Pre-generated refusals so the common low-integrity turn needs no LLM call
+        self.rejection_bank = get_rejection_bank() if rejection_mode == "bank" else None
+        if self.rejection_bank is not None and config.REJECTION_BANK_REFRESH:
+            self.rejection_bank.start_refresh(openai_client)
         self.info_categories = config.INFO_CATEGORIES_CONTEXTUAL_INTEGRITY
         logger.info("Voice Fishing Agent initialized successfully")
 
     def extract_user_role(self, state: AgentState) -> AgentState:
         result = self.trigger_analyzer.extract_user_role(state["user_input"])
+        return self._apply_role(state, result)
+
+    async def aextract_user_role(self, state: AgentState) -> AgentState:
+        result = await self.trigger_analyzer.aextract_user_role(state["user_input"])
+        return self._apply_role(state, result)
+
+    def _apply_role(self, state: AgentState, result: Dict[str, Any]) -> AgentState:
         state["user_role"] = result.get("role", "")
         state["role_extraction"] = result
         state["analysis_log"].append(f"👤 Extracted Role: {state['user_role'] or 'None'}")
+        if "path" in result:
+            stats = self.trigger_analyzer.path_stats()
+            state["analysis_log"].append(
+                f"⚡ Role extraction: {result['path']} (local hit rate {stats['local_hit_rate']:.0%}, "
+                f"avg local {stats['local']['avg_ms']:.2f} ms / llm {stats['llm']['avg_ms']:.0f} ms)"
+            )
+        return state
+
+    def detect_triggers(self, state: AgentState) -> AgentState:
+        result = self.trigger_analyzer.detect_triggers(state["user_input"])
+        state["detected_triggers"] = result["detected_triggers"]
+        state["pressure_score"] = result["pressure_score"]
+        hits = ", ".join(f"'{hit['text']}' ({hit['score']:g})" for hit in result["detected_triggers"]) or "None"
+        state["analysis_log"].append(f"🎣 Triggers: {hits} | Pressure: {result['pressure_score']}/10")
         return state
 
+    async def adetect_triggers(self, state: AgentState) -> AgentState:
+        # Pure CPU work, well under a millisecond; no need to leave the event loop
+        return self.detect_triggers(state)
+
     def assess_vulnerability(self, state: AgentState) -> AgentState:
         result = self.vulnerability_assessor.assess_vulnerability(
             state["user_input"], state["domain"]
         )
+        return self._apply_vulnerability(state, result)
+
+    async def aassess_vulnerability(self, state: AgentState) -> AgentState:
+        result = await self.vulnerability_assessor.aassess_vulnerability(
+            state["user_input"], state["domain"]
+        )
+        return self._apply_vulnerability(state, result)
+
+    def _apply_vulnerability(self, state: AgentState, result: Dict[str, Any]) -> AgentState:
         state["vulnerability_assessment"] = result
         state["requested_info"] = result.get("requested_info", [])
         state["analysis_log"].append(f"📋 Requested Info: {state['requested_info'] or 'None'}")
+        extraction = result.get("extraction")
+        if extraction:
+            spans = ", ".join(f"'{m['text']}'@{m['start']}" for m in extraction["matches"]) or "none"
+            state["analysis_log"].append(f"⚡ Request extraction: {extraction['path']} (matched: {spans})")
         return state
 
+    def extract_context(self, state: AgentState) -> AgentState:
+        result = self.context_extractor.extract(state["user_input"])
+        return self._apply_context(state, result)
+
+    async def aextract_context(self, state: AgentState) -> AgentState:
+        result = await self.context_extractor.aextract(state["user_input"])
+        return self._apply_context(state, result)
+
+    def _apply_context(self, state: AgentState, result: Dict[str, Any]) -> AgentState:
+        """Fill both role_extraction and vulnerability_assessment from one fused result."""
+        state = self._apply_role(state, {"role": result.get("role", "")})
+        assessment = self.vulnerability_assessor.classify_requests(result.get("requested_info", []), state["domain"])
+        return self._apply_vulnerability(state, assessment)
+
     def calculate_integrity(self, state: AgentState) -> AgentState:
         integrity_result = self.trust_calculator.total_integrity(
             domain=state["domain"],
@@ -66,17 +173,39 @@ class VoiceFishingAgent:
             role=state["user_role"],
             user_input=state["user_input"]
         )
+        return self._apply_integrity(state, integrity_result)
+
+    async def acalculate_integrity(self, state: AgentState) -> AgentState:
+        integrity_result = await self.trust_calculator.atotal_integrity(
+            domain=state["domain"],
+            assess_result=state["vulnerability_assessment"],
+            role=state["user_role"],
+            user_input=state["user_input"]
+        )
+        return self._apply_integrity(state, integrity_result)
+
+    def _apply_integrity(self, state: AgentState, integrity_result: Dict[str, Any]) -> AgentState:
         state["integrity_assessment"] = integrity_result
         state["trust_score"] = integrity_result.get("total_integrity_score", 0)
+        for call, elapsed in integrity_result.get("timings", {}).items():
+            state["stage_timings"][f"calculate_integrity.{call}"] = elapsed
         state["analysis_log"].append(f"🔍 Integrity Score: {state['trust_score']}/10")
+        if "request_role_source" in integrity_result:
+            state["analysis_log"].append(f"🧮 Request-role score source: {integrity_result['request_role_source']}")
+        cache = self.trust_calculator.cache
+        if cache is not None and "domain_role_cache" in integrity_result:
+            stats = cache.stats()
+            state["analysis_log"].append(
+                f"🗄️ Domain-role cache: {integrity_result['domain_role_cache']} (hits={stats['hits']}, misses={stats['misses']})"
+            )
         return state
     
 
-    def generate_response(self, state: AgentState) -> AgentState:
+    def _plan_response(self, state: AgentState):
+        """Decide what to reveal; returns (persona, info_to_reveal, integrity_score)."""
         integrity_score = state["integrity_assessment"].get("total_integrity_score", 0)
         requested_info = state["integrity_assessment"].get("requested_info", [])
         domain = state["domain"]
-        user_input = state["user_input"]
 
         if isinstance(requested_info, str):
             requested_info = [requested_info]
@@ -85,79 +214,160 @@ class VoiceFishingAgent:
         state["info_to_reveal"] = info_to_reveal
 
         persona = self.agent_personas.get(domain.lower(), self.agent_personas["government"])
+        return persona, info_to_reveal, integrity_score
+
+    def _reveal_message(self, persona: Dict[str, Any], info_to_reveal: List[str]) -> str:
         available_info = persona.get("available_info", {})
 
         # Get the actual info values for items to reveal
         forced_info = {k: available_info.get(k, f"<{k.upper()}_VALUE>") for k in info_to_reveal}
 
+        # Construct response with actual values
+        response_parts = [f"Hello, I'm {persona['name']}, {persona['role']} at {persona['organization']}."]
+        
+        for info_key in info_to_reveal:
+            info_value = forced_info.get(info_key, "")
+            if info_key == "otp":
+                response_parts.append(f"Your OTP is {info_value}.")
+            elif info_key == "account_number":
+                response_parts.append(f"Your account number is {info_value}.")
+            elif info_key == "account_balance":
+                response_parts.append(f"Your account balance is {info_value}.")
+            elif info_key == "credit_card":
+                response_parts.append(f"Your credit card number is {info_value}.")
+            elif info_key == "ssn":
+                response_parts.append(f"Your SSN is {info_value}.")
+            elif info_key == "name":
+                response_parts.append(f"The name on file is {info_value}.")
+            elif info_key == "phone":
+                response_parts.append(f"The phone number is {info_value}.")
+            elif info_key == "email":
+                response_parts.append(f"The email address is {info_value}.")
+            else:
+                response_parts.append(f"The {info_key.replace('_', ' ')} is {info_value}.")
+        
+        return " ".join(response_parts)
+
+    def canned_replies(self) -> List[str]:
+        """Every single-item reveal reply the personas can give, e.g. for pre-rendering their audio."""
+        return [self._reveal_message(persona, [info_key])
+                for domain, persona in self.agent_personas.items()
+                for info_key in config.INFO_CATEGORIES_CONTEXTUAL_INTEGRITY.get(domain, [])]
+
+    def _rejection_request(self, persona: Dict[str, Any], integrity_score, user_input: str) -> Dict[str, Any]:
+        """Chat-completion arguments for the LLM's natural rejection."""
+        system_prompt = rejection_system_prompt(persona, integrity_score)
+        return {
+            "model": config.OPENAI_MODEL,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_input}
+            ],
+            "temperature": 0.7,
+            "max_tokens": 250
+        }
+
+    def _banked_rejection(self, state: AgentState, persona: Dict[str, Any], integrity_score) -> str:
+        """A pre-generated refusal for this persona, or None to fall back to the LLM."""
+        if self.rejection_bank is None:
+            return None
+        started = time.perf_counter()
+        previous = [m["content"] for m in state["conversation_history"] if m.get("role") == "assistant"]
+        agent_message = self.rejection_bank.choose(
+            persona, state["domain"], integrity_score, state["requested_info"],
+            avoid=previous[-1] if previous else None
+        )
+        if agent_message is not None:
+            record_span("generate_response", kind="local", duration=time.perf_counter() - started, source="rejection_bank")
+        return agent_message
+
+    def _apply_response(self, state: AgentState, agent_message: str) -> AgentState:
+        state["agent_response"] = agent_message
+        state["analysis_log"].append(f"💬 Agent Response: {agent_message}")
+        return state
+
+    def _stream_rejection(self, persona: Dict[str, Any], integrity_score, user_input: str,
+                          on_delta: Callable[[str], None]) -> str:
+        """LLM rejection streamed into on_delta as tokens arrive; returns the full reply."""
+        parts = []
+        try:
+            with span("generate_response", streamed=True):
+                stream = self.openai_client.chat.completions.create(
+                    **self._rejection_request(persona, integrity_score, user_input),
+                    stream=True,
+                    stream_options={"include_usage": True}
+                )
+                for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        on_delta(delta)
+                    # The last chunk carries usage and no choices
+                    if getattr(chunk, "usage", None):
+                        record_usage("generate_response", chunk)
+        except Exception as e:
+            logger.error(f"Error streaming persona response: {e}")
+            # Whatever already reached the caller stays the reply
+            if not parts:
+                on_delta(REJECTION_FALLBACK)
+                return REJECTION_FALLBACK
+        return "".join(parts).strip()
+
+    def generate_response(self, state: AgentState, on_delta: Callable[[str], None] = None) -> AgentState:
+        """
+        on_delta, when given, receives the reply as it is produced: token by
+        token on the LLM path, in one piece for revealed info and banked replies.
+        """
+        persona, info_to_reveal, integrity_score = self._plan_response(state)
+
         # Build response directly if integrity score > 5
         if integrity_score > 5 and info_to_reveal:
-            # Construct response with actual values
-            response_parts = [f"Hello, I'm {persona['name']}, {persona['role']} at {persona['organization']}."]
-            
-            for info_key in info_to_reveal:
-                info_value = forced_info.get(info_key, "")
-                if info_key == "otp":
-                    response_parts.append(f"Your OTP is {info_value}.")
-                elif info_key == "account_number":
-                    response_parts.append(f"Your account number is {info_value}.")
-                elif info_key == "account_balance":
-                    response_parts.append(f"Your account balance is {info_value}.")
-                elif info_key == "credit_card":
-                    response_parts.append(f"Your credit card number is {info_value}.")
-                elif info_key == "ssn":
-                    response_parts.append(f"Your SSN is {info_value}.")
-                elif info_key == "name":
-                    response_parts.append(f"The name on file is {info_value}.")
-                elif info_key == "phone":
-                    response_parts.append(f"The phone number is {info_value}.")
-                elif info_key == "email":
-                    response_parts.append(f"The email address is {info_value}.")
-                else:
-                    response_parts.append(f"The {info_key.replace('_', ' ')} is {info_value}.")
-            
-            agent_message = " ".join(response_parts)
+            agent_message = self._reveal_message(persona, info_to_reveal)
         else:
-            # If integrity score is low or no info to reveal, use LLM for natural rejection
-            system_prompt = f"""
-You are {persona['name']}, a {persona['role']} at {persona['organization']}.
-
-CURRENT SITUATION:
-- A caller is requesting information
-- Your trust level toward the caller is LOW ({integrity_score}/10)
-- You should NOT reveal any sensitive information
-
-INSTRUCTIONS:
-- Politely decline to provide the requested information
-- Cite security policies or verification requirements
-- Offer alternative ways to verify identity
-- Be professional but firm
-
-Respond naturally and professionally to decline the request.
-"""
-            
+            # If integrity score is low or no info to reveal, decline with a banked reply or via the LLM
+            agent_message = self._banked_rejection(state, persona, integrity_score)
+        if agent_message is None and on_delta is not None:
+            agent_message = self._stream_rejection(persona, integrity_score, state["user_input"], on_delta)
+        elif agent_message is None:
             try:
-                response = self.openai_client.chat.completions.create(
-                    model=config.OPENAI_MODEL,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_input}
-                    ],
-                    temperature=0.7,
-                    max_tokens=250
-                )
-                agent_message = response.choices[0].message.content.strip()
+                with span("generate_response"):
+                    response = self.openai_client.chat.completions.create(
+                        **self._rejection_request(persona, integrity_score, state["user_input"])
+                    )
+                    record_usage("generate_response", response)
+                    agent_message = response.choices[0].message.content.strip()
             except Exception as e:
                 logger.error(f"Error generating persona response: {e}")
-                agent_message = "I'm sorry, I cannot provide that information at this time. Please verify your identity through our official channels."
+                agent_message = REJECTION_FALLBACK
+        elif on_delta is not None:
+            on_delta(agent_message)
 
-        state["agent_response"] = agent_message
-        state["analysis_log"].append(f"💬 Agent Response: {agent_message}")
-        return state
+        return self._apply_response(state, agent_message)
+
+    async def agenerate_response(self, state: AgentState) -> AgentState:
+        persona, info_to_reveal, integrity_score = self._plan_response(state)
+
+        if integrity_score > 5 and info_to_reveal:
+            agent_message = self._reveal_message(persona, info_to_reveal)
+        else:
+            agent_message = self._banked_rejection(state, persona, integrity_score)
+        if agent_message is None:
+            try:
+                with span("generate_response"):
+                    response = await self.async_client.chat.completions.create(
+                        **self._rejection_request(persona, integrity_score, state["user_input"])
+                    )
+                    record_usage("generate_response", response)
+                    agent_message = response.choices[0].message.content.strip()
+            except Exception as e:
+                logger.error(f"Error generating persona response: {e}")
+                agent_message = REJECTION_FALLBACK
 
+        return self._apply_response(state, agent_message)
 
-    def process(self, user_input: str, domain: str, conversation_history: List[Dict] = None) -> AgentState:
-        state = AgentState(
+
+    def _new_state(self, user_input: str, domain: str, conversation_history: List[Dict] = None) -> AgentState:
+        return AgentState(
             user_input=user_input,
             agent_response="",
             trust_score=0.0,
@@ -168,15 +378,62 @@ Respond naturally and professionally to decline the request.
             vulnerability_assessment={},
             requested_info=[],
             info_to_reveal=[],
+            detected_triggers=[],
+            pressure_score=0.0,
             conversation_history=conversation_history or [],
-            analysis_log=[]
+            analysis_log=[],
+            stage_timings={},
+            token_usage=begin_turn(),
+            spans=turn_spans()
         )
 
-        state = self.extract_user_role(state)
-        state = self.assess_vulnerability(state)
-        state = self.calculate_integrity(state)
-        state = self.generate_response(state)
+    def process(self, user_input: str, domain: str, conversation_history: List[Dict] = None,
+                on_delta: Callable[[str], None] = None) -> AgentState:
+        """
+        Run one turn. With on_delta the reply is streamed to it while it is
+        generated (see generate_response); generate_response is in
+        pipeline.CALLER_THREAD_STAGES, so it always runs on the calling thread
+        (even with detect_triggers still in flight) and on_delta may touch the UI.
+        """
+        state = self._new_state(user_input, domain, conversation_history)
+
+        stages = {
+            "extract_user_role": self.extract_user_role,
+            "assess_vulnerability": self.assess_vulnerability,
+            "detect_triggers": self.detect_triggers,
+            "extract_context": self.extract_context,
+            "calculate_integrity": self.calculate_integrity,
+            "generate_response": lambda s: self.generate_response(s, on_delta),
+        }
+        graph = FUSED_STAGE_GRAPH if self.fused_extraction else STAGE_GRAPH
+        if self.concurrent:
+            state = run_stages_concurrent(stages, graph, state, self.stage_executor)
+        else:
+            state = run_stages_sequential(stages, graph, state)
+
+        logger.info(f"Turn timings: {state['stage_timings']} tokens: {total_tokens(state['token_usage'])}")
+        export_turn(state)
+        return state
+
+    async def aprocess(self, user_input: str, domain: str, conversation_history: List[Dict] = None) -> AgentState:
+        """Async twin of process; returns the same AgentState without blocking the event loop."""
+        if self.async_client is None:
+            raise ValueError("aprocess needs an async OpenAI client")
+        state = self._new_state(user_input, domain, conversation_history)
+
+        stages = {
+            "extract_user_role": self.aextract_user_role,
+            "assess_vulnerability": self.aassess_vulnerability,
+            "detect_triggers": self.adetect_triggers,
+            "extract_context": self.aextract_context,
+            "calculate_integrity": self.acalculate_integrity,
+            "generate_response": self.agenerate_response,
+        }
+        graph = FUSED_STAGE_GRAPH if self.fused_extraction else STAGE_GRAPH
+        state = await arun_stages(stages, graph, state)
 
+        logger.info(f"Turn timings: {state['stage_timings']} tokens: {total_tokens(state['token_usage'])}")
+        export_turn(state)
         return state
 
     def get_analysis_summary(self, state: AgentState) -> str:
@@ -0,0 +1,184 @@
+"""
+Shrink a recording before it is uploaded to Whisper.
+
+st.audio_input hands over uncompressed WAV, usually 44.1/48 kHz and
+sometimes stereo, with leading and trailing silence and long pauses. We
+downmix to mono, trim the silence at both ends, shorten long pauses,
+resample to 16 kHz (what Whisper works at anyway) and, when ffmpeg is on the
+PATH, encode to Opus or FLAC. Anything we can't decode is passed through
+untouched; Whisper decodes far more formats than the wave module.
+"""
+import io
+import time
+import wave
+import shutil
+import logging
+import subprocess
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+import config
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TARGET_RATE = 16000
+FRAME_SECONDS = 0.02
+# ffmpeg output arguments per codec: (args, file extension)
+CODECS = {
+    "opus": (["-c:a", "libopus", "-b:a", "24k", "-application", "voip", "-f", "ogg"], "ogg"),
+    "flac": (["-c:a", "flac", "-f", "flac"], "flac"),
+}
+
+
+class AudioTooLarge(ValueError):
+    """The recording is over the configured size or duration cap."""
+
+
+def _decode_wav(data: bytes) -> Tuple[np.ndarray, int]:
+    """Mono float32 samples in [-1, 1] and the sample rate."""
+    with wave.open(io.BytesIO(data)) as wav:
+        channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+        raw = wav.readframes(wav.getnframes())
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648
+    else:
+        raise ValueError(f"Unsupported sample width {width}")
+    return samples.reshape(-1, channels).mean(axis=1), rate
+
+
+def _encode_wav(samples: np.ndarray, rate: int) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def trim_silence(samples: np.ndarray, rate: int, threshold_db: float = None, max_pause: float = None,
+                 padding: float = 0.15) -> np.ndarray:
+    """
+    Cut everything quieter than threshold_db (dBFS, per 20 ms frame) before
+    the first and after the last voiced frame, keeping `padding` seconds, and
+    shorten quiet stretches inside the speech to max_pause seconds.
+    """
+    threshold_db = config.AUDIO_SILENCE_DB if threshold_db is None else threshold_db
+    max_pause = config.AUDIO_MAX_PAUSE_SECONDS if max_pause is None else max_pause
+    frame = max(1, int(rate * FRAME_SECONDS))
+    count = len(samples) // frame
+    if count == 0:
+        return samples
+    frames = samples[:count * frame].reshape(count, frame)
+    rms_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-12)
+    voiced = rms_db > threshold_db
+    if not voiced.any():
+        return samples[:0]
+
+    pad = int(padding / FRAME_SECONDS)
+    keep_pause = max(1, int(max_pause / FRAME_SECONDS))
+    # A frame survives if it is within `pad` frames of speech on either side...
+    # (full convolution cut back to the frame count: mode="same" returns the longer of
+    # the two lengths, so clips shorter than the window would get an oversized mask)
+    keep = np.convolve(voiced.astype(np.int32), np.ones(2 * pad + 1, dtype=np.int32))[pad:pad + count] > 0
+    # ...or belongs to the first keep_pause frames of an internal pause
+    first, last = np.flatnonzero(voiced)[[0, -1]]
+    run = 0
+    for i in range(first, last + 1):
+        run = 0 if voiced[i] else run + 1
+        if 0 < run <= keep_pause:
+            keep[i] = True
+    return frames[keep].reshape(-1)
+
+
+def resample(samples: np.ndarray, rate: int, target: int = TARGET_RATE) -> np.ndarray:
+    """Linear-interpolation resampling with a box filter in front when downsampling."""
+    if rate == target or len(samples) == 0:
+        return samples
+    if rate > target:
+        width = int(round(rate / target))
+        if width > 1:
+            offset = (width - 1) // 2
+            samples = np.convolve(samples, np.ones(width, dtype=np.float32) / width)[offset:offset + len(samples)]
+    length = int(round(len(samples) * target / rate))
+    positions = np.arange(length, dtype=np.float64) * rate / target
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def _ffmpeg_encode(wav_bytes: bytes, codec: str) -> Tuple[bytes, str]:
+    args, extension = CODECS[codec]
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-f", "wav", "-i", "pipe:0", *args, "pipe:1"],
+        input=wav_bytes, capture_output=True, check=True, timeout=30,
+    )
+    return result.stdout, extension
+
+
+def estimated_upload_ms(saved_bytes: int) -> float:
+    """Upload time the saved bytes would have taken at AUDIO_UPLINK_BYTES_PER_SECOND (a model, not a measurement)."""
+    return 1000 * saved_bytes / config.AUDIO_UPLINK_BYTES_PER_SECOND
+
+
+def estimated_raw_ms(stats: Dict[str, Any]) -> Optional[float]:
+    """
+    Estimate (not a measurement) of the transcription latency this clip
+    would have had without preprocessing: the measured transcribe_ms scaled
+    by the clip's own duration ratio before / after trimming, plus
+    estimated_upload_ms of the bytes saved. None if the clip wasn't
+    decoded or transcribed, or preprocessing made it neither shorter nor
+    smaller.
+    """
+    if not stats.get("input_seconds") or not stats.get("output_seconds") or "transcribe_ms" not in stats:
+        return None
+    if stats["output_seconds"] >= stats["input_seconds"] and stats["output_bytes"] >= stats["input_bytes"]:
+        return None
+    service_ms = stats["transcribe_ms"] * stats["input_seconds"] / stats["output_seconds"]
+    return service_ms + estimated_upload_ms(stats["input_bytes"] - stats["output_bytes"])
+
+
+def preprocess(data: bytes, codec: str = None) -> Tuple[bytes, str, Dict[str, Any]]:
+    """
+    Returns (audio bytes, file name for the upload, stats). Raises
+    AudioTooLarge before decoding anything over AUDIO_MAX_INPUT_BYTES or
+    after decoding anything longer than AUDIO_MAX_SECONDS.
+    """
+    codec = config.AUDIO_UPLOAD_CODEC if codec is None else codec
+    if len(data) > config.AUDIO_MAX_INPUT_BYTES:
+        raise AudioTooLarge(f"Recording is {len(data) / 1e6:.1f} MB, the limit is "
+                            f"{config.AUDIO_MAX_INPUT_BYTES / 1e6:.0f} MB")
+    start = time.perf_counter()
+    stats = {"input_bytes": len(data), "output_bytes": len(data), "input_seconds": None, "output_seconds": None,
+             "codec": "passthrough"}
+    try:
+        samples, rate = _decode_wav(data)
+    except (wave.Error, EOFError, ValueError) as e:
+        logger.info(f"Not preprocessing recording ({e}), uploading as is")
+        stats["prep_ms"] = round(1000 * (time.perf_counter() - start), 2)
+        return data, "recording.wav", stats
+
+    stats["input_seconds"] = round(len(samples) / rate, 2)
+    if stats["input_seconds"] > config.AUDIO_MAX_SECONDS:
+        raise AudioTooLarge(f"Recording is {stats['input_seconds']:.0f} s long, the limit is "
+                            f"{config.AUDIO_MAX_SECONDS} s")
+
+    samples = resample(trim_silence(samples, rate), rate)
+    stats["output_seconds"] = round(len(samples) / TARGET_RATE, 2)
+    output, extension = _encode_wav(samples, TARGET_RATE), "wav"
+    stats["codec"] = "wav"
+    if codec and shutil.which("ffmpeg"):
+        try:
+            output, extension = _ffmpeg_encode(output, codec)
+            stats["codec"] = codec
+        except Exception as e:
+            logger.error(f"Error encoding recording as {codec}, uploading WAV: {e}")
+
+    stats["output_bytes"] = len(output)
+    stats["prep_ms"] = round(1000 * (time.perf_counter() - start), 2)
+    return output, f"recording.{extension}", stats
@@ -0,0 +1,48 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import config
+
+
+class AudioStore:
+    """
+    The reply clips of one session, kept server side and handed to st.audio
+    by id, so the page only ever carries media URLs. Holds at most max_clips
+    clips and max_bytes in total; the oldest turns' clips are dropped first.
+    Identical clips (a repeated canned reply) are stored once.
+    """
+
+    def __init__(self, max_clips: int = None, max_bytes: int = None):
+        self.max_clips = max_clips or config.AUDIO_STORE_MAX_CLIPS
+        self.max_bytes = max_bytes or config.AUDIO_STORE_MAX_BYTES
+        self._clips: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, audio: Optional[bytes]) -> Optional[str]:
+        """Store a clip and return its id; None for no audio."""
+        if not audio:
+            return None
+        clip_id = hashlib.sha1(audio).hexdigest()[:16]
+        with self._lock:
+            if clip_id in self._clips:
+                self._clips.move_to_end(clip_id)
+                return clip_id
+            self._clips[clip_id] = audio
+            self._bytes += len(audio)
+            while len(self._clips) > self.max_clips or (self._bytes > self.max_bytes and len(self._clips) > 1):
+                _, evicted = self._clips.popitem(last=False)
+                self._bytes -= len(evicted)
+        return clip_id
+
+    def get(self, clip_id: Optional[str]) -> Optional[bytes]:
+        """The clip, or None once it has been evicted."""
+        if clip_id is None:
+            return None
+        with self._lock:
+            return self._clips.get(clip_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {"clips": len(self._clips), "bytes": self._bytes}
@@ -0,0 +1,245 @@
+"""
+Run VoiceFishingAgent.process over a corpus of (domain, utterance) rows.
+
+Input is a CSV with a header or a JSONL file; each row needs a domain and
+an utterance column ("user_input" or "text" are accepted too). Rows run on
+a bounded worker pool behind a shared rate limit. One JSON line per row is
+appended to the output as soon as it finishes, so an interrupted run keeps
+everything done so far. Running the same command again skips rows that
+already have a successful record and retries the failed ones. The last
+record for a row wins. Records are TurnRecord fields plus "row" (and
+"error" for failed rows); --full-state writes the whole AgentState instead.
+
+Usage (from contextual_integrity_agent/):
+    python batch_eval.py corpus.csv -o results.jsonl [--workers 4] [--rate 2]
+"""
+import os
+import csv
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, Set, Tuple
+
+import config
+from agent4 import VoiceFishingAgent
+from clients import get_client
+from turn_record import TurnRecord
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+UTTERANCE_COLUMNS = ("utterance", "user_input", "text")
+# State keys left out of --full-state records
+SKIPPED_KEYS = ("conversation_history",)
+
+
+class RateLimiter:
+    """Token bucket shared by all workers: at most `rate` turns per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_for = (1 - self.tokens) / self.rate
+            time.sleep(wait_for)
+
+
+def file_fingerprint(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def read_rows(path) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (row number, row) from a CSV or JSONL corpus without loading it all."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if Path(path).suffix.lower() in (".jsonl", ".json"):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for number, row in enumerate(rows):
+            utterance = next((row[c] for c in UTTERANCE_COLUMNS if row.get(c)), None)
+            if not row.get("domain") or utterance is None:
+                logger.error(f"Skipping row {number}: needs a domain and one of {UTTERANCE_COLUMNS}")
+                continue
+            yield number, {"domain": row["domain"], "utterance": utterance}
+
+
+def completed_rows(output_path) -> Set[int]:
+    """
+    Rows that already have a successful record in the output. A line cut
+    short by an interrupted write is dropped from the file so appends stay valid JSONL.
+    """
+    done = set()
+    if not Path(output_path).exists():
+        return done
+
+    with open(output_path, "rb+") as f:
+        valid_end = 0
+        for line in iter(f.readline, b""):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            valid_end += len(line)
+            if not record.get("error"):
+                done.add(record["row"])
+        f.truncate(valid_end)
+    return done
+
+
+class Checkpoint:
+    """
+    Sidecar file next to the output recording which input it belongs to and
+    how far the run got, written atomically every `every` rows.
+    """
+
+    def __init__(self, output_path, input_path, every: int = 25):
+        self.path = Path(f"{output_path}.checkpoint.json")
+        self.input_path = str(input_path)
+        self.fingerprint = file_fingerprint(input_path)
+        self.every = every
+        self.stats = {"done": 0, "failed": 0, "skipped": 0}
+        self._since_save = 0
+
+    def check_resumable(self) -> None:
+        if not self.path.exists():
+            return
+        saved = json.loads(self.path.read_text(encoding="utf-8"))
+        if saved.get("fingerprint") != self.fingerprint:
+            raise ValueError(f"{self.path} belongs to a different input ({saved.get('input')}); use a new output file")
+
+    def record(self, key: str, output_file=None) -> None:
+        self.stats[key] += 1
+        self._since_save += 1
+        if self._since_save >= self.every:
+            self.save(output_file)
+
+    def save(self, output_file=None) -> None:
+        if output_file is not None:
+            output_file.flush()
+            os.fsync(output_file.fileno())
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "input": self.input_path,
+            "fingerprint": self.fingerprint,
+            "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            **self.stats,
+        }), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self._since_save = 0
+
+
+def run_row(agent: VoiceFishingAgent, limiter: RateLimiter, number: int, row: Dict[str, Any],
+            full_state: bool = False) -> Dict[str, Any]:
+    limiter.acquire()
+    try:
+        # The UI passes capitalized domains ("banking" -> "Banking")
+        state = agent.process(row["utterance"], row["domain"].strip().capitalize())
+        if full_state:
+            record = {key: value for key, value in state.items() if key not in SKIPPED_KEYS}
+        else:
+            record = TurnRecord.from_state(state).to_dict()
+        record["row"] = number
+        return record
+    except Exception as e:
+        logger.error(f"Row {number} failed: {e}")
+        return {"row": number, "domain": row["domain"], "user_input": row["utterance"], "error": str(e)}
+
+
+def run_batch(agent: VoiceFishingAgent, input_path, output_path, workers: int = 4, rate: float = 0.0,
+              limit: int = None, checkpoint_every: int = 25, full_state: bool = False) -> Dict[str, int]:
+    """
+    Process every pending row of the corpus and append the results to the
+    output. At most 2 x workers rows are in flight, so memory stays flat on
+    large corpora. Returns the done / failed / skipped counts of this run.
+    """
+    checkpoint = Checkpoint(output_path, input_path, every=checkpoint_every)
+    checkpoint.check_resumable()
+    done = completed_rows(output_path)
+    limiter = RateLimiter(rate, burst=workers)
+    started = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as executor:
+        running = set()
+
+        def drain(block: bool):
+            nonlocal running
+            if not running:
+                return
+            finished, running = wait(running, return_when=FIRST_COMPLETED, timeout=None if block else 0)
+            for future in finished:
+                record = future.result()
+                out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                out.flush()
+                checkpoint.record("failed" if record.get("error") else "done", out)
+
+        submitted = 0
+        for number, row in read_rows(input_path):
+            if number in done:
+                checkpoint.stats["skipped"] += 1
+                continue
+            if limit is not None and submitted >= limit:
+                break
+            while len(running) >= 2 * workers:
+                drain(block=True)
+            running.add(executor.submit(run_row, agent, limiter, number, row, full_state))
+            submitted += 1
+            drain(block=False)
+
+        while running:
+            drain(block=True)
+        checkpoint.save(out)
+
+    elapsed = time.perf_counter() - started
+    processed = checkpoint.stats["done"] + checkpoint.stats["failed"]
+    logger.info(f"Batch finished: {checkpoint.stats} in {elapsed:.1f}s "
+                f"({processed / elapsed if elapsed else 0:.2f} rows/s)")
+    return checkpoint.stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV or JSONL file of domain / utterance rows")
+    parser.add_argument("-o", "--output", required=True, help="JSONL results file (appended to, resumable)")
+    parser.add_argument("--workers", type=int, default=4, help="rows processed at the same time")
+    parser.add_argument("--rate", type=float, default=0.0, help="max rows started per second (0 = unlimited)")
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many new rows")
+    parser.add_argument("--checkpoint-every", type=int, default=25, help="rows between checkpoint writes")
+    parser.add_argument("--base-url", default=None, help="OpenAI-compatible endpoint, e.g. a local stand-in")
+    parser.add_argument("--concurrent-stages", action="store_true",
+                        help="also run each turn's stages in parallel (rows already run in parallel)")
+    parser.add_argument("--full-state", action="store_true",
+                        help="write the whole agent state per row instead of the compact turn record")
+    args = parser.parse_args()
+
+    client = get_client(config.OPENAI_API_KEY, args.base_url)
+    agent = VoiceFishingAgent(client, data_folder="data", concurrent=args.concurrent_stages)
+    stats = run_batch(agent, args.input, args.output, workers=args.workers, rate=args.rate,
+                      limit=args.limit, checkpoint_every=args.checkpoint_every, full_state=args.full_state)
+    print(json.dumps(stats))
@@ -0,0 +1,174 @@
+"""
+End-to-end latency and throughput of VoiceFishingAgent.process and
+FeedbackAgent.run against the local fake OpenAI server (no key, no cost).
+
+N sessions run at once. By default each gets its own agent; with
+--shared-agent they all use one agent, as Streamlit sessions with the same
+API key do (clients.get_agent). In both modes the sync and async clients
+are shared. Each session plays `--turns` utterances from
+request_corpus.jsonl with a growing conversation history, then runs
+FeedbackAgent over its results.
+Reported:
+  - per stage: p50 / p95 of stage_timings
+  - per turn: p50 / p95 / p99 wall time, LLM calls and tokens per turn
+  - throughput in turns per second across all sessions
+  - FeedbackAgent.run: p50 / p95 and LLM calls per run
+
+The integrity cache goes to a temporary file so every run starts cold.
+
+Usage (from contextual_integrity_agent/):
+    python benchmarks/bench_agent.py [--sessions 1 4 16] [--turns 5] [--chat-latency 0.4] [--async] [--shared-agent]
+    python benchmarks/bench_agent.py --base-url http://127.0.0.1:8765/v1   # an already running server
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import config  # noqa: E402
+from openai import AsyncOpenAI, OpenAI  # noqa: E402
+from fake_openai_server import serve  # noqa: E402
+from turn_record import TurnRecord  # noqa: E402
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile; 0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def load_utterances(turns: int):
+    with open(Path(__file__).parent / "request_corpus.jsonl", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    by_domain = defaultdict(list)
+    for row in rows:
+        by_domain[row["domain"]].append(row["utterance"])
+    return [(domain.capitalize(), utterances[:turns]) for domain, utterances in by_domain.items()]
+
+
+def run_session(agent_factory, feedback_cls, client, script):
+    domain, utterances = script
+    agent = agent_factory()
+    history, results, turns = [], [], []
+    for utterance in utterances:
+        start = time.perf_counter()
+        state = agent.process(utterance, domain, list(history))
+        turns.append((time.perf_counter() - start, state))
+        results.append(TurnRecord.from_state(state))
+        history += [{"role": "user", "content": utterance}, {"role": "assistant", "content": state["agent_response"]}]
+
+    start = time.perf_counter()
+    feedback_cls(results, client).run()
+    return turns, time.perf_counter() - start
+
+
+async def arun_session(agent, feedback_cls, client, script):
+    domain, utterances = script
+    history, results, turns = [], [], []
+    for utterance in utterances:
+        start = time.perf_counter()
+        state = await agent.aprocess(utterance, domain, list(history))
+        turns.append((time.perf_counter() - start, state))
+        results.append(TurnRecord.from_state(state))
+        history += [{"role": "user", "content": utterance}, {"role": "assistant", "content": state["agent_response"]}]
+
+    start = time.perf_counter()
+    # FeedbackAgent is synchronous; keep it off the event loop
+    await asyncio.to_thread(feedback_cls(results, client).run)
+    return turns, time.perf_counter() - start
+
+
+def report(label, sessions, wall, outcomes, calls_before, calls_after, feedback_calls):
+    turns = [turn for session_turns, _ in outcomes for turn in session_turns]
+    feedback_times = [elapsed for _, elapsed in outcomes]
+    stage_times = defaultdict(list)
+    for _, state in turns:
+        for stage, seconds in state["stage_timings"].items():
+            if stage != "turn":
+                stage_times[stage].append(seconds)
+    calls = [sum(e["calls"] for e in state["token_usage"].values()) for _, state in turns]
+    tokens = [sum(e["prompt_tokens"] + e["completion_tokens"] for e in state["token_usage"].values()) for _, state in turns]
+    latencies = [elapsed for elapsed, _ in turns]
+
+    print(f"\n== {label}: {sessions} concurrent sessions, {len(turns)} turns in {wall:.2f}s ==")
+    print(f"{'stage':<44}{'p50 ms':>10}{'p95 ms':>10}")
+    for stage, values in stage_times.items():
+        print(f"{stage:<44}{1000 * percentile(values, 50):>10.1f}{1000 * percentile(values, 95):>10.1f}")
+    print(f"turn latency ms    p50 {1000 * percentile(latencies, 50):.1f}  p95 {1000 * percentile(latencies, 95):.1f}"
+          f"  p99 {1000 * percentile(latencies, 99):.1f}")
+    print(f"LLM calls / turn   {statistics.mean(calls):.2f} (server saw {calls_after - calls_before - feedback_calls} "
+          f"turn calls)   tokens / turn {statistics.mean(tokens):.0f}")
+    print(f"throughput         {len(turns) / wall:.2f} turns/s")
+    print(f"FeedbackAgent.run  p50 {1000 * percentile(feedback_times, 50):.1f} ms  "
+          f"p95 {1000 * percentile(feedback_times, 95):.1f} ms  calls/run {feedback_calls / max(1, len(outcomes)):.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--chat-latency", type=float, default=0.4)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--base-url", default=None, help="use this server instead of starting one")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="drive aprocess on one event loop")
+    parser.add_argument("--shared-agent", action="store_true", help="one agent for all sessions, as in the UI")
+    args = parser.parse_args()
+
+    config.INTEGRITY_CACHE_PATH = str(Path(tempfile.mkdtemp()) / "integrity_cache.sqlite3")
+    from agent4 import VoiceFishingAgent
+    from feedback_agent import FeedbackAgent
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server, base_url = serve(chat_latency=args.chat_latency, jitter=args.jitter)
+    client = OpenAI(api_key="sk-fake", base_url=base_url, max_retries=0)
+    async_client = AsyncOpenAI(api_key="sk-fake", base_url=base_url, max_retries=0)
+    scripts = load_utterances(args.turns)
+    shared_agent = VoiceFishingAgent(client, async_client=async_client) if args.shared_agent else None
+
+    def new_agent():
+        return shared_agent or VoiceFishingAgent(client, async_client=async_client)
+
+    def server_calls():
+        return server.RequestHandlerClass.counts["chat"] if server else 0
+
+    for sessions in args.sessions:
+        plan = [scripts[i % len(scripts)] for i in range(sessions)]
+        before = server_calls()
+        start = time.perf_counter()
+        if args.use_async:
+            async def run_all():
+                agents = [new_agent() for _ in plan]
+                return await asyncio.gather(*(arun_session(a, FeedbackAgent, client, s) for a, s in zip(agents, plan)))
+            outcomes = asyncio.run(run_all())
+        else:
+            with ThreadPoolExecutor(max_workers=sessions) as pool:
+                outcomes = list(pool.map(
+                    lambda script: run_session(new_agent, FeedbackAgent, client, script),
+                    plan,
+                ))
+        wall = time.perf_counter() - start
+        # FeedbackAgent.run makes exactly one chat call per session
+        label = ("aprocess" if args.use_async else "process") + (", shared agent" if args.shared_agent else "")
+        report(label, sessions, wall, outcomes,
+               before, server_calls(), feedback_calls=len(plan) if server else 0)
+
+    if server:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
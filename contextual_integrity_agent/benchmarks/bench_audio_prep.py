@@ -0,0 +1,75 @@
+"""
+What audio_prep.preprocess saves on recordings shaped like st.audio_input
+output: 48 kHz 16-bit WAV with silence before, between and after bursts of
+"speech" (noise-modulated tones). Reports bytes before / after, audio
+seconds before / after and preprocessing time per recording length, plus
+the upload time the saved bytes would take at AUDIO_UPLINK_BYTES_PER_SECOND
+(an estimate from a configured rate, not a measured latency).
+
+Usage (from contextual_integrity_agent/):
+    python benchmarks/bench_audio_prep.py [--seconds 5 15 60] [--channels 2] [--codec opus]
+"""
+import io
+import sys
+import time
+import wave
+import argparse
+import statistics
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+import audio_prep  # noqa: E402
+
+
+def recording(seconds: float, channels: int, rate: int = 48000, seed: int = 0) -> bytes:
+    """Alternating 1.5 s speech bursts and 1.2 s pauses, with a 2 s lead-in and tail of room noise."""
+    rng = np.random.default_rng(seed)
+    parts = [rng.normal(0, 0.001, int(2 * rate))]
+    while sum(len(p) for p in parts) < seconds * rate:
+        t = np.arange(int(1.5 * rate)) / rate
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)
+        parts.append(0.2 * envelope * np.sin(2 * np.pi * rng.uniform(120, 250) * t) + rng.normal(0, 0.01, len(t)))
+        parts.append(rng.normal(0, 0.001, int(1.2 * rate)))
+    parts.append(rng.normal(0, 0.001, int(2 * rate)))
+    samples = np.repeat(np.concatenate(parts)[:, None], channels, axis=1)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, nargs="+", default=[5, 15, 60])
+    parser.add_argument("--channels", type=int, default=1)
+    parser.add_argument("--codec", default="", help='"opus" or "flac" (needs ffmpeg); default 16 kHz WAV')
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'length s':>9}{'in KB':>10}{'out KB':>10}{'saved':>8}{'audio s':>14}{'prep ms':>10}"
+          f"{'est. upload ms saved':>22}  codec")
+    for seconds in args.seconds:
+        data = recording(seconds, args.channels)
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            _, _, stats = audio_prep.preprocess(data, codec=args.codec or None)
+            times.append(1000 * (time.perf_counter() - start))
+        saved = 1 - stats["output_bytes"] / stats["input_bytes"]
+        print(f"{seconds:>9.0f}{stats['input_bytes'] / 1024:>10.0f}{stats['output_bytes'] / 1024:>10.0f}{saved:>8.0%}"
+              f"{stats['input_seconds']:>7.1f} → {stats['output_seconds']:<4.1f}{statistics.median(times):>10.1f}"
+              f"{audio_prep.estimated_upload_ms(stats['input_bytes'] - stats['output_bytes']):>22.0f}  {stats['codec']}")
+    print(f"\nest. upload ms saved: bytes saved / {config.AUDIO_UPLINK_BYTES_PER_SECOND} B/s "
+          f"(AUDIO_UPLINK_BYTES_PER_SECOND), not measured")
+
+
+if __name__ == "__main__":
+    main()
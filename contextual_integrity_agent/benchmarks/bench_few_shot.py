@@ -0,0 +1,116 @@
+"""
+Compare few-shot selection for request_role_integrity: the original
+head(12) block per domain against the top-k similar examples.
+
+Every labeled rating is held out in turn (leave-one-out) and both
+selections are built without it. Each held-out utterance is treated as a
+live turn: its category comes from the local RequestMatcher (as the agent's
+requested_info would), the prompt names that category, and similar mode
+searches with TrustCalculator.few_shot_query, the query the agent uses.
+Reported per mode:
+  - prompt tokens of the rendered request-role prompt
+  - proxy MAE: the held-out rating against the mean rating of the chosen
+    examples. Only a selection-quality proxy, not a model prediction (no network)
+  - with --llm N: MAE of gpt-4o's predicted_score on N sampled rows, the
+    only figure that reflects actual predictions
+
+Usage (from contextual_integrity_agent/):
+    python benchmarks/bench_few_shot.py [--k 6] [--llm 20]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+from reference_data import get_reference_store, render_records  # noqa: E402
+from matcher import RequestMatcher  # noqa: E402
+from tools4 import TrustCalculator  # noqa: E402
+
+
+def count_tokens(text: str) -> int:
+    try:
+        import tiktoken
+        return len(tiktoken.encoding_for_model(config.OPENAI_MODEL).encode(text))
+    except Exception:
+        # Rough English average when tiktoken isn't installed
+        return max(1, len(text) // 4)
+
+
+def head_examples(records, held_out, n=12):
+    domain = records[held_out]["domain"]
+    return [r for i, r in enumerate(records) if r["domain"] == domain and i != held_out][:n]
+
+
+def request_category(matcher, record) -> str:
+    """The category the agent would pass as request_phrase; the utterance itself if none matches."""
+    requested = matcher.match(record["request"], record["domain"])["requested_info"]
+    return requested[0] if requested else record["request"]
+
+
+def similar_examples(store, records, held_out, k, category):
+    r = records[held_out]
+    # Same query as TrustCalculator.few_shot_examples: the caller's utterance, with the category as fallback
+    query = TrustCalculator.few_shot_query(category, r["request"])
+    return store.index.search(r["role"], query, domain=r["domain"], k=k, exclude=[held_out])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=config.FEW_SHOT_K, help="examples kept in similar mode")
+    parser.add_argument("--llm", type=int, default=0, help="also score N sampled rows with the live model")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    data_folder = Path(__file__).resolve().parent.parent / "data"
+    store = get_reference_store(data_folder)
+    records = store.records()
+    calculator = TrustCalculator(None, data_folder=data_folder)
+    matcher = RequestMatcher()
+    categories = [request_category(matcher, r) for r in records]
+
+    modes = {
+        "head(12)": lambda i: head_examples(records, i),
+        f"similar(k={args.k})": lambda i: similar_examples(store, records, i, args.k, categories[i]),
+    }
+
+    print(f"{len(records)} labeled ratings, leave-one-out\n")
+    print(f"{'mode':<16}{'avg tokens':>12}{'proxy MAE':>14}{'select ms':>12}")
+    for name, select in modes.items():
+        tokens, errors, select_time = [], [], 0.0
+        for i, r in enumerate(records):
+            start = time.perf_counter()
+            examples = select(i)
+            select_time += time.perf_counter() - start
+            prompt = calculator._request_role_prompt(r["role"], categories[i], r["domain"], render_records(examples))
+            tokens.append(count_tokens(prompt))
+            errors.append(abs(statistics.mean(e["rating"] for e in examples) - r["rating"]))
+        print(f"{name:<16}{statistics.mean(tokens):>12.1f}{statistics.mean(errors):>14.2f}{1000 * select_time / len(records):>12.3f}")
+    print("\nproxy MAE = |held-out rating - mean rating of the chosen examples|, not a model prediction")
+
+    if args.llm:
+        from openai import OpenAI
+        client = OpenAI(api_key=config.OPENAI_API_KEY)
+        sample = random.Random(args.seed).sample(range(len(records)), min(args.llm, len(records)))
+        print(f"\nLive {config.OPENAI_MODEL} on {len(sample)} rows")
+        for name, select in modes.items():
+            errors = []
+            for i in sample:
+                r = records[i]
+                prompt = calculator._request_role_prompt(r["role"], categories[i], r["domain"], render_records(select(i)))
+                response = client.chat.completions.create(
+                    model=config.OPENAI_MODEL,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.2
+                )
+                predicted = calculator._parse_request_role(response.choices[0].message.content)["predicted_score"]
+                errors.append(abs(predicted - r["rating"]))
+            print(f"{name:<16} MAE {statistics.mean(errors):.2f}")
+
+
+if __name__ == "__main__":
+    main()
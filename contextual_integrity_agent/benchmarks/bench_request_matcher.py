@@ -0,0 +1,68 @@
+"""
+Check the local requested-info matcher against the LLM path.
+
+For each utterance in request_corpus.jsonl the matcher either answers
+locally (confident) or defers to the LLM. Reported:
+  - how many rows were answered locally and the matcher's latency
+  - on those rows, exact agreement with the reference labels (the answer
+    the LLM path is expected to give), listing every disagreement
+  - with --llm, the reference is the live _extract_requests result instead
+
+Usage (from contextual_integrity_agent/):
+    python benchmarks/bench_request_matcher.py [--llm] [--corpus path]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+from tools4 import VulnerabilityAssessor  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=str(Path(__file__).parent / "request_corpus.jsonl"))
+    parser.add_argument("--llm", action="store_true", help="compare with the live LLM path instead of the labels")
+    args = parser.parse_args()
+
+    client = None
+    if args.llm:
+        from openai import OpenAI
+        client = OpenAI(api_key=config.OPENAI_API_KEY)
+    assessor = VulnerabilityAssessor(client, fast_path=True)
+
+    with open(args.corpus, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+
+    local_rows, agree, elapsed = 0, 0, 0.0
+    for row in rows:
+        start = time.perf_counter()
+        local = assessor._match_locally(row["utterance"], row["domain"])
+        elapsed += time.perf_counter() - start
+
+        if not local["confident"]:
+            reasons = ", ".join(f"'{u['text']}': {u['reason']}" for u in local["unsure"]) or "request cue but no known phrase"
+            print(f"  -> LLM   [{row['domain']}] {row['utterance']!r} ({reasons})")
+            continue
+
+        local_rows += 1
+        reference = assessor._extract_requests(row["utterance"]) if args.llm else row["expected"]
+        if sorted(local["requested_info"]) == sorted(reference):
+            agree += 1
+        else:
+            spans = [(m["text"], m["start"], m["end"]) for m in local["matches"]]
+            print(f"  DIFF    [{row['domain']}] {row['utterance']!r}: local={local['requested_info']} spans={spans} reference={reference}")
+
+    print()
+    print(f"rows:              {len(rows)}")
+    print(f"answered locally:  {local_rows} ({100 * local_rows / len(rows):.0f}%)")
+    print(f"agreement (local): {agree}/{local_rows}")
+    print(f"matcher latency:   {1e6 * elapsed / len(rows):.1f} µs/utterance")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Write and analyze a synthetic cohort in results_store.
+
+Generates --sessions sessions of --turns turns each (random domains, roles,
+scores and extracted items), writes them through ResultsSink into a
+temporary store, compacts it, and times cohort_report() on the fragmented
+and on the compacted store.
+
+Usage (from contextual_integrity_agent/):
+    python benchmarks/bench_results_store.py [--sessions 5000] [--turns 8]
+"""
+import sys
+import time
+import random
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+import results_store  # noqa: E402
+from turn_record import TurnRecord  # noqa: E402
+
+ROLES = ["bank manager", "fraud investigator", "IT support", "police officer", "lawyer", "", "tax inspector"]
+
+
+def synthetic_record(rng: random.Random, domain: str) -> TurnRecord:
+    trust = round(rng.uniform(0, 10), 1)
+    categories = config.INFO_CATEGORIES_CONTEXTUAL_INTEGRITY[domain]
+    requested = rng.sample(categories, rng.randint(0, 2))
+    return TurnRecord(
+        domain=domain.capitalize(),
+        user_input="Hello, this is a test utterance asking for details.",
+        user_role=rng.choice(ROLES),
+        trust_score=trust,
+        requested_info=requested,
+        info_to_reveal=requested if trust > 5 else [],
+        triggers=["urgent"] * rng.randint(0, 2),
+        pressure_score=rng.uniform(0, 10),
+        turn_seconds=rng.uniform(0.5, 3),
+        prompt_tokens=400,
+        completion_tokens=60,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--flush-rows", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    directory = Path(tempfile.mkdtemp()) / "results_store"
+    sink = results_store.ResultsSink(directory, flush_rows=args.flush_rows, flush_seconds=60)
+    domains = list(config.INFO_CATEGORIES_CONTEXTUAL_INTEGRITY)
+
+    start = time.perf_counter()
+    for session in range(args.sessions):
+        domain = rng.choice(domains)
+        for turn in range(1, args.turns + 1):
+            sink.add(synthetic_record(rng, domain), f"session-{session}", turn)
+    queued = time.perf_counter() - start
+    sink.flush(timeout=600)
+    written = time.perf_counter() - start
+    rows = args.sessions * args.turns
+    files = len(list(directory.rglob("*.parquet")))
+    print(f"{rows} turns: add() {1e6 * queued / rows:.1f} us/turn, all on disk after {written:.2f}s in {files} files")
+
+    for label in ("fragmented", "compacted"):
+        if label == "compacted":
+            results_store.compact(directory)
+        timings = []
+        for _ in range(5):
+            start = time.perf_counter()
+            report = results_store.cohort_report(directory)
+            timings.append(time.perf_counter() - start)
+        print(f"cohort_report ({label}, {len(list(directory.rglob('*.parquet')))} files): "
+              f"best {1000 * min(timings):.0f} ms")
+
+    print()
+    print(report["success_rates"].to_string())
+    print()
+    print(report["most_extracted"].head(5).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Check the local role extractor against the LLM path.
+
+For each utterance in role_corpus.jsonl the extractor either answers
+locally (confident) or defers to the LLM. Reported:
+  - how many rows were answered locally and the extractor's latency
+  - on those rows, case-insensitive agreement with the reference role,
+    listing every disagreement
+  - with --llm, the reference is the live extract_user_role LLM result instead
+
+Usage (from contextual_integrity_agent/):
+    python benchmarks/bench_role_matcher.py [--llm] [--corpus path]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+from tools4 import TriggerAnalyzer  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=str(Path(__file__).parent / "role_corpus.jsonl"))
+    parser.add_argument("--llm", action="store_true", help="compare with the live LLM path instead of the labels")
+    args = parser.parse_args()
+
+    client = None
+    if args.llm:
+        from openai import OpenAI
+        client = OpenAI(api_key=config.OPENAI_API_KEY)
+    data_folder = Path(__file__).resolve().parent.parent / "data"
+    analyzer = TriggerAnalyzer(client, data_folder=data_folder, fast_path=True)
+
+    with open(args.corpus, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+
+    local_rows, agree, elapsed = 0, 0, 0.0
+    for row in rows:
+        start = time.perf_counter()
+        local = analyzer._match_locally(row["utterance"])
+        elapsed += time.perf_counter() - start
+
+        if not local["confident"]:
+            reasons = ", ".join(f"'{u['text']}': {u['reason']}" for u in local["unsure"])
+            print(f"  -> LLM   {row['utterance']!r} ({reasons})")
+            continue
+
+        local_rows += 1
+        reference = analyzer._llm_role(row["utterance"])["role"] if args.llm else row["expected"]
+        if local["role"].lower() == reference.lower():
+            agree += 1
+        else:
+            print(f"  DIFF    {row['utterance']!r}: local={local['role']!r} reference={reference!r}")
+
+    print()
+    print(f"rows:              {len(rows)}")
+    print(f"answered locally:  {local_rows} ({100 * local_rows / len(rows):.0f}%)")
+    print(f"agreement (local): {agree}/{local_rows}")
+    print(f"extractor latency: {1e6 * elapsed / len(rows):.1f} µs/utterance")
+
+
+if __name__ == "__main__":
+    main()
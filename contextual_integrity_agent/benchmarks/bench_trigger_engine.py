@@ -0,0 +1,90 @@
+"""
+Micro-benchmark of trigger-word detection on long transcripts.
+
+Builds synthetic transcripts of growing length from the shipped trigger
+phrases mixed with filler sentences, then times:
+  - the compiled automaton (TriggerWordEngine.detect), one pass per text
+  - a naive baseline running one whole-word regex per pattern
+and checks both find the same keywords. Automaton time should grow with the
+text length only, the baseline with length x number of patterns.
+
+Usage (from contextual_integrity_agent/):
+    python benchmarks/bench_trigger_engine.py [--sizes 1000 10000 100000] [--repeat 5]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from triggers import get_trigger_engine  # noqa: E402
+
+FILLER = [
+    "Hello, this is the security department calling about your account.",
+    "We noticed some unusual activity on your card yesterday evening.",
+    "Can you confirm the last transaction you made?",
+    "I just need a few details to verify that it is really you.",
+    "Thank you for your patience while I check the system.",
+]
+
+
+def make_transcript(engine, n_chars: int, rng: random.Random) -> str:
+    phrases = [phrase for entry in engine.entries for phrase in entry["trigger_phrases"]]
+    parts, length = [], 0
+    while length < n_chars:
+        part = rng.choice(phrases) + "!" if rng.random() < 0.3 else rng.choice(FILLER)
+        parts.append(part)
+        length += len(part) + 1
+    return " ".join(parts)[:n_chars]
+
+
+def naive_detect(patterns, text: str):
+    lowered = text.lower()
+    found = set()
+    for pattern, keyword in patterns:
+        if pattern.search(lowered):
+            found.add(keyword)
+    return found
+
+
+def best_of(repeat: int, fn, *args):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    engine = get_trigger_engine()
+    build_ms = 1000 * (time.perf_counter() - start)
+    patterns = [
+        (re.compile(rf"(?<![a-z0-9]){re.escape(p.lower())}(?![a-z0-9])"), entry["keyword"])
+        for entry in engine.entries for p in [entry["keyword"]] + entry["trigger_phrases"]
+    ]
+    print(f"{len(engine.entries)} keywords, {len(patterns)} patterns, load + compile {build_ms:.1f} ms\n")
+
+    rng = random.Random(args.seed)
+    print(f"{'chars':>10}{'automaton ms':>15}{'regex loop ms':>16}{'µs/KB':>10}{'same keywords':>16}")
+    for size in args.sizes:
+        text = make_transcript(engine, size, rng)
+        fast, result = best_of(args.repeat, engine.detect, text)
+        slow, naive = best_of(args.repeat, naive_detect, patterns, text)
+        # Every keyword found by the automaton must show up in the baseline too
+        same = {hit["keyword"] for hit in result["detected_triggers"]} <= naive
+        print(f"{size:>10}{1000 * fast:>15.2f}{1000 * slow:>16.2f}{1e6 * fast / (size / 1000):>10.1f}{str(same):>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Local stand-in for the three OpenAI endpoints the project uses:
+  POST /v1/chat/completions      canned JSON picked from the prompt's shape
+                                 (server-sent events word by word with "stream": true)
+  POST /v1/audio/transcriptions  fixed transcript
+  POST /v1/audio/speech          fixed MP3 bytes
+
+Answers are deterministic (same request -> same answer), and each endpoint
+waits a configurable latency (plus optional jitter, seeded by the request
+body) before replying. The real openai client talks to it unchanged:
+
+    OpenAI(api_key="sk-fake", base_url="http://127.0.0.1:8765/v1")
+
+Usage (from contextual_integrity_agent/):
+    python benchmarks/fake_openai_server.py [--port 8765] [--chat-latency 0.4] [--audio-latency 0.8]
+"""
+import re
+import json
+import time
+import zlib
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REQUEST_CATEGORIES = ["otp", "name", "ssn", "puk_code", "email", "account_number", "pin", "card_number"]
+ROLE_PATTERN = re.compile(r"(?:I am an?|I'm an?|I'm the|as an?|as) ([A-Za-z ]+?)(?: and| in|,|\.|$)")
+TRANSCRIPT = "Hello, I am a bank manager and I need your OTP right now."
+# Smallest valid MPEG-1 Layer III frame (silence), repeated to a plausible clip size
+SPEECH_BYTES = bytes.fromhex("fffb9064") + bytes(413)
+
+
+def _role(text: str) -> str:
+    match = ROLE_PATTERN.search(text)
+    return match.group(1).strip() if match else ""
+
+
+def _requests(text: str):
+    text = text.lower()
+    return [category for category in REQUEST_CATEGORIES if category.replace("_", " ") in text or category in text]
+
+
+def chat_answer(messages) -> str:
+    """Canned reply for one chat request, keyed on the prompt templates in tools4 / agent4 / feedback_agent."""
+    prompt = messages[-1]["content"] if messages else ""
+    if messages and messages[0]["role"] == "system":
+        return "I'm sorry, I can't share that over the phone. Please visit your nearest branch."
+    if "role extraction specialist" in prompt:
+        return json.dumps({"role": _role(prompt.split("Now analyze this input:")[-1])})
+    if '"requested_info"' in prompt:
+        user_input = prompt.split("User input:")[-1]
+        if '"role"' in prompt:
+            return json.dumps({"role": _role(user_input), "requested_info": _requests(user_input)})
+        return json.dumps({"requested_info": _requests(user_input)})
+    if "CLAIMED ROLE" in prompt:
+        return json.dumps({"integrity_score": 7, "reasoning": "The role plausibly belongs in this domain."})
+    if "predicted_score" in prompt:
+        return json.dumps({"predicted_score": 6, "reasoning": "Similar to the rated examples."})
+    if "turn_analysis" in prompt:
+        return json.dumps({
+            "strengths": ["Used urgency early"],
+            "weaknesses": ["Asked for critical data before building trust"],
+            "turn_analysis": {"Turn 1": "Clear pretext, request came too soon."},
+            "suggestions": ["Build rapport first", "Stay consistent with the claimed role", "Use one deadline"],
+        })
+    return "Your score is 6 out of ten. Good use of urgency, but you asked for the OTP too early."
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Set by serve(): seconds to wait per endpoint, and jitter as a fraction of it
+    latency = {"chat": 0.0, "transcription": 0.0, "speech": 0.0}
+    jitter = 0.0
+    counts = {"chat": 0, "transcription": 0, "speech": 0}
+    counts_lock = threading.Lock()
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _delay(self, endpoint: str, body: bytes) -> None:
+        base = self.latency.get(endpoint, 0.0)
+        if base <= 0:
+            return
+        spread = random.Random(zlib.crc32(body)).uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        time.sleep(max(0.0, base * (1 + spread)))
+
+    def _stream_chat(self, request, body: bytes, content: str, prompt_tokens: int) -> None:
+        """Chunked SSE reply: first token after 30% of the latency, the rest spread over the words."""
+        words = re.findall(r"\S+\s*", content) or [content]
+        base = self.latency.get("chat", 0.0)
+        chunk_id = f"chatcmpl-fake-{zlib.crc32(body):08x}"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def event(payload) -> None:
+            data = f"data: {payload if isinstance(payload, str) else json.dumps(payload)}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        time.sleep(base * 0.3)
+        for word in words:
+            event({"id": chunk_id, "object": "chat.completion.chunk", "created": 0,
+                   "model": request.get("model", "gpt-4o"),
+                   "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]})
+            time.sleep(base * 0.7 / len(words))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            event({"id": chunk_id, "object": "chat.completion.chunk", "created": 0,
+                   "model": request.get("model", "gpt-4o"), "choices": [],
+                   "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": _tokens(content),
+                             "total_tokens": prompt_tokens + _tokens(content)}})
+        event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send(self, status: int, payload: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _count(self, endpoint: str) -> None:
+        with self.counts_lock:
+            self.counts[endpoint] += 1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        path = self.path.split("?")[0].rstrip("/")
+
+        if path.endswith("/chat/completions"):
+            request = json.loads(body or b"{}")
+            content = chat_answer(request.get("messages", []))
+            prompt_tokens = _tokens(json.dumps(request.get("messages", [])))
+            self._count("chat")
+            if request.get("stream"):
+                self._stream_chat(request, body, content, prompt_tokens)
+                return
+            self._delay("chat", body)
+            reply = {
+                "id": f"chatcmpl-fake-{zlib.crc32(body):08x}",
+                "object": "chat.completion",
+                "created": 0,
+                "model": request.get("model", "gpt-4o"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": _tokens(content),
+                          "total_tokens": prompt_tokens + _tokens(content)},
+            }
+            self._send(200, json.dumps(reply).encode("utf-8"), "application/json")
+        elif path.endswith("/audio/transcriptions"):
+            self._count("transcription")
+            self._delay("transcription", body)
+            self._send(200, json.dumps({"text": TRANSCRIPT}).encode("utf-8"), "application/json")
+        elif path.endswith("/audio/speech"):
+            self._count("speech")
+            self._delay("speech", body)
+            self._send(200, SPEECH_BYTES, "audio/mpeg")
+        else:
+            self._send(404, json.dumps({"error": {"message": f"Unknown path {self.path}"}}).encode("utf-8"),
+                       "application/json")
+
+
+def serve(port: int = 0, chat_latency: float = 0.0, audio_latency: float = 0.0, jitter: float = 0.0):
+    """
+    Start the server on a background thread. Returns (server, base_url);
+    call server.shutdown() when done. Port 0 picks a free port.
+    """
+    handler = type("Handler", (FakeOpenAIHandler,), {
+        "latency": {"chat": chat_latency, "transcription": audio_latency, "speech": audio_latency},
+        "jitter": jitter,
+        "counts": {"chat": 0, "transcription": 0, "speech": 0},
+    })
+    # The default listen backlog (5) overflows when many sessions connect at once, and
+    # the dropped SYNs show up as ~1 s retransmit stalls in the latency percentiles
+    server_cls = type("Server", (ThreadingHTTPServer,), {"request_queue_size": 128})
+    server = server_cls(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--chat-latency", type=float, default=0.4, help="seconds per chat completion")
+    parser.add_argument("--audio-latency", type=float, default=0.8, help="seconds per transcription / speech call")
+    parser.add_argument("--jitter", type=float, default=0.2, help="+/- fraction of the latency, deterministic per request")
+    args = parser.parse_args()
+
+    server, base_url = serve(args.port, args.chat_latency, args.audio_latency, args.jitter)
+    print(f"Fake OpenAI API on {base_url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
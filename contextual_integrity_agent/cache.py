@@ -0,0 +1,95 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def normalize_key(text: str) -> str:
+    """Lower-case, drop punctuation and collapse whitespace so "Bank  Manager." == "bank manager"."""
+    text = re.sub(r"[^\w\s]", " ", (text or "").lower())
+    return " ".join(text.split())
+
+
+class IntegrityCache:
+    """
+    Disk-backed memo of LLM integrity scores, shared by every session in the
+    process and surviving restarts. Entries are keyed on normalized
+    (domain, role), expire after ttl_seconds, are evicted least-recently-used
+    beyond max_entries, and are dropped wholesale when the version (a hash of
+    the prompt that produced them) changes.
+    """
+
+    def __init__(self, path: str, max_entries: int = 2000, ttl_seconds: float = 7 * 24 * 3600, version: str = ""):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS integrity_cache ("
+                " key TEXT PRIMARY KEY, version TEXT, value TEXT, created REAL, last_used REAL)"
+            )
+            self._conn.execute("DELETE FROM integrity_cache WHERE version != ?", (version,))
+
+    def _key(self, domain: str, role: str) -> str:
+        return f"{self.version}|{normalize_key(domain)}|{normalize_key(role)}"
+
+    def get(self, domain: str, role: str) -> Optional[Dict[str, Any]]:
+        key = self._key(domain, role)
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, created FROM integrity_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM integrity_cache WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE integrity_cache SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, domain: str, role: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO integrity_cache (key, version, value, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (self._key(domain, role), self.version, json.dumps(value), now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM integrity_cache WHERE key IN ("
+                " SELECT key FROM integrity_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+_caches: Dict[str, IntegrityCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_integrity_cache(path: str, version: str, **kwargs) -> IntegrityCache:
+    """One cache object per (file, version) per process, so hit/miss counters are shared across sessions."""
+    with _caches_lock:
+        key = f"{os.path.abspath(path)}|{version}"
+        if key not in _caches:
+            _caches[key] = IntegrityCache(path, version=version, **kwargs)
+        return _caches[key]
@@ -0,0 +1,96 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+import config
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=config.HTTP_KEEPALIVE_SECONDS,
+    )
+
+
+def _key(api_key: str, base_url: str = None) -> str:
+    # Hashed so the registry's own keys and entries never contain the API key;
+    # it is only held by the clients built from it
+    return hashlib.sha256(f"{api_key}|{base_url or ''}".encode("utf-8")).hexdigest()
+
+
+class _Registry:
+    """
+    Process-wide clients and agents per (API key, base URL). Every
+    Streamlit session and rerun with the same key gets the same objects, so
+    connections (TCP + TLS) and the agent's loaded data are set up once per
+    process. Only the `max_keys` most recently used keys are kept.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, api_key: str, base_url: str = None) -> Dict[str, Any]:
+        key = _key(api_key, base_url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                # Reentrant: building an agent asks for the clients of the same entry
+                entry = self._entries[key] = {"lock": threading.RLock()}
+                while len(self._entries) > self.max_keys:
+                    # Dropped objects stay usable by whoever still holds them
+                    self._entries.popitem(last=False)
+            self._entries.move_to_end(key)
+            return entry
+
+    def get(self, api_key: str, base_url: str, name: str, factory) -> Any:
+        """The object `name` for this key, built by calling `factory()` on first use."""
+        entry = self._entry(api_key, base_url)
+        # Per-key lock: a slow agent build for one key doesn't block other keys
+        with entry["lock"]:
+            if name not in entry:
+                entry[name] = factory()
+            return entry[name]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_registry = _Registry(max_keys=config.CLIENT_REGISTRY_MAX_KEYS)
+
+
+def get_client(api_key: str, base_url: str = None) -> OpenAI:
+    """Shared sync client with a keep-alive connection pool; safe to use from many threads."""
+    return _registry.get(api_key, base_url, "client", lambda: OpenAI(
+        api_key=api_key, base_url=base_url,
+        http_client=DefaultHttpxClient(limits=_limits(), timeout=config.HTTP_TIMEOUT_SECONDS),
+    ))
+
+
+def get_async_client(api_key: str, base_url: str = None) -> AsyncOpenAI:
+    """Shared async client. Its pool is bound to the first event loop that uses it."""
+    return _registry.get(api_key, base_url, "async_client", lambda: AsyncOpenAI(
+        api_key=api_key, base_url=base_url,
+        http_client=DefaultAsyncHttpxClient(limits=_limits(), timeout=config.HTTP_TIMEOUT_SECONDS),
+    ))
+
+
+def get_agent(api_key: str, base_url: str = None, **kwargs):
+    """
+    Shared VoiceFishingAgent for this key. The agent keeps no per-conversation
+    state (history is passed to process), so concurrent sessions can use it.
+    Different constructor options get different agents.
+    """
+    from agent4 import VoiceFishingAgent
+
+    name = "agent|" + "|".join(f"{k}={v!r}" for k, v in sorted(kwargs.items()))
+    return _registry.get(api_key, base_url, name, lambda: VoiceFishingAgent(
+        get_client(api_key, base_url), async_client=get_async_client(api_key, base_url), **kwargs
+    ))
@@ -55,6 +55,56 @@ INFO_CATEGORIES_CONTEXTUAL_INTEGRITY = {
     ]
 }
 
+# Plain-word phrases for each information category, used by the local request matcher.
+# The category name itself (underscores as spaces) always matches too.
+# Bare words that mean something else in everyday speech ("statement", "position",
+# "pin", "income", "id") are only listed inside longer phrases.
+# A phrase may name categories of different domains ("national id" is the telecom
+# id_number and the government civil_id); the domain filter picks one. It must not
+# name two categories of the same domain.
+REQUEST_SYNONYMS = {
+    "name": ["full name", "first name", "last name", "surname"],
+    "location": ["where you are", "where are you", "your city"],
+    "job": ["job title", "occupation", "job position", "what you do for work"],
+    "phone": ["phone number", "mobile number", "cell number", "telephone", "contact number"],
+    "email": ["email address", "e-mail", "e-mail address", "mail address"],
+    "account_balance": ["balance", "bank balance", "available balance", "how much money"],
+    "branch": ["branch name", "branch location", "which branch"],
+    "otp": ["one-time password", "one time password", "one-time code", "one time code", "one-time pin",
+            "verification code", "security code", "authentication code", "sms code", "passcode"],
+    "password": ["pass word", "login password", "pin code", "pin number", "card pin", "atm pin", "unlock password"],
+    "ssn": ["social security", "social security number", "social security no", "s.s.n"],
+    "account_number": ["account no", "acct number", "bank account number", "iban"],
+    "credit_card": ["credit card number", "card number", "card details", "debit card", "debit card number"],
+    "sim_number": ["sim", "sim card", "sim card number", "iccid", "sim serial"],
+    "billing_address": ["billing details", "bill address"],
+    "puk_code": ["puk", "puk number", "unblocking key", "personal unblocking key"],
+    "id_number": ["id card number", "identity number", "identification number", "national id"],
+    "case_number": ["case no", "case id", "case reference", "docket number", "file number"],
+    "address": ["home address", "street address", "residential address", "residence", "where you live"],
+    "passport_number": ["passport", "passport no", "passport details"],
+    "confession_statement": ["confession", "confession statement", "signed statement", "written statement"],
+    "witness_identity": ["witness", "witness name", "witness details", "identity of the witness"],
+    "civil_id": ["civil id number", "civil number", "civil card", "national id"],
+    "salary_details": ["salary", "pay slip", "payslip", "monthly income", "annual income", "income details", "wages"],
+    "tax_records": ["tax record", "tax return", "tax returns", "tax file", "tax documents"],
+}
+
+# Roles the local role extractor knows besides the "role" columns of the rating CSVs
+ROLE_LEXICON_EXTRA = [
+    "Bank Manager", "IT Support", "IT Specialist", "Student", "Doctor", "Teacher", "English Teacher",
+    "Judge", "Attorney", "Lawyer", "Legal Consultant", "Legal Assistant", "Prosecutor", "Public Servant",
+    "Telecom Engineer", "Software Engineer", "Chef", "Accountant", "Auditor", "Bank Employee",
+    "Technical Support Agent", "Benefits Coordinator", "Tax Officer", "Government Official",
+]
+
+# Misspellings seen in transcripts (see tools4.main), mapped to the word they stand for
+ROLE_MISSPELLINGS = {
+    "specialist": ["specilaist", "specalist", "specialst"],
+    "teacher": ["teatcher", "teacer"],
+    "working": ["wroging", "workng", "workin"],
+}
+
 # Trust thresholds for decision making
 TRUST_THRESHOLDS_ = {
     "reveal_threshold": 0.7,  # Minimum trust score to reveal information
@@ -156,6 +206,146 @@ AGENT_PERSONAS = {
 }
 
 
+# Stage execution
+# Run independent pipeline stages (and the two integrity calls) in parallel
+CONCURRENT_STAGES = True
+# Threads in each process-wide pool (stages, integrity calls); shared by every agent,
+# so sessions and agents created by the client registry don't each start their own
+STAGE_MAX_WORKERS = 16
+# Extract role and requested info with one fused LLM call instead of two
+FUSED_EXTRACTION = False
+
+
+# Domain-role integrity cache (SQLite, shared across sessions and restarts)
+# Set INTEGRITY_CACHE_PATH to None to always ask the LLM
+INTEGRITY_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "integrity_cache.sqlite3")
+INTEGRITY_CACHE_MAX_ENTRIES = 2000
+INTEGRITY_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+
+# Few-shot examples for request-role integrity
+# "similar": top-k rated examples closest to the claimed role and requested item
+# "head": the first twelve examples of the domain, as originally shipped
+FEW_SHOT_MODE = "similar"
+FEW_SHOT_K = 6
+
+
+# Request-role integrity scorer
+# "llm": always ask gpt-4o
+# "local": kNN over the labeled ratings, falling back to gpt-4o when confidence is low
+REQUEST_ROLE_SCORER = "llm"
+LOCAL_SCORER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "local_integrity_scorer.pkl")
+LOCAL_SCORER_K = 5
+LOCAL_SCORER_MIN_CONFIDENCE = 0.4
+
+
+# Resolve requested info with the local phrase matcher first; ask the LLM only when it is unsure
+REQUEST_MATCHER_FAST_PATH = True
+# Extract claimed roles with local patterns first; ask the LLM only when unsure
+ROLE_MATCHER_FAST_PATH = True
+
+
+# Trigger-word lexicons (trigger phrase, victim reaction, score, keyword) shipped with the project.
+# Earlier files win when both list the same keyword.
+TRIGGER_WORD_FILES = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "trigger_words.xlsx"),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data.csv"),
+]
+# Summed trigger scores in one utterance that map to the maximum pressure score of 10
+TRIGGER_PRESSURE_SATURATION = 20
+
+
+# Persona refusals (see rejection_bank.py): "bank" picks a pre-generated reply locally,
+# "llm" asks the model for every refusal. The LLM is still used when the bank has no match.
+REJECTION_MODE = "bank"
+REJECTION_BANK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "rejection_bank.json")
+REJECTION_BANK_MAX_VARIANTS = 8
+# Add freshly generated variants to the bank in the background while the app runs
+REJECTION_BANK_REFRESH = False
+REJECTION_BANK_REFRESH_INTERVAL = 600
+
+
+# Per-turn span export (see metrics.py): None, "prometheus" or "otlp"
+# prometheus: text exposition format served on http://0.0.0.0:METRICS_PORT/metrics
+# otlp: spans posted as OTLP/HTTP JSON to a local collector at OTLP_ENDPOINT
+METRICS_EXPORTER = os.getenv("METRICS_EXPORTER") or None
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+OTLP_ENDPOINT = os.getenv("OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+METRICS_SERVICE_NAME = "contextual-integrity-agent"
+
+
+# FeedbackAgent prompt compaction (see prompt_compaction.py): approximate token budget for
+# the conversation part of each prompt; older turns are summarized in blocks when it is exceeded
+FEEDBACK_PROMPT_TOKENS = 3000
+FEEDBACK_SUMMARY_BLOCK = 4
+# Share of the budget the newest turns may take verbatim
+FEEDBACK_VERBATIM_SHARE = 0.7
+
+
+# Cross-session results store (see results_store.py): every turn appended as Parquet,
+# partitioned by domain and day. Set RESULTS_STORE_DIR to None to disable.
+RESULTS_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results_store")
+# Write-behind batching: a batch is written at this many rows or after this many seconds
+RESULTS_FLUSH_ROWS = 200
+RESULTS_FLUSH_SECONDS = 5
+
+
+# Streamed replies in the UI: tokens go to the chat bubble as they arrive and each
+# finished sentence is sent to TTS right away (sidebar toggle, this is the default)
+STREAMING_REPLIES = True
+# Sentences shorter than this are held back and spoken with the next one
+TTS_MIN_SENTENCE_CHARS = 25
+TTS_WORKERS = 3
+
+
+# Shared OpenAI clients and agents (see clients.py): one per API key per process
+CLIENT_REGISTRY_MAX_KEYS = 32
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE = 20
+HTTP_KEEPALIVE_SECONDS = 120
+HTTP_TIMEOUT_SECONDS = 60
+
+
+# Conversation memory per domain tab (see conversation_store.py): the newest
+# CONVERSATION_WINDOW messages stay in session state, older ones go to SQLite
+CONVERSATION_WINDOW = 30
+CONVERSATION_PAGE_SIZE = 20
+CONVERSATION_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "conversations.sqlite3")
+CONVERSATION_DB_TTL_SECONDS = 24 * 3600
+# Approximate tokens of user / assistant history handed to the agent per turn
+CONVERSATION_HISTORY_TOKENS = 1500
+# Recording hashes remembered per tab to skip re-processing the same recording on reruns
+PROCESSED_AUDIO_HASHES_MAX = 50
+
+
+# Text-to-speech and its on-disk clip cache (see tts_cache.py), keyed by hash of (model, voice, text)
+TTS_MODEL = "tts-1"
+TTS_VOICE = "alloy"
+# Set TTS_CACHE_DIR to None to always call the API
+TTS_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "tts")
+TTS_CACHE_MAX_BYTES = 200 * 1024 * 1024
+# Render every persona's greeting and single-item reveal replies in the background at startup
+TTS_PREWARM = True
+
+# Reply clips kept per session for replay (see audio_store.py); older turns are text only
+AUDIO_STORE_MAX_CLIPS = 10
+AUDIO_STORE_MAX_BYTES = 8 * 1024 * 1024
+
+
+# Recording preprocessing before Whisper (see audio_prep.py)
+AUDIO_PREPROCESS = True
+# Frames quieter than this (dBFS) count as silence; pauses inside speech are cut to AUDIO_MAX_PAUSE_SECONDS
+AUDIO_SILENCE_DB = -45
+AUDIO_MAX_PAUSE_SECONDS = 0.6
+# "opus", "flac" or None for 16 kHz WAV; needs ffmpeg on the PATH, WAV is used otherwise
+AUDIO_UPLOAD_CODEC = "opus"
+# Recordings over either cap are rejected before upload (Whisper's own limit is 25 MB)
+AUDIO_MAX_INPUT_BYTES = 25 * 1024 * 1024
+AUDIO_MAX_SECONDS = 300
+# Assumed client uplink (about 1 Mbit/s) when estimating what an unprocessed upload would have cost
+AUDIO_UPLINK_BYTES_PER_SECOND = 125_000
+
+
 # Logging configuration
 LOGGING_CONFIG = {
     "level": "INFO",
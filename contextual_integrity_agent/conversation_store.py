@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterator, List
+
+import config
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token), good enough for budgeting."""
+    return len(text or "") // 4 + 1
+
+
+class SpillDatabase:
+    """
+    SQLite file holding the messages that scrolled out of every session's
+    in-memory window. Sessions end without telling us, so rows older than
+    ttl_seconds are deleted when the file is opened.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = None):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                " conversation TEXT, seq INTEGER, message TEXT, created REAL, PRIMARY KEY (conversation, seq))"
+            )
+            ttl_seconds = config.CONVERSATION_DB_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+            self._conn.execute("DELETE FROM messages WHERE created < ?", (time.time() - ttl_seconds,))
+
+    def spill(self, conversation: str, seq: int, message: Dict[str, Any]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO messages (conversation, seq, message, created) VALUES (?, ?, ?, ?)",
+                (conversation, seq, json.dumps(message, ensure_ascii=False, default=str), time.time()),
+            )
+
+    def page(self, conversation: str, before_seq: int, limit: int) -> List[Dict[str, Any]]:
+        """Up to `limit` messages just before before_seq, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT message FROM messages WHERE conversation = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+                (conversation, before_seq, limit),
+            ).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def delete(self, conversation: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages WHERE conversation = ?", (conversation,))
+
+
+_databases: Dict[str, SpillDatabase] = {}
+_databases_lock = threading.Lock()
+
+
+def get_spill_database(path: str = None) -> SpillDatabase:
+    """One connection per file per process, shared by all sessions."""
+    key = os.path.abspath(path or config.CONVERSATION_DB_PATH)
+    with _databases_lock:
+        if key not in _databases:
+            _databases[key] = SpillDatabase(key)
+        return _databases[key]
+
+
+class ConversationStore:
+    """
+    One domain tab's conversation: the newest `window` messages in a ring
+    buffer, older ones spilled to SQLite and read back a page at a time only
+    when the user scrolls up. Messages are dicts with at least "role" and
+    "content"; they should be complete when appended, since spilled copies
+    are not updated.
+    """
+
+    def __init__(self, conversation_id: str, window: int = None, database: SpillDatabase = None):
+        self.conversation_id = conversation_id
+        self.window = window or config.CONVERSATION_WINDOW
+        self.database = database or get_spill_database()
+        self._recent: "deque[Dict[str, Any]]" = deque()
+        # Sequence number of the oldest message still in memory; everything before it is on disk
+        self._first_seq = 0
+
+    def __len__(self) -> int:
+        return self._first_seq + len(self._recent)
+
+    @property
+    def spilled(self) -> int:
+        return self._first_seq
+
+    def append(self, message: Dict[str, Any]) -> None:
+        self._recent.append(message)
+        while len(self._recent) > self.window:
+            self.database.spill(self.conversation_id, self._first_seq, self._recent.popleft())
+            self._first_seq += 1
+
+    def recent(self) -> List[Dict[str, Any]]:
+        return list(self._recent)
+
+    def older(self, pages: int, page_size: int = None) -> List[Dict[str, Any]]:
+        """The `pages` pages of spilled messages just before the in-memory window, oldest first."""
+        page_size = page_size or config.CONVERSATION_PAGE_SIZE
+        return self.database.page(self.conversation_id, self._first_seq, pages * page_size)
+
+    def _newest_first(self) -> Iterator[Dict[str, Any]]:
+        yield from reversed(self._recent)
+        before = self._first_seq
+        while before > 0:
+            page = self.database.page(self.conversation_id, before, config.CONVERSATION_PAGE_SIZE)
+            if not page:
+                return
+            yield from reversed(page)
+            before -= len(page)
+
+    def history(self, token_budget: int = None, roles=("user", "assistant")) -> List[Dict[str, str]]:
+        """
+        The most recent user / assistant turns that fit in token_budget, in
+        order, as {"role", "content"} dicts for the agent. Reaches into the
+        spilled messages only if the window alone doesn't fill the budget.
+        """
+        token_budget = config.CONVERSATION_HISTORY_TOKENS if token_budget is None else token_budget
+        history, used = [], 0
+        for message in self._newest_first():
+            if message["role"] not in roles:
+                continue
+            cost = estimate_tokens(message["content"])
+            if used + cost > token_budget:
+                break
+            history.append({"role": message["role"], "content": message["content"]})
+            used += cost
+        history.reverse()
+        return history
+
+    def clear(self) -> None:
+        self.database.delete(self.conversation_id)
+        self._recent.clear()
+        self._first_seq = 0
+
+
+class RecentSet:
+    """Set that remembers only its `maxlen` most recently added items."""
+
+    def __init__(self, maxlen: int):
+        self.maxlen = maxlen
+        self._items: "OrderedDict[Any, None]" = OrderedDict()
+
+    def __contains__(self, item) -> bool:
+        return item in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, item) -> None:
+        self._items[item] = None
+        self._items.move_to_end(item)
+        while len(self._items) > self.maxlen:
+            self._items.popitem(last=False)
@@ -0,0 +1,86 @@
+import re
+import math
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List
+
+# Words that carry no signal for matching roles or requests
+STOPWORDS = {
+    "a", "an", "the", "to", "of", "and", "or", "for", "in", "on", "your", "you", "me", "my", "i",
+    "we", "our", "is", "are", "be", "can", "could", "please", "so", "that", "this", "with", "it",
+    "do", "may", "need", "have", "just", "will", "would", "us",
+}
+
+# How much the role field counts against the request field when ranking
+ROLE_WEIGHT = 0.5
+REQUEST_WEIGHT = 0.5
+
+
+def features(text: str) -> Counter:
+    """Word tokens plus character trigrams, so misspelt roles ("Specilaist") still match."""
+    words = [w for w in re.findall(r"[a-z0-9]+", (text or "").lower().replace("_", " ")) if w not in STOPWORDS]
+    grams = [f"#{w[i:i + 3]}" for w in words if len(w) > 3 for i in range(len(w) - 2)]
+    return Counter(words + grams)
+
+
+class _TfIdfField:
+    """Inverted TF-IDF index over one text field of the examples."""
+
+    def __init__(self, texts: List[str]):
+        counts = [features(text) for text in texts]
+        doc_freq = Counter(term for count in counts for term in count)
+        n = len(texts)
+        self.idf = {term: math.log((n + 1) / (df + 1)) + 1 for term, df in doc_freq.items()}
+        self.postings = defaultdict(list)
+        for doc_id, count in enumerate(counts):
+            vector = self._weigh(count)
+            for term, weight in vector.items():
+                self.postings[term].append((doc_id, weight))
+
+    def _weigh(self, count: Counter) -> Dict[str, float]:
+        vector = {term: tf * self.idf[term] for term, tf in count.items() if term in self.idf}
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+        return {term: w / norm for term, w in vector.items()}
+
+    def scores(self, text: str) -> Dict[int, float]:
+        """Cosine similarity of text against every document sharing a term with it."""
+        result = defaultdict(float)
+        for term, q_weight in self._weigh(features(text)).items():
+            for doc_id, d_weight in self.postings.get(term, ()):
+                result[doc_id] += q_weight * d_weight
+        return result
+
+
+class ExampleIndex:
+    """
+    Local lexical index over the role and request phrase of every labeled
+    rating. Returns the top-k examples most similar to a (role, requested
+    item) query; runs on CPU with no network.
+    """
+
+    def __init__(self, records: List[Dict[str, Any]]):
+        self.records = records
+        self._roles = _TfIdfField([r["role"] for r in records])
+        self._requests = _TfIdfField([r["request"] for r in records])
+
+    def search(self, role: str, request: str, domain: str = None, k: int = 6, exclude: Iterable[int] = ()) -> List[Dict[str, Any]]:
+        """
+        Top-k records by weighted role + request similarity, restricted to the
+        domain when it has any examples. Ties (including all-zero scores) keep
+        file order, so an empty query degrades to the old head(k) selection.
+        """
+        role_scores = self._roles.scores(role)
+        request_scores = self._requests.scores(request)
+        excluded = set(exclude)
+
+        candidates = [
+            i for i, r in enumerate(self.records)
+            if i not in excluded and (domain is None or r["domain"] == domain.lower())
+        ]
+        if not candidates and domain is not None:
+            candidates = [i for i in range(len(self.records)) if i not in excluded]
+
+        similarity = {
+            i: ROLE_WEIGHT * role_scores.get(i, 0.0) + REQUEST_WEIGHT * request_scores.get(i, 0.0) for i in candidates
+        }
+        ranked = sorted(candidates, key=lambda i: (-similarity[i], i))
+        return [dict(self.records[i], index=i, similarity=similarity[i]) for i in ranked[:k]]
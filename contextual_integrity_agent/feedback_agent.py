@@ -0,0 +1,270 @@
+import hashlib
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from langchain_core.output_parsers import JsonOutputParser
+
+import config
+from prompt_compaction import compact_results, render
+from turn_record import TurnRecord
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def results_fingerprint(results: List[TurnRecord]) -> str:
+    """Content hash of a results list; equal results give equal feedback inputs."""
+    payload = "\n".join(record.to_json() for record in results)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def score_from_metrics(metrics: Dict[str, Any]) -> float:
+    score = 10
+    score -= metrics["mistakes"] * 1.5
+    score -= metrics["info_ratio"] * 2
+    score += min(metrics["trigger_count"], 5) * 0.5
+    score += metrics["trust_increases"] * 0.2
+    return max(0, min(10, round(score, 1)))
+
+
+class MetricsAccumulator:
+    """
+    FeedbackAgent's metrics kept up to date one turn at a time. add() folds
+    one TurnRecord's counters (triggers, revealed items, breaches, trust
+    change) into running totals in O(1), and metrics() / score() equal
+    compute_metrics() / calculate_score() over the same TurnRecords.
+    """
+
+    def __init__(self):
+        self.turns = 0
+        self.trigger_count = 0
+        self.trust_increases = 0
+        self.trust_decreases = 0
+        self.info_revealed = 0
+        self.mistakes = 0
+        self.first_trust = None
+        self.last_trust = None
+
+    @classmethod
+    def from_results(cls, results: List[TurnRecord]) -> "MetricsAccumulator":
+        accumulator = cls()
+        for result in results:
+            accumulator.add(result)
+        return accumulator
+
+    def add(self, result: TurnRecord) -> None:
+        trust = result.trust_score
+        if self.last_trust is not None:
+            self.trust_increases += trust > self.last_trust
+            self.trust_decreases += trust < self.last_trust
+        else:
+            self.first_trust = trust
+        self.last_trust = trust
+        self.turns += 1
+        self.trigger_count += len(result.triggers)
+        self.info_revealed += len(result.info_to_reveal)
+        self.mistakes += result.mistakes
+
+    def metrics(self) -> Dict[str, Any]:
+        if self.turns == 0:
+            phase_trend = "neutral"
+        else:
+            phase_trend = "increment" if self.last_trust > self.first_trust else "decrement"
+        return {
+            "trigger_count": self.trigger_count,
+            "trigger_repetition": self.trigger_count / max(1, self.turns),
+            "trust_increases": self.trust_increases,
+            "trust_decreases": self.trust_decreases,
+            "info_revealed": self.info_revealed,
+            "info_ratio": self.info_revealed / max(1, self.turns),
+            "mistakes": self.mistakes,
+            "phase_trend": phase_trend
+        }
+
+    def score(self) -> float:
+        return score_from_metrics(self.metrics())
+
+
+# ---------- FEEDBACK AGENT ----------
+class FeedbackAgent:
+    def __init__(self, conversation_results: List[TurnRecord], llm, accumulator: MetricsAccumulator = None):
+        self.results = conversation_results
+        self.llm = llm
+        # Metrics kept live while the conversation ran; used when it covers exactly these results
+        self.accumulator = accumulator
+        self.metrics = {}
+        self.score = 0
+        self.feedback_text = {}
+        self.prompt_stats = {}
+        self._conversation = None
+
+    # ---------- LOGIC ANALYSIS ----------
+    def analyze_triggers(self):
+        trigger_count = sum(len(r.triggers) for r in self.results)
+        trigger_repetition = trigger_count / max(1, len(self.results))
+        return trigger_count, trigger_repetition
+
+    def analyze_trust_trends(self):
+        trust_scores = [r.trust_score for r in self.results]
+        increases = sum(1 for i in range(1, len(trust_scores)) if trust_scores[i] > trust_scores[i-1])
+        decreases = sum(1 for i in range(1, len(trust_scores)) if trust_scores[i] < trust_scores[i-1])
+        return increases, decreases
+
+    def analyze_info_ratio(self):
+        total_msgs = len(self.results)
+        total_info = sum(len(r.info_to_reveal) for r in self.results)
+        ratio = total_info / max(1, total_msgs)
+        return total_info, ratio
+
+    def analyze_mistakes(self):
+        return sum(r.mistakes for r in self.results)
+
+    def analyze_phases(self):
+        trust_scores = [r.trust_score for r in self.results]
+        if not trust_scores:
+            return "neutral"
+        return "increment" if trust_scores[-1] > trust_scores[0] else "decrement"
+
+    def compute_metrics(self):
+        accumulator = self.accumulator
+        if accumulator is None or accumulator.turns != len(self.results):
+            # One pass over the results instead of one per metric
+            accumulator = MetricsAccumulator.from_results(self.results)
+        self.metrics = accumulator.metrics()
+
+    def calculate_score(self):
+        self.score = score_from_metrics(self.metrics)
+
+    # ---------- PROMPT COMPACTION ----------
+    def conversation_digest(self) -> str:
+        """The results as compact per-turn records within the token budget, built once per agent."""
+        if self._conversation is None:
+            records, self.prompt_stats = compact_results(self.results)
+            logger.info(f"Feedback prompt: {self.prompt_stats['raw_tokens']} -> {self.prompt_stats['compact_tokens']} "
+                        f"tokens ({self.prompt_stats['summarized_turns']}/{self.prompt_stats['turns']} turns summarized)")
+            self._conversation = render(records)
+        return self._conversation
+
+    # ---------- AI FEEDBACK ----------
+    def generate_ai_feedback(self):
+        prompt = f"""
+        You are a **phishing training coach**. 
+        The trainee is acting as the attacker, and the AI agent is the victim. 
+
+        Your job is to evaluate how good the trainee was at performing a social engineering (vishing) attack.
+
+        Focus heavily on:
+        - How well they applied **time pressure** (urgency, deadlines, fear of missing out).
+        - How well they used **trigger words** and psychological manipulation.
+        - The **quality of user inputs** (were they convincing? manipulative? sloppy?).
+        - If trust scores increased or decreased, explain *why* that happened.
+        - If information was revealed, explain how it was obtained.
+        - If mistakes happened, explain what they were and why they weakened the attack.
+
+        Metrics summary:
+        {self.metrics}
+
+        Conversation (user = attacker, agent = victim), one JSON record per turn.
+        Records with "turns" summarize a range of earlier turns:
+        {self.conversation_digest()}
+
+        Provide JSON with:
+        {{
+            "strengths": ["..."],
+            "weaknesses": ["..."],
+            "turn_analysis": {{
+                "Turn 1": "Feedback on user input + agent response",
+                "Turn 2": "Feedback ...",
+                ...
+            }},
+            "suggestions": ["...", "...", "..."]
+        }}
+        """
+        parser = JsonOutputParser()
+        response = self.llm.chat.completions.create(
+            model=config.OPENAI_MODEL,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        parsed = parser.parse(response.choices[0].message.content)
+        self.feedback_text = parsed
+        return parsed
+
+    # ---------- RUN PIPELINE ----------
+    def run(self):
+        self.compute_metrics()
+        self.calculate_score()
+        self.generate_ai_feedback()
+        return {
+            "score": self.score,
+            "metrics": self.metrics,
+            "feedback": self.feedback_text
+        }
+
+# -------------VOICE FEEDBACK -------------------------------------------
+TRUST_THRESHOLDS = {
+    "no_info": (0, 3.9999),
+    "basic_info": (4, 6.9999),
+    "sensitive_info": (7, 8.9999),
+    "critical_info": (9, 10.0000)
+}
+
+INFO_CATEGORIES = {
+    "basic": ["name", "location", "job"],
+    "sensitive": ["phone", "email", "address"], 
+    "critical": ["password", "ssn", "account", "credit_card"]
+}
+
+class FeedbackAgent(FeedbackAgent):
+    def generate_ai_voice_feedback(self):
+        feedback_data = {
+            "score": self.score,
+            "metrics": self.metrics,
+            "results": self.conversation_digest(),
+            "trust_thresholds": TRUST_THRESHOLDS,
+            "info_categories": INFO_CATEGORIES
+        }
+
+        prompt = f"""
+            You are a phishing training coach speaking directly to a trainee. 
+            Provide a conversational, informal voice-style feedback about their vishing attempt.
+
+            Example of how to speak (short, informal, 3 sentences): 
+            'uyour total score is 6.5 out of ten and i'll tell u why exactly u lost a few points and what good things u did. 
+            When u asked me for a password but ur trust score wasn't high enough yet, that was a mistake—be careful to gain my trust first before asking for info! 
+            Also, ur use of time pressure was good but u didn't use it consistently, but u did well on being polite and building context.'
+
+            Now, using the following data:
+
+            - Total Score: {feedback_data['score']}
+            - Metrics: {feedback_data['metrics']}
+            - Conversation Results: {feedback_data['results']}
+            - Trust Thresholds: {feedback_data['trust_thresholds']}
+            - Info Categories: {feedback_data['info_categories']}
+
+            Provide a feedback in the same style as the example above, highlighting mistakes, good actions, and advice for improvement.
+            Output as a single coherent text suitable for reading aloud.
+            """
+
+        response = self.llm.chat.completions.create(
+            model=config.OPENAI_MODEL,
+            messages=[{"role": "user", "content": prompt}]
+        )
+
+        self.voice_feedback = response.choices[0].message.content
+        return self.voice_feedback
+
+    def start(self, executor: ThreadPoolExecutor) -> Dict[str, Future]:
+        """
+        Compute metrics and score right away, then run the text and the voice
+        feedback calls side by side on the executor. Both only read the
+        metrics, score and results. Returns {"feedback": Future, "voice_feedback": Future}.
+        """
+        self.compute_metrics()
+        self.calculate_score()
+        self.conversation_digest()
+        return {
+            "feedback": executor.submit(self.generate_ai_feedback),
+            "voice_feedback": executor.submit(self.generate_ai_voice_feedback),
+        }
@@ -0,0 +1,124 @@
+import os
+import json
+import math
+import pickle
+import hashlib
+import logging
+import argparse
+import statistics
+from pathlib import Path
+from typing import Any, Dict, List
+
+import config
+from example_index import ExampleIndex
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ARTIFACT_VERSION = 1
+
+
+def records_fingerprint(records: List[Dict[str, Any]]) -> str:
+    payload = json.dumps([(r["domain"], r["role"], r["request"], r["rating"]) for r in records], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class LocalIntegrityScorer:
+    """
+    kNN regressor over the labeled role/request ratings. Predicts the
+    request-role integrity score as the similarity-weighted mean rating of
+    the k nearest examples in the same domain, in well under a millisecond.
+
+    Confidence is the closest neighbour's similarity scaled down by how much
+    the neighbours' ratings disagree; callers fall back to the LLM below a threshold.
+    """
+
+    def __init__(self, records: List[Dict[str, Any]], k: int = 5):
+        self.k = k
+        self.index = ExampleIndex(records)
+        self.fingerprint = records_fingerprint(records)
+
+    def predict(self, role: str, request: str, domain: str, exclude=()) -> Dict[str, Any]:
+        neighbors = [n for n in self.index.search(role, request, domain=domain, k=self.k, exclude=exclude) if n["similarity"] > 0]
+        if not neighbors:
+            return {"predicted_score": 5.0, "confidence": 0.0, "neighbors": []}
+
+        # Squared similarity so a near-exact match outweighs several loose ones
+        weights = [n["similarity"] ** 2 for n in neighbors]
+        total = sum(weights)
+        score = sum(w * n["rating"] for w, n in zip(weights, neighbors)) / total
+        spread = math.sqrt(sum(w * (n["rating"] - score) ** 2 for w, n in zip(weights, neighbors)) / total)
+        confidence = neighbors[0]["similarity"] * max(0.0, 1 - spread / 5)
+
+        return {
+            "predicted_score": round(score, 2),
+            "confidence": round(confidence, 3),
+            "neighbors": [{"role": n["role"], "request": n["request"], "rating": n["rating"]} for n in neighbors],
+        }
+
+    def save(self, path) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump({"version": ARTIFACT_VERSION, "scorer": self}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path) -> "LocalIntegrityScorer":
+        with open(path, "rb") as f:
+            artifact = pickle.load(f)
+        if artifact.get("version") != ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported scorer artifact version {artifact.get('version')}")
+        return artifact["scorer"]
+
+
+def load_or_train(path, records: List[Dict[str, Any]], k: int = 5) -> LocalIntegrityScorer:
+    """Load the serialized scorer if it was trained on these exact records, otherwise retrain and save it."""
+    fingerprint = records_fingerprint(records)
+    if path and Path(path).exists():
+        try:
+            scorer = LocalIntegrityScorer.load(path)
+            if scorer.fingerprint == fingerprint and scorer.k == k:
+                return scorer
+            logger.info("Local scorer artifact is stale, retraining")
+        except Exception as e:
+            logger.error(f"Error loading local scorer from {path}: {e}")
+
+    scorer = LocalIntegrityScorer(records, k=k)
+    if path:
+        scorer.save(path)
+        logger.info(f"Trained local integrity scorer on {len(records)} ratings, saved to {path}")
+    return scorer
+
+
+def evaluate(scorer: LocalIntegrityScorer, records: List[Dict[str, Any]], threshold: float) -> Dict[str, float]:
+    """Leave-one-out error overall and on the rows confident enough to skip the LLM."""
+    errors, confident = [], []
+    for i, r in enumerate(records):
+        prediction = scorer.predict(r["role"], r["request"], r["domain"], exclude=[i])
+        error = abs(prediction["predicted_score"] - r["rating"])
+        errors.append(error)
+        if prediction["confidence"] >= threshold:
+            confident.append(error)
+    return {
+        "rows": len(records),
+        "mae": round(statistics.mean(errors), 3),
+        "local_rate": round(len(confident) / len(records), 3),
+        "local_mae": round(statistics.mean(confident), 3) if confident else None,
+    }
+
+
+if __name__ == "__main__":
+    # Import under the module's real name so the pickle loads from tools4 as well
+    from local_scorer import LocalIntegrityScorer, evaluate
+    from reference_data import get_reference_store
+
+    parser = argparse.ArgumentParser(description="Train, save and evaluate the local integrity scorer")
+    parser.add_argument("--data", default=str(Path(__file__).parent / "data"))
+    parser.add_argument("--out", default=config.LOCAL_SCORER_PATH)
+    args = parser.parse_args()
+
+    records = get_reference_store(args.data).records()
+    scorer = LocalIntegrityScorer(records, k=config.LOCAL_SCORER_K)
+    scorer.save(args.out)
+    print(f"Saved scorer to {args.out}")
+    print(evaluate(scorer, records, config.LOCAL_SCORER_MIN_CONFIDENCE))
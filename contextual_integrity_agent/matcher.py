@@ -0,0 +1,246 @@
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, List, Tuple
+
+import config
+
+
+def normalize_text(text: str) -> str:
+    """Lower-case and unify quotes/whitespace without changing length, so match offsets stay valid."""
+    out = []
+    for ch in text or "":
+        low = ch.lower()
+        if len(low) != 1:
+            low = ch
+        if low in "’‘`":
+            low = "'"
+        elif low.isspace():
+            low = " "
+        out.append(low)
+    return "".join(out)
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over a fixed set of phrases. find() scans the text
+    once and returns every whole-word occurrence, resolved leftmost-longest
+    so "email address" wins over "address".
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, Any]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+        for phrase, payload in patterns:
+            phrase = normalize_text(phrase).strip()
+            if phrase:
+                self._add(phrase, payload)
+        self._build()
+
+    def _add(self, phrase: str, payload: Any) -> None:
+        node = 0
+        for ch in phrase:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(phrase), payload))
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0) if self._goto[fail].get(ch, 0) != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text: str) -> List[Tuple[int, int, Any]]:
+        """Every whole-word match as (start, end, payload), overlaps included."""
+        text = normalize_text(text)
+        matches = []
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for length, payload in self._out[node]:
+                start, end = i - length + 1, i + 1
+                if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                    matches.append((start, end, payload))
+        return matches
+
+    def find(self, text: str) -> List[Tuple[int, int, Any]]:
+        """Non-overlapping matches, preferring the leftmost then the longest."""
+        result, last_end = [], -1
+        for start, end, payload in sorted(self.find_all(text), key=lambda m: (m[0], -(m[1] - m[0]))):
+            if start >= last_end:
+                result.append((start, end, payload))
+                last_end = end
+        return result
+
+
+# Words that mark a phrase as something the caller wants from the agent
+REQUEST_CUES = {
+    "your", "need", "needs", "give", "tell", "provide", "share", "send", "read", "confirm", "verify",
+    "what", "what's", "whats", "which", "want", "get", "require", "requires", "requesting", "request", "may",
+    "can", "could",
+}
+# A category word right after these is the caller talking about their own details
+SELF_REFERENCES = {"my", "our", "mine"}
+# "sent to your phone", "on your card": the item is mentioned, not necessarily asked for
+MENTION_PREPOSITIONS = {"to", "on", "via", "from", "in", "into", "onto"}
+CUE_WINDOW = 6
+
+
+class RequestMatcher:
+    """
+    Deterministic fast path for VulnerabilityAssessor: maps plain-word
+    requests ("one-time code", "social security", "PUK") onto the fixed
+    information categories with one automaton pass. Matches without a
+    nearby request cue, phrases that could mean several categories in
+    this domain, and phrases for categories this domain doesn't hold make
+    the result unsure so the caller can ask the LLM.
+    """
+
+    def __init__(self, synonyms: Dict[str, List[str]] = None):
+        synonyms = synonyms or config.REQUEST_SYNONYMS
+        phrases: Dict[str, set] = {}
+        for category, words in synonyms.items():
+            for phrase in [category.replace("_", " ")] + list(words):
+                phrases.setdefault(normalize_text(phrase).strip(), set()).add(category)
+        self.automaton = KeywordAutomaton((phrase, sorted(categories)) for phrase, categories in phrases.items())
+
+    @staticmethod
+    def _words_before(text: str, start: int) -> List[str]:
+        return re.findall(r"[a-z']+", normalize_text(text[:start]))
+
+    def match(self, user_input: str, domain: str) -> Dict[str, Any]:
+        domain_categories = set(config.INFO_CATEGORIES_CONTEXTUAL_INTEGRITY.get(domain.lower(), []))
+        requested, matches, unsure = [], [], []
+
+        for start, end, categories in self.automaton.find(user_input):
+            before = self._words_before(user_input, start)
+            if before and before[-1] in SELF_REFERENCES:
+                continue
+
+            candidates = [c for c in categories if c in domain_categories]
+            span = {"text": user_input[start:end], "start": start, "end": end, "candidates": candidates or categories}
+            if not candidates:
+                unsure.append(dict(span, reason="not in this domain"))
+                continue
+            if len(candidates) > 1:
+                unsure.append(dict(span, reason="ambiguous category"))
+                continue
+            if len(before) >= 2 and before[-1] == "your" and before[-2] in MENTION_PREPOSITIONS:
+                unsure.append(dict(span, reason="mentioned, not requested"))
+                continue
+            if not REQUEST_CUES.intersection(before[-CUE_WINDOW:]):
+                unsure.append(dict(span, reason="no request cue"))
+                continue
+
+            category = candidates[0]
+            matches.append(dict(span, category=category))
+            if category not in requested:
+                requested.append(category)
+
+        # Nothing matched: only trust an empty answer when the caller isn't asking for anything
+        asks_something = bool(REQUEST_CUES.intersection(re.findall(r"[a-z']+", normalize_text(user_input))))
+        confident = not unsure and (bool(matches) or not asks_something)
+        return {"requested_info": requested, "matches": matches, "unsure": unsure, "confident": confident}
+
+
+# Words that end a claimed role: "bank manager and ...", "IT Specilaist in Bank Mascot"
+ROLE_BOUNDARIES = {
+    "in", "at", "for", "with", "and", "from", "to", "n", "on", "who", "that", "but", "so", "please",
+    "here", "calling", "i", "i'd", "i'm", "my", "your", "you", "we", "is", "are", "need", "needs", "would",
+}
+ARTICLES = {"a", "an", "the", "your"}
+ROLE_MAX_WORDS = 6
+
+
+class RoleMatcher:
+    """
+    Local counterpart of TriggerAnalyzer.extract_user_role. Looks for the
+    phrases the LLM prompt describes ("I am a...", "As a...", "I work as...",
+    "I'm the...", including transcript misspellings such as "wroging as") and
+    checks the words after them against a lexicon of known roles.
+
+    confident=True means the answer can be used as-is: a known role after a
+    trigger, or no trigger and no known role at all. A trigger followed by an
+    unknown role ("as an english teatcher") or a known role outside any
+    trigger is left to the LLM.
+    """
+
+    def __init__(self, roles: Iterable[str], misspellings: Dict[str, List[str]] = None):
+        misspellings = misspellings if misspellings is not None else config.ROLE_MISSPELLINGS
+        working = "|".join(re.escape(w) for w in ["working", "work"] + misspellings.get("working", []))
+        self.triggers = re.compile(
+            rf"\b(?:i\s+am|i'm|im|i\s+work\s+as|(?:{working})\s+as|employed\s+as|serving\s+as"
+            rf"|my\s+(?:role|job|title|position)\s+is|this\s+is\s+the|as)\s+"
+        )
+
+        phrases = set()
+        for role in roles:
+            role = re.sub(r"\(.*?\)", "", role)
+            for part in re.split(r"\s+or\s+", role):
+                phrases.add(normalize_text(part).strip())
+        for phrase in list(phrases):
+            for correct, wrong_spellings in misspellings.items():
+                if re.search(rf"\b{re.escape(correct)}\b", phrase):
+                    for wrong in wrong_spellings:
+                        phrases.add(re.sub(rf"\b{re.escape(correct)}\b", wrong, phrase))
+        self.lexicon = KeywordAutomaton((phrase, phrase) for phrase in phrases if phrase)
+
+    @staticmethod
+    def _capture(text: str, start: int):
+        """Words after a trigger up to a boundary word or punctuation, as (start, end, has_article)."""
+        words = list(re.finditer(r"[a-z0-9][a-z0-9&'\-]*|[^\sa-z0-9]", text[start:]))
+        has_article = bool(words) and words[0].group() in ARTICLES
+        if has_article:
+            words = words[1:]
+        kept = []
+        for word in words:
+            if not word.group()[0].isalnum() or word.group() in ROLE_BOUNDARIES or len(kept) == ROLE_MAX_WORDS:
+                break
+            kept.append(word)
+        if not kept:
+            return None
+        return start + kept[0].start(), start + kept[-1].end(), has_article
+
+    def match(self, user_input: str) -> Dict[str, Any]:
+        text = normalize_text(user_input)
+        unsure = []
+
+        for trigger in self.triggers.finditer(text):
+            captured = self._capture(text, trigger.end())
+            if captured is None:
+                continue
+            start, end, has_article = captured
+            known = self.lexicon.find(text[start:end])
+            if known:
+                # Keep any modifiers the caller used ("english Police Officer"), like the LLM prompt asks
+                role_end = start + known[0][1]
+                return {
+                    "role": user_input[start:role_end].strip(),
+                    "confident": True,
+                    "span": (start, role_end),
+                    "trigger": trigger.group().strip(),
+                }
+            strong = not trigger.group().startswith(("as ", "i am", "i'm", "im ")) or has_article
+            if strong:
+                unsure.append({"text": user_input[start:end], "reason": "unknown role after trigger"})
+
+        if not unsure:
+            loose = self.lexicon.find(text)
+            if loose:
+                unsure.append({"text": user_input[loose[0][0]:loose[0][1]], "reason": "known role without trigger"})
+
+        return {"role": "", "confident": not unsure, "span": None, "trigger": None, "unsure": unsure}
@@ -0,0 +1,238 @@
+import os
+import json
+import queue
+import logging
+import threading
+import urllib.request
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+import config
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Histogram buckets in seconds: sub-millisecond local paths up to slow LLM calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.025, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.n += 1
+
+
+def _labels(labels: Dict[str, Any]) -> str:
+    escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in labels.items())
+    return "{" + ",".join(escaped) + "}"
+
+
+class PrometheusExporter:
+    """
+    Aggregates turn spans into counters and latency histograms and renders
+    them in the Prometheus text exposition format. serve() exposes them on
+    /metrics from a daemon thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[tuple, _Histogram] = defaultdict(_Histogram)
+        self._counters: Dict[tuple, float] = defaultdict(float)
+        self._server = None
+
+    def export(self, state: Dict[str, Any]) -> None:
+        with self._lock:
+            turn = state.get("stage_timings", {}).get("turn")
+            if turn is not None:
+                self._histograms[("vishing_turn_duration_seconds", (("domain", state.get("domain", "")),))].observe(turn)
+            for s in state.get("spans", []):
+                if s["kind"] == "stage":
+                    self._histograms[("vishing_stage_duration_seconds", (("stage", s["name"]),))].observe(s["duration"])
+                elif s["kind"] == "llm":
+                    labels = (("call", s["name"]), ("model", s.get("model") or config.OPENAI_MODEL))
+                    self._histograms[("vishing_llm_call_duration_seconds", labels)].observe(s["duration"])
+                    self._counters[("vishing_llm_tokens_total", labels + (("type", "prompt"),))] += s.get("prompt_tokens", 0)
+                    self._counters[("vishing_llm_tokens_total", labels + (("type", "completion"),))] += s.get("completion_tokens", 0)
+                if s.get("cache"):
+                    self._counters[("vishing_cache_lookups_total", (("call", s["name"]), ("result", s["cache"])))] += 1
+                if s.get("error"):
+                    self._counters[("vishing_errors_total", (("kind", s["kind"]), ("name", s["name"])))] += 1
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            seen = set()
+            for (name, labels), hist in sorted(self._histograms.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {name} histogram")
+                    seen.add(name)
+                for bound, count in zip(LATENCY_BUCKETS, hist.counts):
+                    lines.append(f"{name}_bucket{_labels(dict(labels, le=bound))} {count}")
+                lines.append(f"{name}_bucket{_labels(dict(labels, le='+Inf'))} {hist.n}")
+                lines.append(f"{name}_sum{_labels(dict(labels))} {hist.total:.6f}")
+                lines.append(f"{name}_count{_labels(dict(labels))} {hist.n}")
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {name} counter")
+                    seen.add(name)
+                lines.append(f"{name}{_labels(dict(labels))} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int) -> None:
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+        except OSError as e:
+            # Another process (e.g. a second Streamlit worker) already serves the port
+            logger.error(f"Could not serve metrics on port {port}: {e}")
+            return
+        threading.Thread(target=self._server.serve_forever, daemon=True, name="metrics").start()
+        logger.info(f"Serving Prometheus metrics on :{port}/metrics")
+
+
+def _attribute(key: str, value) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class OtlpExporter:
+    """
+    Sends each turn as one trace to an OTLP/HTTP collector (JSON encoding,
+    no OpenTelemetry SDK needed). Posting happens on a background thread so a
+    slow or missing collector never delays a turn; turns are dropped when the
+    queue is full.
+    """
+
+    SPAN_FIELDS = ("name", "kind", "parent", "start", "start_unix_ns", "duration", "error")
+
+    def __init__(self, endpoint: str, service_name: str, max_queue: int = 1000, timeout: float = 2.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        threading.Thread(target=self._worker, daemon=True, name="otlp-export").start()
+
+    def export(self, state: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(self._payload(state))
+        except queue.Full:
+            logger.error("OTLP export queue full, dropping turn")
+
+    def _payload(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        trace_id = os.urandom(16).hex()
+        root_id = os.urandom(8).hex()
+        spans = state.get("spans", [])
+        # Spans are recorded as they finish, so name the stage spans up front for their children
+        span_ids = [os.urandom(8).hex() for _ in spans]
+        stage_ids = {s["name"]: span_id for s, span_id in zip(spans, span_ids) if s["kind"] == "stage"}
+        starts = [s["start_unix_ns"] for s in spans]
+        turn_start = min(starts) if starts else 0
+        turn_seconds = state.get("stage_timings", {}).get("turn", 0.0)
+
+        otlp_spans = [{
+            "traceId": trace_id,
+            "spanId": root_id,
+            "name": "turn",
+            "kind": 1,
+            "startTimeUnixNano": str(turn_start),
+            "endTimeUnixNano": str(turn_start + int(turn_seconds * 1e9)),
+            "attributes": [_attribute("domain", state.get("domain", "")),
+                           _attribute("user_role", state.get("user_role", ""))],
+        }]
+        for s, span_id in zip(spans, span_ids):
+            parent_id = stage_ids.get(s.get("parent"), root_id)
+            attributes = [_attribute("span.kind", s["kind"])] + [
+                _attribute(key, value) for key, value in s.items()
+                if key not in self.SPAN_FIELDS and value is not None
+            ]
+            otlp_spans.append({
+                "traceId": trace_id,
+                "spanId": span_id,
+                "parentSpanId": parent_id,
+                "name": s["name"],
+                "kind": 3 if s["kind"] == "llm" else 1,
+                "startTimeUnixNano": str(s["start_unix_ns"]),
+                "endTimeUnixNano": str(s["start_unix_ns"] + int(s["duration"] * 1e9)),
+                "attributes": attributes,
+                "status": {"code": 2, "message": s["error"]} if s.get("error") else {"code": 1},
+            })
+
+        return {"resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", self.service_name)]},
+            "scopeSpans": [{"scope": {"name": "contextual_integrity_agent"}, "spans": otlp_spans}],
+        }]}
+
+    def _worker(self) -> None:
+        while True:
+            payload = self._queue.get()
+            request = urllib.request.Request(
+                self.endpoint, data=json.dumps(payload).encode("utf-8"),
+                headers={"Content-Type": "application/json"}, method="POST",
+            )
+            try:
+                urllib.request.urlopen(request, timeout=self.timeout).close()
+            except Exception as e:
+                logger.error(f"Error exporting spans to {self.endpoint}: {e}")
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter() -> Optional[Any]:
+    """The process-wide exporter chosen by config.METRICS_EXPORTER, created on first use."""
+    global _exporter
+    if not config.METRICS_EXPORTER:
+        return None
+    with _exporter_lock:
+        if _exporter is None:
+            if config.METRICS_EXPORTER == "prometheus":
+                _exporter = PrometheusExporter()
+                _exporter.serve(config.METRICS_PORT)
+            elif config.METRICS_EXPORTER == "otlp":
+                _exporter = OtlpExporter(config.OTLP_ENDPOINT, config.METRICS_SERVICE_NAME)
+            else:
+                raise ValueError(f"Unknown METRICS_EXPORTER: {config.METRICS_EXPORTER}")
+        return _exporter
+
+
+def export_turn(state: Dict[str, Any]) -> None:
+    """Hand a finished turn's spans to the configured exporter; never fails the turn."""
+    try:
+        exporter = get_exporter()
+        if exporter is not None:
+            exporter.export(state)
+    except Exception as e:
+        logger.error(f"Error exporting turn metrics: {e}")
+
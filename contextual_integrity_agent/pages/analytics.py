@@ -0,0 +1,48 @@
+import time
+
+import streamlit as st
+
+import config
+import results_store
+
+
+st.title("📈 Cohort Analytics")
+st.sidebar.success("Select a page from the sidebar")
+
+
+@st.cache_data(ttl=60, show_spinner="Reading results store...")
+def cohort_report():
+    start = time.perf_counter()
+    report = results_store.cohort_report()
+    return report, time.perf_counter() - start
+
+
+report, elapsed = cohort_report()
+
+if not report:
+    st.info("⚠️ No stored results yet. Turns from every session are collected here as trainees practice.")
+else:
+    rates = report["success_rates"]
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric(label="Sessions", value=int(rates["sessions"].sum()))
+    with col2:
+        st.metric(label="Turns", value=int(rates["turns"].sum()))
+    with col3:
+        overall = (rates["turn_success_rate"] * rates["turns"]).sum() / rates["turns"].sum()
+        st.metric(label="Turn Success Rate", value=f"{overall:.0%}")
+
+    st.subheader("Success Rates by Domain")
+    st.dataframe(rates.style.format({"turn_success_rate": "{:.1%}", "session_success_rate": "{:.1%}"}))
+
+    st.subheader("Trust Score Distribution")
+    st.bar_chart(report["score_histogram"])
+
+    st.subheader("Scores by Domain and Claimed Role")
+    st.dataframe(report["score_distribution"].round(2))
+
+    st.subheader("Most Extracted Information")
+    st.bar_chart(report["most_extracted"])
+
+    st.caption(f"Computed in {1000 * elapsed:.0f} ms from {config.RESULTS_STORE_DIR} (refreshed every minute)")
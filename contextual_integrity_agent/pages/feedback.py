@@ -1,198 +1,52 @@
 import streamlit as st
 import pandas as pd
 
-from langchain_core.output_parsers import JsonOutputParser
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from feedback_agent import FeedbackAgent, results_fingerprint
+import tts_cache
 
 # Initialize LLM client
 client = st.session_state.openai_client
 
 
-# ---------- FEEDBACK AGENT ----------
-class FeedbackAgent:
-    def __init__(self, conversation_results: list, llm):
-        self.results = conversation_results
-        self.llm = llm
-        self.metrics = {}
-        self.score = 0
-        self.feedback_text = {}
-
-    # ---------- LOGIC ANALYSIS ----------
-    def analyze_triggers(self):
-        trigger_count = sum(len(r.get("detected_triggers", [])) for r in self.results)
-        trigger_repetition = trigger_count / max(1, len(self.results))
-        return trigger_count, trigger_repetition
-
-    def analyze_trust_trends(self):
-        trust_scores = [r.get("trust_score", 0) for r in self.results]
-        increases = sum(1 for i in range(1, len(trust_scores)) if trust_scores[i] > trust_scores[i-1])
-        decreases = sum(1 for i in range(1, len(trust_scores)) if trust_scores[i] < trust_scores[i-1])
-        return increases, decreases
-
-    def analyze_info_ratio(self):
-        total_msgs = len(self.results)
-        total_info = sum(len(r.get("info_to_reveal", [])) for r in self.results)
-        ratio = total_info / max(1, total_msgs)
-        return total_info, ratio
-
-    def analyze_mistakes(self):
-        mistakes = [log for r in self.results for log in r.get("analysis_log", []) if "BREACH" in log]
-        return len(mistakes)
-
-    def analyze_phases(self):
-        trust_scores = [r.get("trust_score", 0) for r in self.results]
-        if not trust_scores:
-            return "neutral"
-        return "increment" if trust_scores[-1] > trust_scores[0] else "decrement"
-
-    def compute_metrics(self):
-        triggers, repetition = self.analyze_triggers()
-        inc, dec = self.analyze_trust_trends()
-        total_info, ratio = self.analyze_info_ratio()
-        mistakes = self.analyze_mistakes()
-        phases = self.analyze_phases()
-
-        self.metrics = {
-            "trigger_count": triggers,
-            "trigger_repetition": repetition,
-            "trust_increases": inc,
-            "trust_decreases": dec,
-            "info_revealed": total_info,
-            "info_ratio": ratio,
-            "mistakes": mistakes,
-            "phase_trend": phases
-        }
-
-    def calculate_score(self):
-        score = 10
-        score -= self.metrics["mistakes"] * 1.5
-        score -= self.metrics["info_ratio"] * 2
-        score += min(self.metrics["trigger_count"], 5) * 0.5
-        score += self.metrics["trust_increases"] * 0.2
-        score = max(0, min(10, round(score, 1)))
-        self.score = score
-
-    # ---------- AI FEEDBACK ----------
-    def generate_ai_feedback(self):
-        prompt = f"""
-        You are a **phishing training coach**. 
-        The trainee is acting as the attacker, and the AI agent is the victim. 
-
-        Your job is to evaluate how good the trainee was at performing a social engineering (vishing) attack.
-
-        Focus heavily on:
-        - How well they applied **time pressure** (urgency, deadlines, fear of missing out).
-        - How well they used **trigger words** and psychological manipulation.
-        - The **quality of user inputs** (were they convincing? manipulative? sloppy?).
-        - If trust scores increased or decreased, explain *why* that happened.
-        - If information was revealed, explain how it was obtained.
-        - If mistakes happened, explain what they were and why they weakened the attack.
-
-        Metrics summary:
-        {self.metrics}
-
-        Conversation (user = attacker, agent = victim):
-        {self.results}
-
-        Provide JSON with:
-        {{
-            "strengths": ["..."],
-            "weaknesses": ["..."],
-            "turn_analysis": {{
-                "Turn 1": "Feedback on user input + agent response",
-                "Turn 2": "Feedback ...",
-                ...
-            }},
-            "suggestions": ["...", "...", "..."]
-        }}
-        """
-        parser = JsonOutputParser()
-        response = self.llm.chat.completions.create(
-            model =client,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        parsed = parser.parse(response.choices[0].message.content)
-        self.feedback_text = parsed
-
-    # ---------- RUN PIPELINE ----------
-    def run(self):
-        self.compute_metrics()
-        self.calculate_score()
-        self.generate_ai_feedback()
-        return {
-            "score": self.score,
-            "metrics": self.metrics,
-            "feedback": self.feedback_text
-        }
-
-# -------------VOICE FEEDBACK -------------------------------------------
-TRUST_THRESHOLDS = {
-    "no_info": (0, 3.9999),
-    "basic_info": (4, 6.9999),
-    "sensitive_info": (7, 8.9999),
-    "critical_info": (9, 10.0000)
-}
-
-INFO_CATEGORIES = {
-    "basic": ["name", "location", "job"],
-    "sensitive": ["phone", "email", "address"], 
-    "critical": ["password", "ssn", "account", "credit_card"]
-}
-
-class FeedbackAgent(FeedbackAgent):
-    def generate_ai_voice_feedback(self):
-        feedback_data = {
-            "score": self.score,
-            "metrics": self.metrics,
-            "results": self.results,
-            "trust_thresholds": TRUST_THRESHOLDS,
-            "info_categories": INFO_CATEGORIES
-        }
-
-        prompt = f"""
-            You are a phishing training coach speaking directly to a trainee. 
-            Provide a conversational, informal voice-style feedback about their vishing attempt.
-
-            Example of how to speak (short, informal, 3 sentences): 
-            'uyour total score is 6.5 out of ten and i'll tell u why exactly u lost a few points and what good things u did. 
-            When u asked me for a password but ur trust score wasn't high enough yet, that was a mistake—be careful to gain my trust first before asking for info! 
-            Also, ur use of time pressure was good but u didn't use it consistently, but u did well on being polite and building context.'
-
-            Now, using the following data:
-
-            - Total Score: {feedback_data['score']}
-            - Metrics: {feedback_data['metrics']}
-            - Conversation Results: {feedback_data['results']}
-            - Trust Thresholds: {feedback_data['trust_thresholds']}
-            - Info Categories: {feedback_data['info_categories']}
-
-            Provide a feedback in the same style as the example above, highlighting mistakes, good actions, and advice for improvement.
-            Output as a single coherent text suitable for reading aloud.
-            """
-
-        response = self.llm.chat.completions.create(
-            model=client,
-            messages=[{"role": "user", "content": prompt}]
-        )
-
-        self.voice_feedback = response.choices[0].message.content
-        return self.voice_feedback
-
-
 # ---------- STREAMLIT UI ----------
 st.title("📊 Feedback & Results")
 st.sidebar.success("Select a page from the sidebar")
 
 
 
+@st.cache_resource
+def feedback_executor():
+    """Threads shared by all sessions for the feedback LLM calls"""
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="feedback")
+
+
+def feedback_run(results):
+    """
+    The FeedbackAgent run for these results, started at most once per distinct
+    result set. Metrics and score are ready on return; the two LLM calls run
+    concurrently and are reused on reruns (button clicks, tab switches).
+    A failed call is retried on the next rerun.
+    """
+    fingerprint = results_fingerprint(results)
+    run = st.session_state.get("feedback_run")
+    if run is None or run["fingerprint"] != fingerprint:
+        agent = FeedbackAgent(list(results), st.session_state.llm,
+                              accumulator=st.session_state.get("metrics_accumulator"))
+        run = {"fingerprint": fingerprint, "agent": agent, "futures": agent.start(feedback_executor())}
+        st.session_state.feedback_run = run
+    else:
+        for name, future in run["futures"].items():
+            if future.done() and future.exception() is not None:
+                call = run["agent"].generate_ai_feedback if name == "feedback" else run["agent"].generate_ai_voice_feedback
+                run["futures"][name] = feedback_executor().submit(call)
+    return run
+
+
 def text_to_speech(text):
     try:
-        response = client.audio.speech.create(
-            model="tts-1",
-            voice="alloy",
-            input=text
-        )
-        return response.content
+        return tts_cache.synthesize(client, text)
     except Exception as e:
         st.error(f"Error generating speech: {str(e)}")
         return None
@@ -203,13 +57,12 @@ if "results" not in st.session_state or not st.session_state.results:
 else:
     results = st.session_state.results
 
-    # Run FeedbackAgent
-    agent = FeedbackAgent(results, st.session_state.llm)
-    feedback_output = agent.run()
+    # Run FeedbackAgent: metrics now, LLM feedback in the background
+    run = feedback_run(results)
+    agent = run["agent"]
 
-    score = feedback_output["score"]
-    metrics = feedback_output["metrics"]
-    feedback = feedback_output["feedback"]
+    score = agent.score
+    metrics = agent.metrics
 
     dashboard, analytics, suggestions = st.tabs(["📊 Dashboard", "📈 Analytics", "💡 Suggestions"])
 
@@ -225,7 +78,7 @@ else:
         with col3:
             st.metric(label="Information Obtained", value=metrics["info_revealed"])
 
-        trust_scores = [r.get("trust_score", 0) for r in results]
+        trust_scores = [r.trust_score for r in results]
         if trust_scores:
             df_scores = pd.DataFrame({"Turn": range(1, len(trust_scores)+1), "Trust Score": trust_scores})
             df_scores.set_index("Turn", inplace=True)
@@ -234,39 +87,67 @@ else:
     # ---------- ANALYTICS ----------
     with analytics:
         st.header("Analytics")
-        if feedback and "turn_analysis" in feedback:
-            for turn, analysis in feedback["turn_analysis"].items():
-                st.subheader(turn)
-                st.write(analysis)
+        turn_analysis_slot = st.empty()
 
         st.subheader("General Observations")
         st.write(f"- Mistakes: {metrics['mistakes']}")
         st.write(f"- Trust trend: {metrics['phase_trend']}")
         st.write(f"- Info/Msg Ratio: {metrics['info_ratio']:.2f}")
+        if agent.prompt_stats:
+            st.caption(f"Feedback prompt: {agent.prompt_stats['raw_tokens']} → {agent.prompt_stats['compact_tokens']} "
+                       f"tokens ({agent.prompt_stats['summarized_turns']} of {agent.prompt_stats['turns']} turns summarized)")
 
     # ---------- SUGGESTIONS ----------
     with suggestions:
         st.header("Suggestions")
-        if feedback:
-            st.subheader("✅ Strengths")
-            for s in feedback.get("strengths", []):
-                st.write(f"- {s}")
-
-            st.subheader("⚠️ Weaknesses")
-            for w in feedback.get("weaknesses", []):
-                st.write(f"- {w}")
-
-            st.subheader("💡 Suggestions")
-            for sug in feedback.get("suggestions", []):
-                st.write(f"- {sug}")
-
-    # ✅ FIX APPLIED HERE — voice feedback now inside else block
-    voice_feedback_text = agent.generate_ai_voice_feedback()
+        suggestions_slot = st.empty()
 
     with st.expander("🎙️ Voice-Style Feedback"):
-        st.text_area("Feedback", value=voice_feedback_text, height=400)
-
-        if st.button("🔊 Play Feedback"):
-            audio_bytes = text_to_speech(voice_feedback_text)
-            if audio_bytes:
-                st.audio(audio_bytes, format="audio/mp3")
+        voice_slot = st.empty()
+
+    def show_feedback(feedback):
+        with turn_analysis_slot.container():
+            if feedback and "turn_analysis" in feedback:
+                for turn, analysis in feedback["turn_analysis"].items():
+                    st.subheader(turn)
+                    st.write(analysis)
+
+        with suggestions_slot.container():
+            if feedback:
+                st.subheader("✅ Strengths")
+                for s in feedback.get("strengths", []):
+                    st.write(f"- {s}")
+
+                st.subheader("⚠️ Weaknesses")
+                for w in feedback.get("weaknesses", []):
+                    st.write(f"- {w}")
+
+                st.subheader("💡 Suggestions")
+                for sug in feedback.get("suggestions", []):
+                    st.write(f"- {sug}")
+
+    def show_voice_feedback(voice_feedback_text):
+        with voice_slot.container():
+            st.text_area("Feedback", value=voice_feedback_text, height=400)
+
+            if st.button("🔊 Play Feedback"):
+                audio_bytes = text_to_speech(voice_feedback_text)
+                if audio_bytes:
+                    st.audio(audio_bytes, format="audio/mp3")
+
+    renderers = {"feedback": show_feedback, "voice_feedback": show_voice_feedback}
+    slots = {"feedback": [turn_analysis_slot, suggestions_slot], "voice_feedback": [voice_slot]}
+    for name, future in run["futures"].items():
+        if not future.done():
+            for slot in slots[name]:
+                slot.info("⏳ Generating feedback...")
+
+    # Fill each LLM section in as soon as its call finishes
+    futures = {future: name for name, future in run["futures"].items()}
+    for future in as_completed(futures):
+        name = futures[future]
+        try:
+            renderers[name](future.result())
+        except Exception as e:
+            for slot in slots[name]:
+                slot.error(f"Error generating feedback: {str(e)}")
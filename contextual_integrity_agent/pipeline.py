@@ -0,0 +1,200 @@
+import time
+import asyncio
+import logging
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterable, List
+
+from telemetry import span
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Dependency graph of one agent turn: stage -> stages it needs first.
+# Role extraction and requested-info extraction are independent, so they can
+# run side by side; everything after them is on the critical path.
+# Trigger detection feeds only the feedback metrics, so nothing waits on it.
+STAGE_GRAPH = {
+    "extract_user_role": [],
+    "assess_vulnerability": [],
+    "detect_triggers": [],
+    "calculate_integrity": ["extract_user_role", "assess_vulnerability"],
+    "generate_response": ["calculate_integrity"],
+}
+
+# Same turn with role and requested info pulled out by a single fused call
+FUSED_STAGE_GRAPH = {
+    "extract_context": [],
+    "detect_triggers": [],
+    "calculate_integrity": ["extract_context"],
+    "generate_response": ["calculate_integrity"],
+}
+
+# Stages that always run on the thread that called the runner, never on the
+# executor: generate_response may stream to a callback that touches the UI.
+CALLER_THREAD_STAGES = ("generate_response",)
+
+# Keys owned by the runner itself; stages never write them directly.
+_RUNNER_KEYS = ("analysis_log", "stage_timings")
+
+
+def topological_order(graph: Dict[str, List[str]]) -> List[str]:
+    """Return stage names so every stage comes after its dependencies,
+    keeping the declaration order of the graph where possible."""
+    order, done = [], set()
+    pending = list(graph)
+    while pending:
+        ready = [name for name in pending if all(dep in done for dep in graph[name])]
+        if not ready:
+            raise ValueError(f"Cycle in stage graph: {pending}")
+        for name in ready:
+            order.append(name)
+            done.add(name)
+            pending.remove(name)
+    return order
+
+
+def _fork(state):
+    """Give a stage its own view of the state with a private log."""
+    fork = dict(state)
+    fork["analysis_log"] = []
+    return fork, dict(fork)
+
+
+def _merge(state, fork, before):
+    """Copy back only the keys the stage actually (re)assigned."""
+    for key, value in fork.items():
+        if key in _RUNNER_KEYS:
+            continue
+        if key not in before or before[key] is not value:
+            state[key] = value
+
+
+def _timed(name: str, stage: Callable, state):
+    start = time.perf_counter()
+    with span(name, kind="stage"):
+        result = stage(state)
+    return result, time.perf_counter() - start
+
+
+async def _atimed(name: str, stage: Callable, state):
+    start = time.perf_counter()
+    with span(name, kind="stage"):
+        result = await stage(state)
+    return result, time.perf_counter() - start
+
+
+def run_stages_sequential(stages: Dict[str, Callable], graph: Dict[str, List[str]], state):
+    """Run every stage one after another in dependency order."""
+    timings = state.setdefault("stage_timings", {})
+    turn_start = time.perf_counter()
+    for name in topological_order(graph):
+        state, elapsed = _timed(name, stages[name], state)
+        timings[name] = round(elapsed, 4)
+    timings["turn"] = round(time.perf_counter() - turn_start, 4)
+    return state
+
+
+def run_stages_concurrent(stages: Dict[str, Callable], graph: Dict[str, List[str]], state, executor,
+                          caller_thread: Iterable[str] = CALLER_THREAD_STAGES):
+    """
+    Run the stage graph on an executor, starting each stage as soon as all of
+    its dependencies have finished. Each stage works on a fork of the state;
+    results are merged back as stages complete and log lines are appended in
+    dependency order so the analysis log reads the same as a sequential run.
+    Stages named in caller_thread run on the calling thread even while other
+    stages are still in flight.
+    """
+    timings = state.setdefault("stage_timings", {})
+    turn_start = time.perf_counter()
+    logs = {}
+    done = set()
+    pending = list(topological_order(graph))
+    running = {}
+
+    while pending or running:
+        ready = [name for name in pending if all(dep in done for dep in graph[name])]
+        for name in ready:
+            pending.remove(name)
+
+        # A lone ready stage with nothing else in flight gains nothing from
+        # a thread hop, so it runs inline too.
+        if len(ready) == 1 and not running:
+            inline = ready
+        else:
+            inline = [name for name in ready if name in caller_thread]
+
+        for name in ready:
+            if name in inline:
+                continue
+            fork, before = _fork(state)
+            # Carry the caller's context (per-turn telemetry) into the worker thread
+            running[executor.submit(contextvars.copy_context().run, _timed, name, stages[name], fork)] = (name, before)
+
+        # Submitted stages keep running on the executor meanwhile
+        for name in inline:
+            fork, before = _fork(state)
+            fork, elapsed = _timed(name, stages[name], fork)
+            _merge(state, fork, before)
+            logs[name] = fork["analysis_log"]
+            timings[name] = round(elapsed, 4)
+            done.add(name)
+        if inline:
+            # Inline stages may have unblocked others; look again before waiting
+            continue
+
+        if not running:
+            raise ValueError(f"Stage graph cannot make progress: {pending}")
+
+        finished, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in finished:
+            name, before = running.pop(future)
+            fork, elapsed = future.result()
+            _merge(state, fork, before)
+            logs[name] = fork["analysis_log"]
+            timings[name] = round(elapsed, 4)
+            done.add(name)
+
+    for name in topological_order(graph):
+        state["analysis_log"].extend(logs.get(name, []))
+    timings["turn"] = round(time.perf_counter() - turn_start, 4)
+    return state
+
+
+async def arun_stages(stages: Dict[str, Callable], graph: Dict[str, List[str]], state):
+    """
+    Async counterpart of run_stages_concurrent: stages are coroutines and
+    independent ones are awaited together on the running event loop.
+    """
+    timings = state.setdefault("stage_timings", {})
+    turn_start = time.perf_counter()
+    logs = {}
+    done = set()
+    pending = list(topological_order(graph))
+    running = {}
+
+    while pending or running:
+        ready = [name for name in pending if all(dep in done for dep in graph[name])]
+        for name in ready:
+            pending.remove(name)
+            fork, before = _fork(state)
+            running[asyncio.ensure_future(_atimed(name, stages[name], fork))] = (name, before)
+
+        if not running:
+            raise ValueError(f"Stage graph cannot make progress: {pending}")
+
+        finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        for task in finished:
+            name, before = running.pop(task)
+            fork, elapsed = task.result()
+            _merge(state, fork, before)
+            logs[name] = fork["analysis_log"]
+            timings[name] = round(elapsed, 4)
+            done.add(name)
+
+    for name in topological_order(graph):
+        state["analysis_log"].extend(logs.get(name, []))
+    timings["turn"] = round(time.perf_counter() - turn_start, 4)
+    return state
@@ -0,0 +1,123 @@
+"""
+Compact per-turn records for the FeedbackAgent prompts.
+
+Prompting with every TurnRecord as-is grows quickly with the conversation.
+Each turn is reduced to the fields the coach needs. When the records still exceed the
+token budget, the newest turns stay verbatim and the older ones are folded
+into block summaries. Adjacent summaries are merged in turn (summaries of
+summaries) until everything fits.
+"""
+import json
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+import config
+from conversation_store import estimate_tokens
+from turn_record import TurnRecord
+
+# Longest agent reply kept in a turn record, in characters
+REPLY_CHARS = 160
+# Items kept per counter in a summary
+SUMMARY_TOP = 5
+
+
+def _dumps(record: Dict[str, Any]) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def record_tokens(records: List[Dict[str, Any]]) -> int:
+    return sum(estimate_tokens(_dumps(record)) for record in records)
+
+
+def compact_turn(number: int, record: TurnRecord) -> Dict[str, Any]:
+    reply = record.agent_response
+    return {
+        "turn": number,
+        "utterance": record.user_input,
+        "role": record.user_role or None,
+        "score": record.trust_score,
+        "requested": record.requested_info,
+        "revealed": record.info_to_reveal,
+        "triggers": record.triggers,
+        "pressure": record.pressure_score,
+        "reply": reply if len(reply) <= REPLY_CHARS else reply[:REPLY_CHARS].rstrip() + "…",
+    }
+
+
+def _as_summary(record: Dict[str, Any]) -> Dict[str, Any]:
+    """A turn record in summary form, so turns and summaries merge the same way."""
+    if "turns" in record:
+        return record
+    return {
+        "turns": [record["turn"], record["turn"]],
+        "n": 1,
+        "avg_score": record["score"],
+        "max_score": record["score"],
+        "roles": {record["role"]: 1} if record["role"] else {},
+        "requested": dict(Counter(record["requested"])),
+        "revealed": dict(Counter(record["revealed"])),
+        "triggers": dict(Counter(t for t in record["triggers"] if t)),
+    }
+
+
+def summarize(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge consecutive turn records and/or summaries into one summary."""
+    parts = [_as_summary(record) for record in records]
+    n = sum(part["n"] for part in parts)
+
+    def merged(field: str) -> Dict[str, int]:
+        total = Counter()
+        for part in parts:
+            total.update(part[field])
+        return dict(total.most_common(SUMMARY_TOP))
+
+    return {
+        "turns": [parts[0]["turns"][0], parts[-1]["turns"][1]],
+        "n": n,
+        "avg_score": round(sum(part["avg_score"] * part["n"] for part in parts) / n, 2),
+        "max_score": max(part["max_score"] for part in parts),
+        "roles": merged("roles"),
+        "requested": merged("requested"),
+        "revealed": merged("revealed"),
+        "triggers": merged("triggers"),
+    }
+
+
+def compact_results(results: List[TurnRecord], token_budget: int = None,
+                    block: int = None) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Returns (records, stats): records oldest first, summaries before verbatim
+    turns; stats has raw_tokens, compact_tokens, turns and summarized_turns.
+    """
+    token_budget = token_budget or config.FEEDBACK_PROMPT_TOKENS
+    block = block or config.FEEDBACK_SUMMARY_BLOCK
+    turns = [compact_turn(number, record) for number, record in enumerate(results, 1)]
+
+    # Newest turns verbatim while they fit in most of the budget; always keep the last one
+    verbatim, used = [], 0
+    for record in reversed(turns):
+        cost = record_tokens([record])
+        if verbatim and used + cost > token_budget * config.FEEDBACK_VERBATIM_SHARE:
+            break
+        verbatim.insert(0, record)
+        used += cost
+    older = turns[:len(turns) - len(verbatim)]
+
+    # Fold older turns into block summaries, then merge neighbouring summaries until they fit
+    summaries = [summarize(older[i:i + block]) for i in range(0, len(older), block)]
+    while len(summaries) > 1 and record_tokens(summaries) + used > token_budget:
+        summaries = [summarize(summaries[i:i + 2]) for i in range(0, len(summaries), 2)]
+
+    records = summaries + verbatim
+    stats = {
+        "raw_tokens": sum(estimate_tokens(record.to_json()) for record in results),
+        "compact_tokens": record_tokens(records),
+        "turns": len(turns),
+        "summarized_turns": len(older),
+    }
+    return records, stats
+
+
+def render(records: List[Dict[str, Any]]) -> str:
+    """One compact JSON object per line for the prompt."""
+    return "\n".join(_dumps(record) for record in records)
@@ -0,0 +1,159 @@
+import os
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pandas as pd
+import config
+from example_index import ExampleIndex
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RATING_COLUMN = "Contextual Integrity Rating (0–10)"
+PRIMARY_FILE = "contextual_integrity.csv"
+
+
+def _format_rating(value) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else str(value)
+
+
+def render_records(records: List[Dict[str, Any]]) -> str:
+    """Few-shot block in the Role / Request / Score layout request_role_integrity uses."""
+    return "\n".join(
+        f"Role: {r['role']}\nRequest: {r['request']}\nScore: {_format_rating(r['rating'])}" for r in records
+    )
+
+
+class ReferenceDataStore:
+    """
+    All labeled (role, request phrase, rating) CSVs in the data folder, loaded
+    once and grouped by domain. The few-shot example block each domain uses in
+    request_role_integrity is rendered up front. Files are re-read only when
+    one of their mtimes changes (checked at most every check_interval seconds).
+    """
+
+    def __init__(self, data_folder, examples_per_domain: int = 12, check_interval: float = 2.0):
+        self.data_folder = Path(data_folder)
+        self.examples_per_domain = examples_per_domain
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtimes = {}
+        self._last_check = 0.0
+        self.by_domain: Dict[str, pd.DataFrame] = {}
+        self.examples_text: Dict[str, str] = {}
+        self.index = None
+        self._load()
+
+    def _csv_files(self) -> List[Path]:
+        files = sorted(self.data_folder.glob("*.csv"))
+        # The combined file goes first so its row order decides the default examples
+        return sorted(files, key=lambda path: path.name != PRIMARY_FILE)
+
+    def _domain_for_file(self, path: Path):
+        for domain in config.INFO_CATEGORIES_CONTEXTUAL_INTEGRITY:
+            if path.stem.lower().startswith(domain):
+                return domain
+        return None
+
+    def _read(self, path: Path):
+        df = pd.read_csv(path)
+        df = df.rename(columns={"Role": "role", "Domain": "domain"})
+        if "role" not in df.columns or "Request Phrase" not in df.columns or RATING_COLUMN not in df.columns:
+            logger.info(f"Skipping {path.name}: not a role/request rating file")
+            return None
+        if "domain" not in df.columns:
+            domain = self._domain_for_file(path)
+            if domain is None:
+                logger.info(f"Skipping {path.name}: cannot tell which domain it rates")
+                return None
+            df["domain"] = domain
+        df["domain"] = df["domain"].str.lower().str.strip()
+        df["source"] = path.name
+        return df[["domain", "role", "Request Phrase", RATING_COLUMN, "source"]]
+
+    def _load(self):
+        files = self._csv_files()
+        frames = [df for df in (self._read(path) for path in files) if df is not None]
+        if frames:
+            combined = pd.concat(frames, ignore_index=True)
+            combined = combined.drop_duplicates(subset=["domain", "role", "Request Phrase"], keep="first")
+        else:
+            combined = pd.DataFrame(columns=["domain", "role", "Request Phrase", RATING_COLUMN, "source"])
+
+        by_domain = {domain: group.reset_index(drop=True) for domain, group in combined.groupby("domain", sort=False)}
+        records = self._records(by_domain)
+        examples_text = {
+            domain: render_records([r for r in records if r["domain"] == domain][:self.examples_per_domain])
+            for domain in by_domain
+        }
+
+        self.by_domain = by_domain
+        self.examples_text = examples_text
+        self.index = ExampleIndex(records)
+        self._mtimes = {path: path.stat().st_mtime for path in files}
+        logger.info(f"Loaded {len(combined)} reference ratings across {len(by_domain)} domains from {self.data_folder}")
+
+    def _changed(self) -> bool:
+        current = {path: path.stat().st_mtime for path in self._csv_files()}
+        return current != self._mtimes
+
+    def refresh(self) -> None:
+        """Reload if any CSV was added, removed or modified since the last load."""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            if now - self._last_check < self.check_interval:
+                return
+            self._last_check = now
+            if self._changed():
+                logger.info("Reference data changed on disk, reloading")
+                self._load()
+
+    def examples_block(self, domain: str) -> str:
+        self.refresh()
+        return self.examples_text.get(domain.lower(), "")
+
+    def domain_rows(self, domain: str) -> pd.DataFrame:
+        self.refresh()
+        return self.by_domain.get(domain.lower(), pd.DataFrame())
+
+    def similar_examples_block(self, domain: str, role: str, request: str, k: int = 6) -> str:
+        """Few-shot block of the k labeled ratings most similar to this role and request."""
+        self.refresh()
+        return render_records(self.index.search(role, request, domain=domain, k=k))
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Every rating as a plain dict: domain, role, request, rating, source."""
+        self.refresh()
+        return self.index.records
+
+    def roles(self) -> List[str]:
+        """Distinct role names across all rating files."""
+        return sorted({r["role"] for r in self.records()})
+
+    @staticmethod
+    def _records(by_domain) -> List[Dict[str, Any]]:
+        return [
+            {"domain": domain, "role": role, "request": phrase, "rating": float(rating), "source": source}
+            for domain, rows in by_domain.items()
+            for role, phrase, rating, source in zip(rows["role"], rows["Request Phrase"], rows[RATING_COLUMN], rows["source"])
+        ]
+
+
+_stores: Dict[str, ReferenceDataStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_reference_store(data_folder) -> ReferenceDataStore:
+    """One store per data folder per process."""
+    key = os.path.abspath(data_folder)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = ReferenceDataStore(data_folder)
+        return _stores[key]
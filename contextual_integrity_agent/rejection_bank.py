@@ -0,0 +1,219 @@
+"""
+Pre-generated persona refusals used instead of the per-turn LLM decline call.
+
+The bank is a JSON file: persona domain -> score band -> requested item ->
+list of replies. "*" holds replies for any item, with {item} standing in for
+what was asked; "none" holds replies for turns that asked for nothing we
+recognize. Replies may also use {name}, {role} and {organization}.
+
+The shipped data/rejection_bank.json holds only the "*" and "none" cells:
+hand-written templates per persona and band, with {item} filled in. No
+item-specific cells are included, because writing them needs the LLM and an
+API key. Until they exist, every banked refusal is a generic template.
+Generate or extend them offline with the persona prompt the agent used before:
+    python rejection_bank.py --generate [--variants 3]
+or let REJECTION_BANK_REFRESH fill them in gradually at runtime. Without
+--generate the command only reports how many item cells are filled.
+"""
+import os
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import config
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GENERIC_ITEM = "*"
+NO_ITEM = "none"
+# Spoken labels for categories that don't read well with underscores replaced
+ITEM_LABELS = {
+    "otp": "one-time password",
+    "ssn": "Social Security number",
+    "puk_code": "PUK code",
+    "sim_number": "SIM number",
+    "id_number": "ID number",
+    "civil_id": "civil ID",
+}
+
+
+def item_label(items: List[str]) -> str:
+    labels = [ITEM_LABELS.get(item, item.replace("_", " ")) for item in items]
+    if len(labels) <= 1:
+        return labels[0] if labels else "that information"
+    return ", ".join(labels[:-1]) + " or " + labels[-1]
+
+
+def score_band(integrity_score: float) -> str:
+    """"low" below the basic_info threshold, "medium" up to where info would be revealed."""
+    return "low" if integrity_score < config.TRUST_THRESHOLDS["basic_info"][0] else "medium"
+
+
+def rejection_system_prompt(persona: Dict[str, Any], integrity_score) -> str:
+    return f"""
+You are {persona['name']}, a {persona['role']} at {persona['organization']}.
+
+CURRENT SITUATION:
+- A caller is requesting information
+- Your trust level toward the caller is LOW ({integrity_score}/10)
+- You should NOT reveal any sensitive information
+
+INSTRUCTIONS:
+- Politely decline to provide the requested information
+- Cite security policies or verification requirements
+- Offer alternative ways to verify identity
+- Be professional but firm
+
+Respond naturally and professionally to decline the request.
+"""
+
+
+class RejectionBank:
+    """
+    Refusals per persona, score band and requested item, picked locally in
+    microseconds. The file is loaded once; refresh_cell() adds a freshly
+    generated variant and saves atomically (used by the background refresher).
+    """
+
+    def __init__(self, path, max_variants: int = None):
+        self.path = Path(path)
+        self.max_variants = max_variants or config.REJECTION_BANK_MAX_VARIANTS
+        self._lock = threading.Lock()
+        self._refresher = None
+        self.bank: Dict[str, Dict[str, Dict[str, List[str]]]] = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.bank = json.load(f)
+        except FileNotFoundError:
+            logger.info(f"No rejection bank at {self.path}, refusals will use the LLM")
+        except Exception as e:
+            logger.error(f"Error loading rejection bank from {self.path}: {e}")
+
+    def _candidates(self, domain: str, band: str, requested_info: List[str]) -> List[str]:
+        cells = self.bank.get(domain, {}).get(band, {})
+        if not requested_info:
+            return list(cells.get(NO_ITEM, []))
+        # Item-specific replies only fit single-item requests; several items use the generic templates
+        specific = cells.get(requested_info[0], []) if len(requested_info) == 1 else []
+        return list(specific) + list(cells.get(GENERIC_ITEM, []))
+
+    def choose(self, persona: Dict[str, Any], domain: str, integrity_score: float, requested_info: List[str],
+               avoid: Optional[str] = None, rng: random.Random = random) -> Optional[str]:
+        """A filled-in refusal, or None when the bank has nothing for this persona and band."""
+        with self._lock:
+            candidates = self._candidates(domain.lower(), score_band(integrity_score), requested_info)
+        if not candidates:
+            return None
+        values = {"item": item_label(requested_info), "name": persona["name"], "role": persona["role"],
+                  "organization": persona["organization"]}
+        replies = [template.format(**values) for template in candidates]
+        # Don't say the exact same thing twice in a row
+        fresh = [reply for reply in replies if reply != avoid] or replies
+        return rng.choice(fresh)
+
+    def refresh_cell(self, client, domain: str, band: str, item: str) -> str:
+        """Generate one more variant for a cell with the LLM and persist the bank."""
+        persona = config.AGENT_PERSONAS[domain]
+        # Stored as a template, so literal braces from the model must be escaped
+        reply = generate_reply(client, persona, band, item).replace("{", "{{").replace("}", "}}")
+        with self._lock:
+            variants = self.bank.setdefault(domain, {}).setdefault(band, {}).setdefault(item, [])
+            if reply not in variants:
+                variants.append(reply)
+                # Keep the newest variants
+                del variants[:max(0, len(variants) - self.max_variants)]
+            self.save()
+        return reply
+
+    def save(self) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.bank, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+    def start_refresh(self, client, interval: float = None) -> None:
+        """Regenerate one random item-specific cell every `interval` seconds on a daemon thread."""
+        if self._refresher is not None:
+            return
+        interval = interval or config.REJECTION_BANK_REFRESH_INTERVAL
+        cells = [(domain, band, item) for domain in config.AGENT_PERSONAS for band in ("low", "medium")
+                 for item in config.INFO_CATEGORIES_CONTEXTUAL_INTEGRITY.get(domain, [])]
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.refresh_cell(client, *random.choice(cells))
+                except Exception as e:
+                    logger.error(f"Error refreshing rejection bank: {e}")
+
+        self._refresher = threading.Thread(target=loop, daemon=True, name="rejection-bank-refresh")
+        self._refresher.start()
+
+
+# Representative integrity score per band, shown to the model while generating
+BAND_SCORES = {"low": 2, "medium": 5}
+
+
+def generate_reply(client, persona: Dict[str, Any], band: str, item: str) -> str:
+    request = (f"Hi, can you give me your {item_label([item])}?" if item not in (GENERIC_ITEM, NO_ITEM)
+               else "Hi, I need some details from you.")
+    response = client.chat.completions.create(
+        model=config.OPENAI_MODEL,
+        messages=[
+            {"role": "system", "content": rejection_system_prompt(persona, BAND_SCORES[band])},
+            {"role": "user", "content": request},
+        ],
+        temperature=0.9,
+        max_tokens=250
+    )
+    return response.choices[0].message.content.strip()
+
+
+_banks: Dict[str, RejectionBank] = {}
+_banks_lock = threading.Lock()
+
+
+def get_rejection_bank(path=None) -> RejectionBank:
+    """One bank per file per process."""
+    key = os.path.abspath(path or config.REJECTION_BANK_PATH)
+    with _banks_lock:
+        if key not in _banks:
+            _banks[key] = RejectionBank(key)
+        return _banks[key]
+
+
+if __name__ == "__main__":
+    from openai import OpenAI
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--generate", action="store_true", help="add LLM-written item-specific variants")
+    parser.add_argument("--variants", type=int, default=3, help="variants per persona / band / item")
+    parser.add_argument("--path", default=config.REJECTION_BANK_PATH)
+    args = parser.parse_args()
+
+    bank = get_rejection_bank(args.path)
+    if args.generate:
+        client = OpenAI(api_key=config.OPENAI_API_KEY)
+        for domain, categories in config.INFO_CATEGORIES_CONTEXTUAL_INTEGRITY.items():
+            for band in ("low", "medium"):
+                for item in categories:
+                    existing = bank.bank.get(domain, {}).get(band, {}).get(item, [])
+                    for _ in range(max(0, args.variants - len(existing))):
+                        bank.refresh_cell(client, domain, band, item)
+                    logger.info(f"{domain}/{band}/{item}: done")
+    cells = sum(len(items) for bands in bank.bank.values() for items in bands.values())
+    replies = sum(len(v) for bands in bank.bank.values() for items in bands.values() for v in items.values())
+    item_cells = [(domain, band, item) for domain, categories in config.INFO_CATEGORIES_CONTEXTUAL_INTEGRITY.items()
+                  for band in ("low", "medium") for item in categories]
+    filled = sum(1 for domain, band, item in item_cells if bank.bank.get(domain, {}).get(band, {}).get(item))
+    print(f"{args.path}: {len(bank.bank)} personas, {cells} cells, {replies} replies")
+    print(f"item-specific cells filled: {filled}/{len(item_cells)}"
+          + ("" if filled else " (generic templates only; run with --generate to write them)"))
@@ -0,0 +1,300 @@
+"""
+Cross-session store of every turn's result, for cohort analytics.
+
+Turns are flattened to one row each and appended write-behind: add() only
+queues the row, and a background thread writes batches as Parquet files
+partitioned by domain and day:
+
+    results_store/domain=banking/date=2026-10-17/part-<time>-<id>.parquet
+
+compact() merges each partition's small files into one. The analytics
+functions read only the columns they need and work on whole columns with
+pandas / NumPy, so tens of thousands of turns summarize in milliseconds.
+
+Usage (from contextual_integrity_agent/):
+    python results_store.py [--compact] [--dir results_store]
+"""
+import os
+import time
+import uuid
+import queue
+import atexit
+import logging
+import argparse
+import threading
+import functools
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+from turn_record import TurnRecord
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# pyarrow is imported only once something is written or read, so the app
+# runs without it when RESULTS_STORE_DIR is None.
+@functools.lru_cache(maxsize=None)
+def _schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("session_id", pa.string()),
+        ("turn", pa.int32()),
+        ("ts", pa.timestamp("ms")),
+        ("user_input", pa.string()),
+        ("user_role", pa.string()),
+        ("trust_score", pa.float32()),
+        ("requested_info", pa.list_(pa.string())),
+        ("info_to_reveal", pa.list_(pa.string())),
+        ("triggers", pa.list_(pa.string())),
+        ("pressure_score", pa.float32()),
+        ("success", pa.bool_()),
+        ("turn_seconds", pa.float32()),
+        ("prompt_tokens", pa.int32()),
+        ("completion_tokens", pa.int32()),
+    ])
+
+
+@functools.lru_cache(maxsize=None)
+def _partitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    # Partition columns live in the directory names, not in the files
+    return ds.partitioning(pa.schema([("domain", pa.string()), ("date", pa.string())]), flavor="hive")
+
+
+def result_row(record: TurnRecord, session_id: str, turn: int) -> Dict[str, Any]:
+    """One TurnRecord as a store row."""
+    return {
+        "session_id": session_id,
+        "turn": turn,
+        "ts": pd.Timestamp.now().floor("ms").to_pydatetime(),
+        "domain": record.domain.lower(),
+        "user_input": record.user_input,
+        "user_role": record.user_role,
+        "trust_score": record.trust_score,
+        "requested_info": record.requested_info,
+        "info_to_reveal": record.info_to_reveal,
+        "triggers": record.triggers,
+        "pressure_score": record.pressure_score,
+        "success": record.success,
+        "turn_seconds": record.turn_seconds,
+        "prompt_tokens": record.prompt_tokens,
+        "completion_tokens": record.completion_tokens,
+    }
+
+
+def write_rows(directory, rows: List[Dict[str, Any]]) -> int:
+    """Write rows as one new file per (domain, date) partition; returns the number of files."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _schema()
+    frame = pd.DataFrame(rows)
+    frame["date"] = pd.to_datetime(frame["ts"]).dt.strftime("%Y-%m-%d")
+    files = 0
+    for (domain, date), part in frame.groupby(["domain", "date"], sort=False):
+        target = Path(directory) / f"domain={domain}" / f"date={date}"
+        target.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(part[schema.names], schema=schema, preserve_index=False)
+        name = f"part-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+        # Written under a temp name so readers never see a half-written file
+        tmp = target / f".{name}.tmp"
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, target / name)
+        files += 1
+    return files
+
+
+class ResultsSink:
+    """
+    Write-behind appender shared by all sessions. add() never blocks on disk:
+    rows queue up and a daemon thread writes them every flush_seconds or
+    flush_rows rows, whichever comes first. Rows still queued at interpreter
+    exit are flushed; rows beyond max_queue are dropped with an error.
+    """
+
+    def __init__(self, directory, flush_rows: int = None, flush_seconds: float = None, max_queue: int = 100000):
+        self.directory = Path(directory)
+        self.flush_rows = flush_rows or config.RESULTS_FLUSH_ROWS
+        self.flush_seconds = flush_seconds or config.RESULTS_FLUSH_SECONDS
+        self.written = 0
+        # Rows, threading.Event flush requests, or None to stop
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._worker = threading.Thread(target=self._run, daemon=True, name="results-sink")
+        self._worker.start()
+        atexit.register(self.close)
+
+    def add(self, record: TurnRecord, session_id: str, turn: int) -> None:
+        try:
+            self._queue.put_nowait(result_row(record, session_id, turn))
+        except queue.Full:
+            logger.error("Results store queue full, dropping turn")
+        except Exception as e:
+            logger.error(f"Error recording turn in results store: {e}")
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            write_rows(self.directory, batch)
+            self.written += len(batch)
+        except Exception as e:
+            logger.error(f"Error writing {len(batch)} rows to {self.directory}: {e}")
+
+    def _run(self) -> None:
+        batch, deadline = [], None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+            if isinstance(item, dict):
+                batch.append(item)
+                deadline = deadline or time.monotonic() + self.flush_seconds
+            due = item is None or isinstance(item, threading.Event) or len(batch) >= self.flush_rows or \
+                (deadline is not None and time.monotonic() >= deadline)
+            if batch and due:
+                self._write(batch)
+                batch, deadline = [], None
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is None:
+                return
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Write everything added so far; True once it is on disk."""
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        if self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join(10)
+
+
+_sinks: Dict[str, ResultsSink] = {}
+_sinks_lock = threading.Lock()
+
+
+def get_results_sink(directory=None) -> Optional[ResultsSink]:
+    """One sink per directory per process; None when config.RESULTS_STORE_DIR is unset."""
+    directory = directory or config.RESULTS_STORE_DIR
+    if not directory:
+        return None
+    key = os.path.abspath(directory)
+    with _sinks_lock:
+        if key not in _sinks:
+            _sinks[key] = ResultsSink(key)
+        return _sinks[key]
+
+
+def compact(directory) -> int:
+    """Merge the files of every partition into one; returns the number of partitions rewritten."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rewritten = 0
+    for partition in sorted(Path(directory).glob("domain=*/date=*")):
+        parts = sorted(partition.glob("part-*.parquet"))
+        if len(parts) < 2:
+            continue
+        table = pa.concat_tables(pq.read_table(path, schema=_schema()) for path in parts)
+        name = f"part-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp = partition / f".{name}.tmp"
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, partition / name)
+        for path in parts:
+            path.unlink()
+        rewritten += 1
+    return rewritten
+
+
+# ---------- ANALYTICS ----------
+
+def load(directory=None, columns: List[str] = None, domains: List[str] = None) -> pd.DataFrame:
+    """Read the store (only `columns`, only `domains` partitions) into a DataFrame."""
+    directory = directory or config.RESULTS_STORE_DIR
+    if not directory or not Path(directory).exists():
+        return pd.DataFrame(columns=columns or [])
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(directory, format="parquet", partitioning=_partitioning(),
+                         exclude_invalid_files=False, ignore_prefixes=[".", "_"])
+    if not dataset.files:
+        return pd.DataFrame(columns=columns or [])
+    where = ds.field("domain").isin(domains) if domains else None
+    return dataset.to_table(columns=columns, filter=where).to_pandas()
+
+
+def success_rates(df: pd.DataFrame) -> pd.DataFrame:
+    """Per domain: turns, sessions, turn success rate and share of sessions with at least one success."""
+    per_session = df.groupby(["domain", "session_id"], observed=True)["success"].any()
+    return pd.DataFrame({
+        "turns": df.groupby("domain", observed=True).size(),
+        "sessions": per_session.groupby(level="domain", observed=True).size(),
+        "turn_success_rate": df.groupby("domain", observed=True)["success"].mean(),
+        "session_success_rate": per_session.groupby(level="domain", observed=True).mean(),
+    })
+
+
+def score_distribution(df: pd.DataFrame, by=("domain", "user_role"), min_turns: int = 1) -> pd.DataFrame:
+    """Trust score count / mean / quartiles per group (empty roles are "(none)")."""
+    frame = df.assign(user_role=df["user_role"].replace("", "(none)")) if "user_role" in by else df
+    grouped = frame.groupby(list(by), observed=True)["trust_score"]
+    stats = grouped.describe()[["count", "mean", "25%", "50%", "75%"]]
+    return stats[stats["count"] >= min_turns].sort_values("count", ascending=False)
+
+
+def score_histogram(df: pd.DataFrame, bins=np.arange(0, 11)) -> pd.DataFrame:
+    """Turns per integer trust-score bin (0-1, ..., 9-10) per domain."""
+    return pd.DataFrame({
+        domain: np.histogram(group["trust_score"].to_numpy(), bins=bins)[0]
+        for domain, group in df.groupby("domain", observed=True)
+    }, index=[f"{low}-{high}" for low, high in zip(bins[:-1], bins[1:])])
+
+
+def most_extracted(df: pd.DataFrame, top: int = 10, column: str = "info_to_reveal") -> pd.Series:
+    """The items revealed most often across all turns (or requested, with column="requested_info")."""
+    items = df[column].explode().dropna()
+    return items.value_counts().head(top)
+
+
+def cohort_report(directory=None) -> Dict[str, Any]:
+    """Everything above from one column-pruned read of the store."""
+    df = load(directory, columns=["session_id", "domain", "user_role", "trust_score", "success", "info_to_reveal"])
+    if df.empty:
+        return {}
+    df["domain"] = df["domain"].astype("category")
+    return {
+        "success_rates": success_rates(df),
+        "score_distribution": score_distribution(df),
+        "score_histogram": score_histogram(df),
+        "most_extracted": most_extracted(df),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=config.RESULTS_STORE_DIR)
+    parser.add_argument("--compact", action="store_true", help="merge each partition's files first")
+    args = parser.parse_args()
+
+    if args.compact:
+        print(f"Compacted {compact(args.dir)} partitions")
+    start = time.perf_counter()
+    report = cohort_report(args.dir)
+    elapsed = time.perf_counter() - start
+    if not report:
+        print(f"No results in {args.dir}")
+    for name, table in report.items():
+        print(f"\n== {name} ==")
+        print(table.to_string())
+    print(f"\nReport computed in {1000 * elapsed:.0f} ms")
@@ -0,0 +1,80 @@
+import re
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import config
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# End of a sentence: terminal punctuation (optionally closed by a quote or bracket) then whitespace
+SENTENCE_END = re.compile(r"[.!?…]+[\"')\]]*\s+")
+
+
+class SentenceChunker:
+    """
+    Turns a stream of text deltas into whole sentences. Sentences shorter
+    than min_chars are held back and joined with the next one, so
+    abbreviations ("Inc.", "Mr.") and one-word replies don't become
+    separate, choppy TTS clips.
+    """
+
+    def __init__(self, min_chars: int = None):
+        self.min_chars = config.TTS_MIN_SENTENCE_CHARS if min_chars is None else min_chars
+        self._buffer = ""
+
+    def feed(self, delta: str) -> List[str]:
+        """Add a delta; return the sentences it completed (possibly none)."""
+        self._buffer += delta
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self._buffer):
+            if match.end() - start < self.min_chars:
+                continue
+            sentences.append(self._buffer[start:match.end()].strip())
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """Whatever is left once the stream has ended."""
+        rest, self._buffer = self._buffer.strip(), ""
+        return rest or None
+
+
+class SpeechQueue:
+    """
+    Synthesizes sentences on a shared executor as they are added and hands
+    the clips back strictly in sentence order. `synthesize` runs on worker
+    threads, so it must not touch Streamlit; a failed clip is skipped.
+    """
+
+    def __init__(self, synthesize: Callable[[str], Optional[bytes]], executor: ThreadPoolExecutor):
+        self.synthesize = synthesize
+        self.executor = executor
+        self._pending: List[Future] = []
+        self.clips: List[bytes] = []
+
+    def add(self, sentence: str) -> None:
+        self._pending.append(self.executor.submit(self.synthesize, sentence))
+
+    def ready(self, wait: bool = False) -> List[bytes]:
+        """Clips finished since the last call, stopping at the first one still in progress unless wait."""
+        clips = []
+        while self._pending and (wait or self._pending[0].done()):
+            future = self._pending.pop(0)
+            try:
+                clip = future.result()
+            except Exception as e:
+                logger.error(f"Error synthesizing sentence: {e}")
+                clip = None
+            if clip:
+                clips.append(clip)
+        self.clips.extend(clips)
+        return clips
+
+    def audio(self) -> bytes:
+        """All clips so far as one MP3 (MP3 frames concatenate cleanly)."""
+        return b"".join(self.clips)
@@ -0,0 +1,110 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+# Token usage of the turn currently being processed, keyed by LLM call name.
+# A context variable so concurrent turns (threads or asyncio tasks) never mix.
+_turn_usage = contextvars.ContextVar("turn_usage", default=None)
+# Structured spans of the current turn (stages, LLM calls, cache lookups) and its start time
+_turn_spans = contextvars.ContextVar("turn_spans", default=None)
+_turn_started = contextvars.ContextVar("turn_started", default=None)
+# Innermost open span, so LLM calls know which stage they belong to and record_usage can fill them in
+_open_span = contextvars.ContextVar("open_span", default=None)
+_lock = threading.Lock()
+
+
+def begin_turn() -> Dict[str, Dict[str, int]]:
+    """Start collecting token usage for a new turn and return the live dict."""
+    usage = {}
+    _turn_usage.set(usage)
+    _turn_spans.set([])
+    _turn_started.set(time.perf_counter())
+    return usage
+
+
+def turn_spans() -> List[Dict[str, Any]]:
+    """The live span list of the current turn (empty outside a turn)."""
+    spans = _turn_spans.get()
+    return spans if spans is not None else []
+
+
+def _new_span(name: str, kind: str, attributes: Dict[str, Any]) -> Dict[str, Any]:
+    started = _turn_started.get()
+    parent = _open_span.get()
+    return {
+        "name": name,
+        "kind": kind,
+        "parent": parent["name"] if parent else None,
+        "start": round(time.perf_counter() - started, 4) if started is not None else 0.0,
+        "start_unix_ns": time.time_ns(),
+        "duration": 0.0,
+        "error": None,
+        **attributes,
+    }
+
+
+def _finish(record: Dict[str, Any]) -> None:
+    spans = _turn_spans.get()
+    if spans is not None:
+        with _lock:
+            spans.append(record)
+
+
+@contextmanager
+def span(name: str, kind: str = "llm", **attributes):
+    """
+    Time the enclosed block as one span of the current turn. Exceptions are
+    recorded on the span and re-raised. LLM spans get model and token counts
+    from record_usage calls made inside them.
+    """
+    record = _new_span(name, kind, attributes)
+    if kind == "llm":
+        record.update(model=None, prompt_tokens=0, completion_tokens=0)
+    token = _open_span.set(record)
+    started = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record["duration"] = round(time.perf_counter() - started, 4)
+        _open_span.reset(token)
+        _finish(record)
+
+
+def record_span(name: str, kind: str, duration: float = 0.0, **attributes) -> None:
+    """Add an already-finished span, e.g. a cache hit that made no call."""
+    record = _new_span(name, kind, attributes)
+    record["duration"] = round(duration, 4)
+    _finish(record)
+
+
+def record_usage(call: str, response) -> None:
+    """Add the token counts of one chat-completion response to the current turn."""
+    usage = _turn_usage.get()
+    counts = getattr(response, "usage", None)
+    open_span = _open_span.get()
+    if open_span is not None and open_span.get("kind") == "llm":
+        open_span["model"] = getattr(response, "model", None)
+        if counts is not None:
+            open_span["prompt_tokens"] += getattr(counts, "prompt_tokens", 0) or 0
+            open_span["completion_tokens"] += getattr(counts, "completion_tokens", 0) or 0
+    if usage is None or counts is None:
+        return
+    with _lock:
+        entry = usage.setdefault(call, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+        entry["calls"] += 1
+        entry["prompt_tokens"] += getattr(counts, "prompt_tokens", 0) or 0
+        entry["completion_tokens"] += getattr(counts, "completion_tokens", 0) or 0
+
+
+def total_tokens(usage: Dict[str, Dict[str, int]]) -> Dict[str, int]:
+    """Sum a turn's usage dict into calls / prompt / completion totals."""
+    totals = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    for entry in usage.values():
+        for key in totals:
+            totals[key] += entry.get(key, 0)
+    return totals
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Modules are imported by name from contextual_integrity_agent/, as the app and benchmarks do
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
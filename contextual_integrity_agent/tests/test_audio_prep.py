@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+import audio_prep
+import config
+
+
+def tone(seconds, rate=16000, freq=440.0, amplitude=0.3):
+    t = np.arange(int(seconds * rate)) / rate
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+@pytest.mark.parametrize("seconds", [0.02, 0.1, 0.2, 0.29])
+def test_short_voiced_clip_shorter_than_padding_window(seconds):
+    samples = tone(seconds)
+    trimmed = audio_prep.trim_silence(samples, 16000)
+    frames = len(samples) // int(16000 * audio_prep.FRAME_SECONDS)
+    assert len(trimmed) == frames * int(16000 * audio_prep.FRAME_SECONDS)
+
+
+def test_short_clip_preprocesses_end_to_end():
+    data = audio_prep._encode_wav(tone(0.2, rate=48000), 48000)
+    output, name, stats = audio_prep.preprocess(data, codec=None)
+    assert name == "recording.wav"
+    assert stats["output_seconds"] == pytest.approx(0.2, abs=0.02)
+
+
+def test_leading_and_trailing_silence_is_cut_to_padding():
+    rate = 16000
+    samples = np.concatenate([np.zeros(rate), tone(1.0), np.zeros(rate)])
+    trimmed = audio_prep.trim_silence(samples, rate, padding=0.1)
+    assert len(trimmed) / rate == pytest.approx(1.2, abs=0.05)
+
+
+def test_silent_clip_trims_to_nothing():
+    assert len(audio_prep.trim_silence(np.zeros(16000, dtype=np.float32), 16000)) == 0
+
+
+def test_resample_keeps_duration_for_tiny_inputs():
+    assert len(audio_prep.resample(np.ones(2, dtype=np.float32), 48000)) == 1
+    assert len(audio_prep.resample(tone(0.5, rate=48000), 48000)) == 8000
+
+
+def test_estimated_raw_ms_is_none_when_nothing_was_trimmed():
+    stats = {"input_seconds": 2.0, "output_seconds": 2.0, "input_bytes": 1000, "output_bytes": 1000,
+             "transcribe_ms": 300.0}
+    assert audio_prep.estimated_raw_ms(stats) is None
+
+
+def test_estimated_raw_ms_scales_with_trimmed_duration_and_saved_bytes():
+    stats = {"input_seconds": 4.0, "output_seconds": 2.0, "input_bytes": 2000, "output_bytes": 1000,
+             "transcribe_ms": 300.0}
+    expected = 600.0 + 1000 * 1000 / config.AUDIO_UPLINK_BYTES_PER_SECOND
+    assert audio_prep.estimated_raw_ms(stats) == pytest.approx(expected)
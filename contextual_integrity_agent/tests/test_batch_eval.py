@@ -0,0 +1,63 @@
+import json
+
+from batch_eval import completed_rows, run_batch
+
+
+class StubAgent:
+    """Answers every row locally; utterances in `failing` raise once."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.seen = []
+
+    def process(self, utterance, domain, conversation_history=None):
+        self.seen.append(utterance)
+        if utterance in self.failing:
+            self.failing.discard(utterance)
+            raise RuntimeError("upstream timeout")
+        return {"domain": domain, "user_input": utterance, "agent_response": "no", "trust_score": 2.0}
+
+
+def write_corpus(path, n):
+    path.write_text("".join(json.dumps({"domain": "banking", "utterance": f"u{i}"}) + "\n" for i in range(n)))
+
+
+def read_output(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_partial_last_line_is_truncated(tmp_path):
+    output = tmp_path / "out.jsonl"
+    good = json.dumps({"row": 0}) + "\n" + json.dumps({"row": 1, "error": "x"}) + "\n"
+    output.write_bytes(good.encode() + b'{"row": 2, "user_inp')
+
+    assert completed_rows(output) == {0}
+    assert output.read_bytes() == good.encode()
+
+
+def test_unparseable_line_ends_the_valid_prefix(tmp_path):
+    output = tmp_path / "out.jsonl"
+    output.write_bytes(b'{"row": 0}\nnot json\n{"row": 2}\n')
+    assert completed_rows(output) == {0}
+    assert output.read_bytes() == b'{"row": 0}\n'
+
+
+def test_resume_skips_done_rows_and_retries_failed_ones(tmp_path):
+    corpus, output = tmp_path / "corpus.jsonl", tmp_path / "out.jsonl"
+    write_corpus(corpus, 4)
+
+    first = run_batch(StubAgent(failing={"u2"}), corpus, output, workers=2)
+    assert first == {"done": 3, "failed": 1, "skipped": 0}
+
+    # Simulate a crash mid-write after the first run
+    with open(output, "ab") as f:
+        f.write(b'{"row": 3, "dom')
+
+    agent = StubAgent()
+    second = run_batch(agent, corpus, output, workers=2)
+    assert agent.seen == ["u2"]
+    assert second == {"done": 1, "failed": 0, "skipped": 3}
+
+    records = read_output(output)
+    assert sorted(r["row"] for r in records if not r.get("error")) == [0, 1, 2, 3]
+    assert all("trust_score" in r for r in records if not r.get("error"))
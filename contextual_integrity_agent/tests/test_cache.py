@@ -0,0 +1,51 @@
+import cache
+from cache import IntegrityCache
+
+
+def test_roundtrip_normalizes_domain_and_role(tmp_path):
+    store = IntegrityCache(str(tmp_path / "c.sqlite3"), version="v1")
+    store.put("Banking", "Bank  Manager.", {"score": 7})
+    assert store.get("banking", "bank manager") == {"score": 7}
+    assert store.stats() == {"hits": 1, "misses": 0}
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    store = IntegrityCache(str(tmp_path / "c.sqlite3"), ttl_seconds=60, version="v1")
+    store.put("banking", "judge", {"score": 3})
+
+    now[0] += 59
+    assert store.get("banking", "judge") == {"score": 3}
+    now[0] += 2
+    assert store.get("banking", "judge") is None
+    # The expired row is gone, not just hidden
+    now[0] = 1000.0
+    assert store.get("banking", "judge") is None
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    store = IntegrityCache(str(tmp_path / "c.sqlite3"), max_entries=2, version="v1")
+    store.put("banking", "a", {"score": 1})
+    now[0] += 1
+    store.put("banking", "b", {"score": 2})
+    now[0] += 1
+    assert store.get("banking", "a") is not None  # "a" is now more recent than "b"
+    now[0] += 1
+    store.put("banking", "c", {"score": 3})
+
+    assert store.get("banking", "b") is None
+    assert store.get("banking", "a") == {"score": 1}
+    assert store.get("banking", "c") == {"score": 3}
+
+
+def test_new_version_drops_old_entries(tmp_path):
+    path = str(tmp_path / "c.sqlite3")
+    IntegrityCache(path, version="v1").put("banking", "judge", {"score": 3})
+    assert IntegrityCache(path, version="v1").get("banking", "judge") == {"score": 3}
+
+    assert IntegrityCache(path, version="v2").get("banking", "judge") is None
+    # Reopening with the old version doesn't bring it back: v2 deleted the rows
+    assert IntegrityCache(path, version="v1").get("banking", "judge") is None
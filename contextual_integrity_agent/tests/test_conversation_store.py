@@ -0,0 +1,72 @@
+from conversation_store import ConversationStore, RecentSet, SpillDatabase, estimate_tokens
+
+
+def message(i, role=None, size=10):
+    return {"role": role or ("user" if i % 2 == 0 else "assistant"), "content": f"{i:03d}" + "x" * size}
+
+
+def test_only_the_window_stays_in_memory_and_older_messages_spill(tmp_path):
+    store = ConversationStore("s:banking", window=4, database=SpillDatabase(str(tmp_path / "c.sqlite3")))
+    for i in range(10):
+        store.append(message(i))
+
+    assert len(store) == 10
+    assert store.spilled == 6
+    assert [m["content"][:3] for m in store.recent()] == ["006", "007", "008", "009"]
+    # Pages come back oldest first, just before the window
+    assert [m["content"][:3] for m in store.older(pages=1, page_size=4)] == ["002", "003", "004", "005"]
+    assert [m["content"][:3] for m in store.older(pages=2, page_size=4)] == ["000", "001", "002", "003", "004", "005"]
+
+
+def test_conversations_sharing_a_database_are_isolated(tmp_path):
+    database = SpillDatabase(str(tmp_path / "c.sqlite3"))
+    a = ConversationStore("s:banking", window=1, database=database)
+    b = ConversationStore("s:law", window=1, database=database)
+    for i in range(3):
+        a.append(message(i))
+        b.append(message(100 + i))
+
+    assert [m["content"][:3] for m in a.older(pages=1, page_size=10)] == ["000", "001"]
+    a.clear()
+    assert len(a) == 0 and a.older(pages=1, page_size=10) == []
+    assert [m["content"][:3] for m in b.older(pages=1, page_size=10)] == ["100", "101"]
+
+
+def test_history_keeps_newest_turns_within_budget_and_reads_spilled_ones(tmp_path):
+    store = ConversationStore("s:banking", window=2, database=SpillDatabase(str(tmp_path / "c.sqlite3")))
+    for i in range(6):
+        store.append(message(i))
+    store.append({"role": "analysis", "content": ["log line"]})
+    cost = estimate_tokens(message(0)["content"])
+
+    history = store.history(token_budget=4 * cost)
+    # Reaches past the in-memory window into the spill, skips non-chat roles, stays in order
+    assert [m["content"][:3] for m in history] == ["002", "003", "004", "005"]
+    assert all(set(m) == {"role", "content"} for m in history)
+    assert store.history(token_budget=cost - 1) == []
+
+
+def test_history_stops_at_the_first_message_over_budget(tmp_path):
+    store = ConversationStore("s:banking", window=10, database=SpillDatabase(str(tmp_path / "c.sqlite3")))
+    store.append(message(0))
+    store.append(message(1, size=400))
+    store.append(message(2))
+    budget = estimate_tokens(message(2)["content"]) + 10
+    assert [m["content"][:3] for m in store.history(token_budget=budget)] == ["002"]
+
+
+def test_spilled_rows_older_than_ttl_are_dropped_on_open(tmp_path):
+    path = str(tmp_path / "c.sqlite3")
+    store = ConversationStore("s:banking", window=1, database=SpillDatabase(path))
+    for i in range(3):
+        store.append(message(i))
+    assert SpillDatabase(path, ttl_seconds=3600).page("s:banking", 10, 10) != []
+    assert SpillDatabase(path, ttl_seconds=-1).page("s:banking", 10, 10) == []
+
+
+def test_recent_set_forgets_oldest_items():
+    seen = RecentSet(maxlen=2)
+    for item in ["a", "b", "a", "c"]:
+        seen.add(item)
+    assert "a" in seen and "c" in seen and "b" not in seen
+    assert len(seen) == 2
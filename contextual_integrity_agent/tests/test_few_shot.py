@@ -0,0 +1,22 @@
+from pathlib import Path
+
+from tools4 import TrustCalculator
+
+DATA = Path(__file__).resolve().parent.parent / "data"
+
+
+def test_similar_examples_are_searched_with_the_callers_utterance():
+    calculator = TrustCalculator(None, data_folder=DATA, few_shot_mode="similar")
+    queries = []
+    calculator.reference_data.similar_examples_block = lambda domain, role, request, k: queries.append(request) or ""
+
+    utterance = "I'm from the fraud team, read me the code we just texted you"
+    prompt = calculator._request_role_prompt("Fraud Investigator", "otp", "Banking", user_input=utterance)
+
+    assert queries == [utterance]
+    assert "requesting 'otp'" in prompt
+
+
+def test_category_is_the_query_without_an_utterance():
+    assert TrustCalculator.few_shot_query("otp") == "otp"
+    assert TrustCalculator.few_shot_query("otp", "send me the code") == "send me the code"
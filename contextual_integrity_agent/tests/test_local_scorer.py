@@ -0,0 +1,53 @@
+import local_scorer
+from local_scorer import LocalIntegrityScorer, load_or_train
+
+RECORDS = [
+    {"domain": "banking", "role": "bank manager", "request": "give me the customer's account balance", "rating": 8.0},
+    {"domain": "banking", "role": "student", "request": "tell me your one time password", "rating": 1.0},
+    {"domain": "banking", "role": "fraud investigator", "request": "read me the code we sent", "rating": 4.0},
+]
+
+
+def count_trainings(monkeypatch):
+    calls = []
+    original = LocalIntegrityScorer.__init__
+
+    def counting_init(self, records, k=5):
+        calls.append(len(records))
+        original(self, records, k=k)
+
+    monkeypatch.setattr(LocalIntegrityScorer, "__init__", counting_init)
+    return calls
+
+
+def test_artifact_is_reused_for_the_same_records(tmp_path, monkeypatch):
+    path = tmp_path / "scorer.pkl"
+    first = load_or_train(path, RECORDS, k=2)
+    trainings = count_trainings(monkeypatch)
+
+    second = load_or_train(path, [dict(r) for r in RECORDS], k=2)
+
+    assert trainings == []
+    assert second.fingerprint == first.fingerprint
+    assert second.predict("bank manager", "account balance", "banking") == first.predict("bank manager", "account balance", "banking")
+
+
+def test_changed_records_or_k_retrain_and_overwrite(tmp_path, monkeypatch):
+    path = tmp_path / "scorer.pkl"
+    load_or_train(path, RECORDS, k=2)
+    trainings = count_trainings(monkeypatch)
+
+    changed = RECORDS[:2] + [dict(RECORDS[2], rating=6.0)]
+    retrained = load_or_train(path, changed, k=2)
+    load_or_train(path, changed, k=3)
+
+    assert trainings == [3, 3]
+    assert retrained.fingerprint == local_scorer.records_fingerprint(changed)
+    assert LocalIntegrityScorer.load(path).k == 3
+
+
+def test_unreadable_artifact_is_replaced(tmp_path):
+    path = tmp_path / "scorer.pkl"
+    path.write_bytes(b"not a pickle")
+    scorer = load_or_train(path, RECORDS, k=2)
+    assert LocalIntegrityScorer.load(path).fingerprint == scorer.fingerprint
@@ -0,0 +1,46 @@
+import config
+from matcher import RequestMatcher
+
+
+def test_out_of_domain_synonym_defers_to_llm():
+    # A passport is something the government persona holds, not the banking one
+    result = RequestMatcher().match("What is your passport number?", "banking")
+    assert result["requested_info"] == []
+    assert not result["confident"]
+    assert [span["reason"] for span in result["unsure"]] == ["not in this domain"]
+
+
+def test_in_domain_synonym_matches_locally():
+    result = RequestMatcher().match("Please tell me your one-time code", "banking")
+    assert result["requested_info"] == ["otp"]
+    assert result["confident"]
+
+
+def test_ambiguous_single_words_are_not_matched():
+    matcher = RequestMatcher()
+    for text, domain in [
+        ("Can I get a copy of the statement you gave yesterday?", "law"),
+        ("What is your position on this?", "banking"),
+        ("I need your ID", "government"),
+    ]:
+        result = matcher.match(text, domain)
+        assert result["requested_info"] == [], text
+        assert not result["confident"], text
+
+
+def test_shared_phrase_resolves_to_the_domains_own_category():
+    matcher = RequestMatcher()
+    assert matcher.match("Please give me your national ID", "telecom")["requested_info"] == ["id_number"]
+    assert matcher.match("Please give me your national ID", "government")["requested_info"] == ["civil_id"]
+    result = matcher.match("Please give me your national ID", "banking")
+    assert result["requested_info"] == [] and not result["confident"]
+
+
+def test_no_phrase_names_two_categories_of_one_domain():
+    categories_by_phrase = {}
+    for category, phrases in config.REQUEST_SYNONYMS.items():
+        for phrase in [category.replace("_", " ")] + phrases:
+            categories_by_phrase.setdefault(phrase.lower(), set()).add(category)
+    for domain, categories in config.INFO_CATEGORIES_CONTEXTUAL_INTEGRITY.items():
+        for phrase, named in categories_by_phrase.items():
+            assert len(named & set(categories)) <= 1, (domain, phrase, named)
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from feedback_agent import FeedbackAgent, MetricsAccumulator, score_from_metrics
+from turn_record import TurnRecord
+
+
+def recompute(results):
+    """The original per-metric passes over the whole results list."""
+    scores = [r.trust_score for r in results]
+    trigger_count = sum(len(r.triggers) for r in results)
+    info = sum(len(r.info_to_reveal) for r in results)
+    if not scores:
+        phase = "neutral"
+    else:
+        phase = "increment" if scores[-1] > scores[0] else "decrement"
+    return {
+        "trigger_count": trigger_count,
+        "trigger_repetition": trigger_count / max(1, len(results)),
+        "trust_increases": sum(1 for i in range(1, len(scores)) if scores[i] > scores[i - 1]),
+        "trust_decreases": sum(1 for i in range(1, len(scores)) if scores[i] < scores[i - 1]),
+        "info_revealed": info,
+        "info_ratio": info / max(1, len(results)),
+        "mistakes": sum(r.mistakes for r in results),
+        "phase_trend": phase,
+    }
+
+
+def random_results(rng, n):
+    return [
+        TurnRecord(
+            trust_score=rng.choice([rng.uniform(0, 10), 5.0]),
+            triggers=["urgent"] * rng.randint(0, 3),
+            info_to_reveal=rng.sample(["otp", "name", "phone"], rng.randint(0, 2)),
+            mistakes=rng.randint(0, 2),
+        )
+        for _ in range(n)
+    ]
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_incremental_metrics_match_a_full_recompute_after_every_turn(seed):
+    rng = random.Random(seed)
+    results = random_results(rng, rng.randint(0, 12))
+    accumulator = MetricsAccumulator()
+    assert accumulator.metrics() == recompute([])
+    for turns, record in enumerate(results, 1):
+        accumulator.add(record)
+        assert accumulator.metrics() == pytest.approx(recompute(results[:turns]))
+        assert accumulator.score() == score_from_metrics(recompute(results[:turns]))
+
+
+def test_record_built_from_state_counts_breaches_and_triggers():
+    record = TurnRecord.from_state({
+        "trust_score": 7, "detected_triggers": [{"keyword": "urgent"}, {}], "info_to_reveal": ["otp"],
+        "analysis_log": ["ok", "BREACH: revealed otp", "BREACH: revealed name"],
+    })
+    metrics = MetricsAccumulator.from_results([record]).metrics()
+    assert (metrics["trigger_count"], metrics["info_revealed"], metrics["mistakes"]) == (2, 1, 2)
+
+
+def test_feedback_agent_recomputes_when_the_live_accumulator_is_stale():
+    results = random_results(random.Random(1), 6)
+    stale = MetricsAccumulator.from_results(results[:4])
+    agent = FeedbackAgent(results, llm=None, accumulator=stale)
+    agent.compute_metrics()
+    assert agent.metrics == pytest.approx(recompute(results))
+
+    live = MetricsAccumulator.from_results(results)
+    agent = FeedbackAgent(results, llm=None, accumulator=live)
+    agent.compute_metrics()
+    agent.calculate_score()
+    assert agent.score == live.score()
+
+
+def test_analyze_helpers_agree_with_compute_metrics():
+    results = random_results(random.Random(2), 8)
+    agent = FeedbackAgent(results, llm=None)
+    agent.compute_metrics()
+    metrics = agent.metrics
+    assert agent.analyze_triggers() == pytest.approx((metrics["trigger_count"], metrics["trigger_repetition"]))
+    assert agent.analyze_trust_trends() == (metrics["trust_increases"], metrics["trust_decreases"])
+    assert agent.analyze_info_ratio() == pytest.approx((metrics["info_revealed"], metrics["info_ratio"]))
+    assert agent.analyze_mistakes() == metrics["mistakes"]
+    assert agent.analyze_phases() == metrics["phase_trend"]
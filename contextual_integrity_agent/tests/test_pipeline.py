@@ -0,0 +1,49 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline import STAGE_GRAPH, run_stages_concurrent
+
+
+def test_generate_response_streams_on_caller_thread_while_independent_stage_runs():
+    release_triggers = threading.Event()
+    triggers_done = threading.Event()
+    deltas = []
+
+    def slow_triggers(state):
+        # Held until the reply has streamed, so it is guaranteed to be in flight
+        assert release_triggers.wait(5)
+        state["detected_triggers"] = [{"keyword": "urgent"}]
+        triggers_done.set()
+        return state
+
+    def on_delta(text):
+        deltas.append((text, threading.get_ident(), triggers_done.is_set()))
+
+    def generate_response(state):
+        on_delta("Hello")
+        on_delta(" there")
+        state["agent_response"] = "Hello there"
+        release_triggers.set()
+        return state
+
+    def noop(state):
+        return state
+
+    stages = {
+        "extract_user_role": noop,
+        "assess_vulnerability": noop,
+        "detect_triggers": slow_triggers,
+        "calculate_integrity": noop,
+        "generate_response": generate_response,
+    }
+    state = {"analysis_log": []}
+    with ThreadPoolExecutor(max_workers=4, thread_name_prefix="stage") as executor:
+        state = run_stages_concurrent(stages, STAGE_GRAPH, state, executor)
+
+    caller = threading.get_ident()
+    assert [text for text, _, _ in deltas] == ["Hello", " there"]
+    assert all(thread == caller for _, thread, _ in deltas)
+    assert not any(finished for _, _, finished in deltas)
+    assert state["agent_response"] == "Hello there"
+    assert state["detected_triggers"] == [{"keyword": "urgent"}]
+    assert set(state["stage_timings"]) == set(STAGE_GRAPH) | {"turn"}
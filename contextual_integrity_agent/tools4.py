@@ -1,11 +1,21 @@
 import pandas as pd
 import os
+import time
+import asyncio
 import logging
+import contextvars
+import hashlib
 from typing import Dict, Any, List
 from openai import OpenAI
 from langchain_core.output_parsers import JsonOutputParser
 import config
 from config import AGENT_PERSONAS
+from telemetry import record_span, record_usage, span
+from reference_data import get_reference_store
+from local_scorer import load_or_train
+import threading
+from matcher import RequestMatcher, RoleMatcher
+from triggers import get_trigger_engine
 from pathlib import Path
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -13,17 +23,23 @@ logger = logging.getLogger(__name__)
 
 
 class TriggerAnalyzer:
-    def __init__(self, openai_client, data_folder="data"):
+    def __init__(self, openai_client, data_folder="data", async_client=None, fast_path=config.ROLE_MATCHER_FAST_PATH):
         self.data_folder = data_folder
         self.openai = openai_client
+        self.aopenai = async_client
         self.parser = JsonOutputParser()
-
-    def extract_user_role(self, user_input: str) -> Dict[str, str]:
-        """
-        Extract the specific role that the user mentioned in their input.
-        Returns JSON with the role if mentioned, otherwise returns empty role.
-        """
-        prompt = f"""
+        # Pattern + lexicon extractor that answers clear role claims without an LLM call
+        self.role_matcher = None
+        if fast_path:
+            roles = get_reference_store(data_folder).roles() + config.ROLE_LEXICON_EXTRA
+            self.role_matcher = RoleMatcher(roles)
+        self._path_stats = {"local": [0, 0.0], "llm": [0, 0.0]}
+        self._stats_lock = threading.Lock()
+        # Trigger keywords from data.csv / trigger_words.xlsx, compiled once per process
+        self.trigger_engine = get_trigger_engine()
+
+    def _role_prompt(self, user_input: str) -> str:
+        return f"""
         You are a role extraction specialist. Your task is to identify if the user has mentioned a specific role or job title in their input.
 
         RULES:
@@ -53,64 +69,192 @@ class TriggerAnalyzer:
         Return ONLY JSON in format: {{"role": "extracted role or empty string"}}
         """
 
+    def _parse_role(self, ai_text: str, user_input: str) -> Dict[str, str]:
+        parsed = self.parser.parse(ai_text)
+        role = parsed.get("role", "").strip()
+        logger.info(f"Extracted role: '{role}' from input: '{user_input[:50]}...'")
+        return {"role": role}
+
+    def detect_triggers(self, user_input: str) -> Dict[str, Any]:
+        """
+        Pressure tactics in the input ("right now", "final chance", ...), found
+        locally in one pass. Returns the detected triggers and a 0-10 pressure score.
+        """
+        result = self.trigger_engine.detect(user_input)
+        logger.info(f"Detected triggers: {[hit['keyword'] for hit in result['detected_triggers']]} "
+                    f"(pressure {result['pressure_score']})")
+        return result
+
+    def _match_locally(self, user_input: str):
+        if self.role_matcher is None:
+            return None
+        local = self.role_matcher.match(user_input)
+        if local["confident"]:
+            logger.info(f"Extracted role locally: '{local['role']}' from input: '{user_input[:50]}...'")
+        return local
+
+    def _record_path(self, path: str, started: float) -> None:
+        with self._stats_lock:
+            self._path_stats[path][0] += 1
+            self._path_stats[path][1] += time.perf_counter() - started
+
+    def path_stats(self) -> Dict[str, Any]:
+        """Calls and average latency per extraction path, plus the share answered locally."""
+        with self._stats_lock:
+            stats = {path: {"calls": n, "avg_ms": 1000 * total / n if n else 0.0} for path, (n, total) in self._path_stats.items()}
+        calls = stats["local"]["calls"] + stats["llm"]["calls"]
+        stats["local_hit_rate"] = stats["local"]["calls"] / calls if calls else 0.0
+        return stats
+
+    def _llm_role(self, user_input: str) -> Dict[str, str]:
         try:
-            response = self.openai.chat.completions.create(
-                model=config.OPENAI_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0
-            )
+            with span("extract_user_role"):
+                response = self.openai.chat.completions.create(
+                    model=config.OPENAI_MODEL,
+                    messages=[{"role": "user", "content": self._role_prompt(user_input)}],
+                    temperature=0
+                )
+                record_usage("extract_user_role", response)
+                return self._parse_role(response.choices[0].message.content, user_input)
+
+        except Exception as e:
+            logger.error(f"Error extracting user role: {e}")
+            return {"role": ""}
 
-            ai_text = response.choices[0].message.content
-            parsed = self.parser.parse(ai_text)
-            
-            role = parsed.get("role", "").strip()
-            
-            logger.info(f"Extracted role: '{role}' from input: '{user_input[:50]}...'")
-            
-            return {"role": role}
+    async def _allm_role(self, user_input: str) -> Dict[str, str]:
+        try:
+            with span("extract_user_role"):
+                response = await self.aopenai.chat.completions.create(
+                    model=config.OPENAI_MODEL,
+                    messages=[{"role": "user", "content": self._role_prompt(user_input)}],
+                    temperature=0
+                )
+                record_usage("extract_user_role", response)
+                return self._parse_role(response.choices[0].message.content, user_input)
 
         except Exception as e:
             logger.error(f"Error extracting user role: {e}")
             return {"role": ""}
+
+    def extract_user_role(self, user_input: str) -> Dict[str, Any]:
+        """
+        Extract the specific role that the user mentioned in their input.
+        Returns JSON with the role if mentioned, otherwise returns empty role.
+        Clear claims are resolved locally; "path" says which extractor answered.
+        """
+        started = time.perf_counter()
+        local = self._match_locally(user_input)
+        if local is not None and local["confident"]:
+            self._record_path("local", started)
+            return {"role": local["role"], "path": "local", "trigger": local["trigger"]}
+        result = self._llm_role(user_input)
+        self._record_path("llm", started)
+        return dict(result, path="llm", unsure=local["unsure"] if local else [])
+
+    async def aextract_user_role(self, user_input: str) -> Dict[str, Any]:
+        """Async twin of extract_user_role."""
+        started = time.perf_counter()
+        local = self._match_locally(user_input)
+        if local is not None and local["confident"]:
+            self._record_path("local", started)
+            return {"role": local["role"], "path": "local", "trigger": local["trigger"]}
+        result = await self._allm_role(user_input)
+        self._record_path("llm", started)
+        return dict(result, path="llm", unsure=local["unsure"] if local else [])
+
+
+
         
 
 
 
 
 class VulnerabilityAssessor:
-    def __init__(self,openai_client):
+    def __init__(self,openai_client, async_client=None, fast_path=config.REQUEST_MATCHER_FAST_PATH):
         self.openai = openai_client
+        self.aopenai = async_client
         self.parser = JsonOutputParser()
         # Collect all unique information categories from all domains
         self.unique_values = set()
         for domain_data in config.INFO_CATEGORIES_CONTEXTUAL_INTEGRITY.values():
             self.unique_values.update(domain_data)
+        # Phrase matcher that resolves plain-word requests without an LLM call
+        self.request_matcher = RequestMatcher() if fast_path else None
 
-    def _extract_requests(self, user_input: str) -> List[str]:
-        prompt = f"""
+    def _requests_prompt(self, user_input: str) -> str:
+        return f"""
         Extract what information categories the user is explicitly requesting.
         Consider only these: {', '.join(sorted(self.unique_values))}.
         Return ONLY JSON: {{ "requested_info": [list] }}
         User input: "{user_input}"
         """
+
+    def _parse_requests(self, ai_text: str) -> List[str]:
+        parsed = self.parser.parse(ai_text)
+        requested_info = parsed.get("requested_info", [])
+        valid_requests = [req for req in requested_info if req in self.unique_values]
+        logger.info(f"Extracted requests: {valid_requests}")
+        return valid_requests
+
+    def _extract_requests(self, user_input: str) -> List[str]:
         try:
-            response = self.openai.chat.completions.create(
-                model=config.OPENAI_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0
-            )
-            ai_text = response.choices[0].message.content
-            parsed = self.parser.parse(ai_text)
-            requested_info = parsed.get("requested_info", [])
-            valid_requests = [req for req in requested_info if req in self.unique_values]
-            logger.info(f"Extracted requests: {valid_requests}")
-            return valid_requests
+            with span("extract_requests"):
+                response = self.openai.chat.completions.create(
+                    model=config.OPENAI_MODEL,
+                    messages=[{"role": "user", "content": self._requests_prompt(user_input)}],
+                    temperature=0
+                )
+                record_usage("extract_requests", response)
+                return self._parse_requests(response.choices[0].message.content)
+        except Exception as e:
+            logger.error(f"Error extracting requests: {e}")
+            return []
+
+    async def _aextract_requests(self, user_input: str) -> List[str]:
+        try:
+            with span("extract_requests"):
+                response = await self.aopenai.chat.completions.create(
+                    model=config.OPENAI_MODEL,
+                    messages=[{"role": "user", "content": self._requests_prompt(user_input)}],
+                    temperature=0
+                )
+                record_usage("extract_requests", response)
+                return self._parse_requests(response.choices[0].message.content)
         except Exception as e:
             logger.error(f"Error extracting requests: {e}")
             return []
 
+    def _match_locally(self, user_input: str, domain: str):
+        if self.request_matcher is None:
+            return None
+        local = self.request_matcher.match(user_input, domain)
+        local["requested_info"] = [req for req in local["requested_info"] if req in self.unique_values]
+        if local["confident"]:
+            logger.info(f"Extracted requests locally: {local['requested_info']}")
+        return local
+
+    def _with_extraction(self, result: Dict[str, Any], path: str, local) -> Dict[str, Any]:
+        result["extraction"] = {
+            "path": path,
+            "matches": local["matches"] if local else [],
+            "unsure": local["unsure"] if local else [],
+        }
+        return result
+
     def assess_vulnerability(self, user_input: str, domain: str) -> Dict[str, Any]:
-        requested_info = self._extract_requests(user_input)
+        local = self._match_locally(user_input, domain)
+        if local is not None and local["confident"]:
+            return self._with_extraction(self.classify_requests(local["requested_info"], domain), "local", local)
+        return self._with_extraction(self.classify_requests(self._extract_requests(user_input), domain), "llm", local)
+
+    async def aassess_vulnerability(self, user_input: str, domain: str) -> Dict[str, Any]:
+        local = self._match_locally(user_input, domain)
+        if local is not None and local["confident"]:
+            return self._with_extraction(self.classify_requests(local["requested_info"], domain), "local", local)
+        return self._with_extraction(self.classify_requests(await self._aextract_requests(user_input), domain), "llm", local)
+
+    def classify_requests(self, requested_info: List[str], domain: str) -> Dict[str, Any]:
+        """Split already-extracted requests into critical and normal items the persona holds."""
         if not requested_info:
             return {"requested_info": [], "domain": domain, "will_reveal_critical": [], "will_reveal_normal": []}
 
@@ -133,14 +277,102 @@ class VulnerabilityAssessor:
         }
 
 
+class ContextExtractor:
+    """
+    Fused extraction stage: one structured call returns both the claimed role and
+    the requested information categories, replacing the separate
+    extract_user_role and _extract_requests prompts.
+    """
+    def __init__(self, openai_client, unique_values, async_client=None):
+        self.openai = openai_client
+        self.aopenai = async_client
+        self.parser = JsonOutputParser()
+        self.unique_values = unique_values
+
+    def _prompt(self, user_input: str) -> str:
+        return f"""
+        Analyze the user input and extract two things.
+
+        1. role: the role or job title the user EXPLICITLY claims ("I am a...", "As a...", "I work as...", "I'm the...").
+           Extract the EXACT role mentioned, don't interpret or guess. Use an empty string if none is claimed.
+        2. requested_info: the information categories the user is explicitly requesting.
+           Consider only these: {', '.join(sorted(self.unique_values))}.
+
+        User input: "{user_input}"
+
+        Return ONLY JSON: {{"role": "extracted role or empty string", "requested_info": [list]}}
+        """
+
+    def _parse(self, ai_text: str, user_input: str) -> Dict[str, Any]:
+        parsed = self.parser.parse(ai_text)
+        role = (parsed.get("role") or "").strip()
+        requested_info = [req for req in parsed.get("requested_info", []) if req in self.unique_values]
+        logger.info(f"Extracted role: '{role}', requests: {requested_info} from input: '{user_input[:50]}...'")
+        return {"role": role, "requested_info": requested_info}
+
+    def _request(self, user_input: str) -> Dict[str, Any]:
+        return {
+            "model": config.OPENAI_MODEL,
+            "messages": [{"role": "user", "content": self._prompt(user_input)}],
+            "temperature": 0,
+            "response_format": {"type": "json_object"},
+        }
+
+    def extract(self, user_input: str) -> Dict[str, Any]:
+        try:
+            with span("extract_context"):
+                response = self.openai.chat.completions.create(**self._request(user_input))
+                record_usage("extract_context", response)
+                return self._parse(response.choices[0].message.content, user_input)
+        except Exception as e:
+            logger.error(f"Error extracting role and requests: {e}")
+            return {"role": "", "requested_info": []}
+
+    async def aextract(self, user_input: str) -> Dict[str, Any]:
+        try:
+            with span("extract_context"):
+                response = await self.aopenai.chat.completions.create(**self._request(user_input))
+                record_usage("extract_context", response)
+                return self._parse(response.choices[0].message.content, user_input)
+        except Exception as e:
+            logger.error(f"Error extracting role and requests: {e}")
+            return {"role": "", "requested_info": []}
+
+
+# Request-role result used when only normal info is requested
+NEUTRAL_REQUEST_ROLE = {
+    "predicted_score": 5,
+    "reasoning": "Only normal info requested, request-role integrity neutral.",
+    "source": "neutral"
+}
+
+
 class TrustCalculator:
-    def __init__(self,openai_client, data_folder="data"):
+    def __init__(self,openai_client, data_folder="data", executor=None, async_client=None, cache=None,
+                 few_shot_mode=config.FEW_SHOT_MODE, request_role_scorer=config.REQUEST_ROLE_SCORER):
         self.openai =openai_client
+        self.aopenai = async_client
         self.parser = JsonOutputParser()
         self.data_folder =  Path(data_folder)
-
-    def domain_role_integrity(self, domain, role):
-        prompt = f"""
+        # Labeled ratings, loaded once per process and grouped by domain
+        self.reference_data = get_reference_store(self.data_folder)
+        self.few_shot_mode = few_shot_mode
+        # Serialized kNN over the labeled ratings; only loaded in "local" mode
+        self.local_scorer = None
+        if request_role_scorer == "local":
+            self.local_scorer = load_or_train(config.LOCAL_SCORER_PATH, self.reference_data.records(), k=config.LOCAL_SCORER_K)
+        # Optional executor used to overlap the two independent integrity calls
+        self.executor = executor
+        # Optional IntegrityCache memoizing domain_role_integrity across sessions
+        self.cache = cache
+
+    def domain_role_prompt_version(self) -> str:
+        """Hash of the model and domain-role prompt template; cached scores are only valid for this version."""
+        template = config.OPENAI_MODEL + self._domain_role_prompt("{domain}", "{role}")
+        return hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+
+    def _domain_role_prompt(self, domain, role) -> str:
+        return f"""
             You are a highly specialized AI Security & Ethics Evaluator.
             Your task is to assess **Contextual Integrity** — that is, whether the claimed ROLE fits appropriately and realistically within the given DOMAIN context.
             Return ONLY valid JSON (no text outside JSON).
@@ -188,16 +420,56 @@ class TrustCalculator:
             "reasoning": "Explain clearly why this score was given, referring to domain-role compatibility."
             }}
                 """
-         
-        response = self.openai.chat.completions.create(
-            model=config.OPENAI_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0
-        )
-        parsed = self.parser.parse(response.choices[0].message.content)
+
+    def _parse_domain_role(self, ai_text: str, domain, role) -> Dict[str, Any]:
+        parsed = self.parser.parse(ai_text)
         score = float(parsed.get("integrity_score", 5))
         return {"integrity_score": score, "reasoning": parsed.get("reasoning", ""), "domain": domain, "assessed_role": role}
 
+    def _cached_domain_role(self, domain, role):
+        if self.cache is None:
+            return None
+        started = time.perf_counter()
+        cached = self.cache.get(domain, role)
+        if cached is None:
+            return None
+        record_span("domain_role_integrity", kind="cache", duration=time.perf_counter() - started, cache="hit")
+        return dict(cached, domain=domain, assessed_role=role, cache="hit")
+
+    def _store_domain_role(self, domain, role, result):
+        if self.cache is None:
+            return dict(result, cache="off")
+        self.cache.put(domain, role, result)
+        return dict(result, cache="miss")
+
+    def domain_role_integrity(self, domain, role):
+        cached = self._cached_domain_role(domain, role)
+        if cached is not None:
+            return cached
+        with span("domain_role_integrity", cache="miss" if self.cache is not None else "off"):
+            response = self.openai.chat.completions.create(
+                model=config.OPENAI_MODEL,
+                messages=[{"role": "user", "content": self._domain_role_prompt(domain, role)}],
+                temperature=0
+            )
+            record_usage("domain_role_integrity", response)
+            result = self._parse_domain_role(response.choices[0].message.content, domain, role)
+            return self._store_domain_role(domain, role, result)
+
+    async def adomain_role_integrity(self, domain, role):
+        cached = self._cached_domain_role(domain, role)
+        if cached is not None:
+            return cached
+        with span("domain_role_integrity", cache="miss" if self.cache is not None else "off"):
+            response = await self.aopenai.chat.completions.create(
+                model=config.OPENAI_MODEL,
+                messages=[{"role": "user", "content": self._domain_role_prompt(domain, role)}],
+                temperature=0
+            )
+            record_usage("domain_role_integrity", response)
+            result = self._parse_domain_role(response.choices[0].message.content, domain, role)
+            return self._store_domain_role(domain, role, result)
+
     def domain_request_integrity(self, domain: str, assess_result: Dict[str, Any]):
         requested_critical = assess_result.get("will_reveal_critical", [])
         requested_normal = assess_result.get("will_reveal_normal", [])
@@ -209,55 +481,146 @@ class TrustCalculator:
             return True
         return False
 
-    def request_role_integrity(self, role: str, request_phrase: str, domain: str) -> Dict[str, Any]:
-
-        csv_path = Path(self.data_folder) / "contextual_integrity.csv"
-        df = pd.read_csv(csv_path)
-   
-        domain_df = df[df["Domain"].str.lower() == domain.lower()]
-        examples_text = "\n".join(
-            [f"Role: {row['role']}\nRequest: {row['Request Phrase']}\nScore: {row['Contextual Integrity Rating (0–10)']}" for _, row in domain_df.head(12).iterrows()]
-        )
-        prompt = f"""
+    @staticmethod
+    def few_shot_query(request_phrase: str, user_input: str = None) -> str:
+        """Text the similar examples are searched with. The labeled requests are whole
+        utterances, so the caller's words are used when known, not the category key."""
+        return user_input or request_phrase
+
+    def few_shot_examples(self, role: str, request_phrase: str, domain: str, user_input: str = None) -> str:
+        if self.few_shot_mode == "similar":
+            query = self.few_shot_query(request_phrase, user_input)
+            return self.reference_data.similar_examples_block(domain, role, query, k=config.FEW_SHOT_K)
+        return self.reference_data.examples_block(domain)
+
+    def _request_role_prompt(self, role: str, request_phrase: str, domain: str, examples_text: str = None,
+                             user_input: str = None) -> str:
+        if examples_text is None:
+            examples_text = self.few_shot_examples(role, request_phrase, domain, user_input)
+        return f"""
         Predict contextual integrity (0-10) for role '{role}' requesting '{request_phrase}' in domain '{domain}'.
         Examples: {examples_text}
         Return JSON: {{ "predicted_score": <0-10>, "reasoning": "<text>" }}
         """
+
+    def _parse_request_role(self, ai_text: str) -> Dict[str, Any]:
+        parsed = self.parser.parse(ai_text)
+        score = float(parsed.get("predicted_score", 5))
+        reasoning = parsed.get("reasoning", "")
+        return {"predicted_score": score, "reasoning": reasoning}
+
+    def _local_request_role(self, role: str, request_text: str, domain: str):
+        """Local kNN answer, or None when the scorer is off or not confident enough."""
+        if self.local_scorer is None:
+            return None
+        # The labeled request phrases are whole utterances, so match on the caller's words when we have them
+        prediction = self.local_scorer.predict(role, request_text, domain)
+        if prediction["confidence"] < config.LOCAL_SCORER_MIN_CONFIDENCE:
+            logger.info(f"Local scorer unsure ({prediction['confidence']}), asking the LLM")
+            return None
+        similar = ", ".join(f"{n['role']} ({n['rating']:g})" for n in prediction["neighbors"][:3])
+        return {
+            "predicted_score": prediction["predicted_score"],
+            "reasoning": f"Local estimate from similar rated examples: {similar}",
+            "source": "local",
+            "confidence": prediction["confidence"],
+        }
+
+    def request_role_integrity(self, role: str, request_phrase: str, domain: str, user_input: str = None) -> Dict[str, Any]:
+        local = self._local_request_role(role, user_input or request_phrase, domain)
+        if local is not None:
+            return local
         try:
-            response = self.openai.chat.completions.create(
-                model=config.OPENAI_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.2
-            )
-            parsed = self.parser.parse(response.choices[0].message.content)
-            score = float(parsed.get("predicted_score", 5))
-            reasoning = parsed.get("reasoning", "")
-            return {"predicted_score": score, "reasoning": reasoning}
+            with span("request_role_integrity"):
+                response = self.openai.chat.completions.create(
+                    model=config.OPENAI_MODEL,
+                    messages=[{"role": "user", "content": self._request_role_prompt(
+                        role, request_phrase, domain, user_input=user_input)}],
+                    temperature=0.2
+                )
+                record_usage("request_role_integrity", response)
+                return dict(self._parse_request_role(response.choices[0].message.content), source="llm")
         except Exception as e:
             logger.error(f"Error assessing request-role integrity: {e}")
-            return {"predicted_score": 5, "reasoning": f"Error: {e}"}
+            return {"predicted_score": 5, "reasoning": f"Error: {e}", "source": "error"}
+
+    async def arequest_role_integrity(self, role: str, request_phrase: str, domain: str, user_input: str = None) -> Dict[str, Any]:
+        local = self._local_request_role(role, user_input or request_phrase, domain)
+        if local is not None:
+            return local
+        try:
+            with span("request_role_integrity"):
+                response = await self.aopenai.chat.completions.create(
+                    model=config.OPENAI_MODEL,
+                    messages=[{"role": "user", "content": self._request_role_prompt(
+                        role, request_phrase, domain, user_input=user_input)}],
+                    temperature=0.2
+                )
+                record_usage("request_role_integrity", response)
+                return dict(self._parse_request_role(response.choices[0].message.content), source="llm")
+        except Exception as e:
+            logger.error(f"Error assessing request-role integrity: {e}")
+            return {"predicted_score": 5, "reasoning": f"Error: {e}", "source": "error"}
 
     def total_integrity(self, domain: str, assess_result: Dict[str, Any], role: str, user_input: str) -> Dict[str, Any]:
         is_valid_request = self.domain_request_integrity(domain, assess_result)
         if not is_valid_request:
             return {"domain": domain, "total_integrity_score": 0, "integrity_level": "Very Low", "reasoning": "Request invalid for domain."}
 
-        domain_role_result = self.domain_role_integrity(domain, role)
-        domain_role_score = domain_role_result.get("integrity_score", 0)
-        domain_role_reason = domain_role_result.get("reasoning", "")
+        critical_requested = assess_result.get("will_reveal_critical", [])
+        normal_requested = assess_result.get("will_reveal_normal", [])
+        timings = {}
+
+        # Domain-role and request-role scoring don't depend on each other, so
+        # with an executor the domain-role call runs while request-role is scored here.
+        domain_role_future = None
+        if self.executor is not None and critical_requested:
+            domain_role_future = self.executor.submit(contextvars.copy_context().run, self._timed, self.domain_role_integrity, domain, role)
+        else:
+            domain_role_result, timings["domain_role_integrity"] = self._timed(self.domain_role_integrity, domain, role)
+
+        if critical_requested:
+            request_phrase = critical_requested[0]
+            request_role_result, timings["request_role_integrity"] = self._timed(
+                self.request_role_integrity, role, request_phrase, domain, user_input
+            )
+        else:
+            request_phrase = normal_requested[0] if normal_requested else None
+            request_role_result = NEUTRAL_REQUEST_ROLE
+
+        if domain_role_future is not None:
+            domain_role_result, timings["domain_role_integrity"] = domain_role_future.result()
+
+        return self._combine(domain, role, request_phrase, domain_role_result, request_role_result, timings)
+
+    async def atotal_integrity(self, domain: str, assess_result: Dict[str, Any], role: str, user_input: str) -> Dict[str, Any]:
+        """Async twin of total_integrity; both integrity calls are awaited together."""
+        is_valid_request = self.domain_request_integrity(domain, assess_result)
+        if not is_valid_request:
+            return {"domain": domain, "total_integrity_score": 0, "integrity_level": "Very Low", "reasoning": "Request invalid for domain."}
 
         critical_requested = assess_result.get("will_reveal_critical", [])
         normal_requested = assess_result.get("will_reveal_normal", [])
+        timings = {}
 
         if critical_requested:
             request_phrase = critical_requested[0]
-            request_role_result = self.request_role_integrity(role, request_phrase, domain)
-            request_role_score = request_role_result.get("predicted_score", 5)
-            request_role_reason = request_role_result.get("reasoning", "")
+            (domain_role_result, timings["domain_role_integrity"]), (request_role_result, timings["request_role_integrity"]) = await asyncio.gather(
+                self._atimed(self.adomain_role_integrity(domain, role)),
+                self._atimed(self.arequest_role_integrity(role, request_phrase, domain, user_input)),
+            )
         else:
+            domain_role_result, timings["domain_role_integrity"] = await self._atimed(self.adomain_role_integrity(domain, role))
             request_phrase = normal_requested[0] if normal_requested else None
-            request_role_score = 5
-            request_role_reason = "Only normal info requested, request-role integrity neutral."
+            request_role_result = NEUTRAL_REQUEST_ROLE
+
+        return self._combine(domain, role, request_phrase, domain_role_result, request_role_result, timings)
+
+    def _combine(self, domain, role, request_phrase, domain_role_result, request_role_result, timings) -> Dict[str, Any]:
+        domain_role_score = domain_role_result.get("integrity_score", 0)
+        domain_role_reason = domain_role_result.get("reasoning", "")
+        request_role_score = request_role_result.get("predicted_score", 5)
+        request_role_reason = request_role_result.get("reasoning", "")
 
         total_score = round((0.3 * domain_role_score) + (0.7 * request_role_score), 2)
 
@@ -266,9 +629,24 @@ class TrustCalculator:
             "role": role,
             "requested_info": request_phrase,
             "total_integrity_score": total_score,
-            "reasoning": f"Domain-role: {domain_role_reason}\nRole-request: {request_role_reason}\nFinal:({total_score}/10)"
+            "reasoning": f"Domain-role: {domain_role_reason}\nRole-request: {request_role_reason}\nFinal:({total_score}/10)",
+            "timings": timings,
+            "domain_role_cache": domain_role_result.get("cache", "off"),
+            "request_role_source": request_role_result.get("source", "llm")
         }
 
+    @staticmethod
+    def _timed(func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        return result, round(time.perf_counter() - start, 4)
+
+    @staticmethod
+    async def _atimed(coro):
+        start = time.perf_counter()
+        result = await coro
+        return result, round(time.perf_counter() - start, 4)
+
     
 
 
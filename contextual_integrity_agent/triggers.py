@@ -0,0 +1,119 @@
+import os
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pandas as pd
+import config
+from matcher import KeywordAutomaton
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PHRASE_COLUMN = "Specific trigger words"
+REACTION_COLUMN = "victim reactions to these trigger words"
+SCORE_COLUMN = "score (1-10)"
+KEYWORD_COLUMN = "Keywords"
+
+
+def _clean(value) -> str:
+    return str(value).strip().strip('"“”').strip() if pd.notna(value) else ""
+
+
+def load_trigger_words(paths: List[str]) -> List[Dict[str, Any]]:
+    """
+    One entry per keyword across all trigger-word files (the first file that
+    lists a keyword wins). The score is the mean over that file's rows for the
+    keyword, and the rows' full trigger phrases are kept so verbatim uses of
+    them are caught even when the keyword itself is split up.
+    """
+    entries: Dict[str, Dict[str, Any]] = {}
+    for path in paths:
+        try:
+            if Path(path).suffix.lower() in (".xlsx", ".xls"):
+                df = pd.read_excel(path)
+            else:
+                df = pd.read_csv(path)
+        except Exception as e:
+            logger.error(f"Error loading trigger words from {path}: {e}")
+            continue
+
+        rows: Dict[str, List] = {}
+        for _, row in df.iterrows():
+            keyword = _clean(row.get(KEYWORD_COLUMN))
+            score = pd.to_numeric(row.get(SCORE_COLUMN), errors="coerce")
+            if keyword and not pd.isna(score):
+                rows.setdefault(keyword.lower(), []).append((keyword, float(score), row))
+
+        for key, group in rows.items():
+            if key in entries:
+                continue
+            phrases = [_clean(row.get(PHRASE_COLUMN)).strip(" .,!?…") for _, _, row in group]
+            entries[key] = {
+                "keyword": group[0][0],
+                "score": round(sum(score for _, score, _ in group) / len(group), 2),
+                "trigger_phrases": [phrase for phrase in dict.fromkeys(phrases) if phrase],
+                "victim_reaction": _clean(group[0][2].get(REACTION_COLUMN)),
+                "source": Path(path).name,
+            }
+    return list(entries.values())
+
+
+class TriggerWordEngine:
+    """
+    Social-engineering trigger keywords and phrases (urgency, scarcity,
+    pressure...) compiled into one automaton, so an utterance of any length is scored in a single
+    linear pass without an LLM call.
+
+    The pressure score adds up the scores of the distinct keywords found and
+    maps TRIGGER_PRESSURE_SATURATION points or more to 10.
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]], saturation: float = None):
+        self.entries = entries
+        self.saturation = saturation or config.TRIGGER_PRESSURE_SATURATION
+        self.automaton = KeywordAutomaton(
+            (pattern, entry) for entry in entries for pattern in [entry["keyword"]] + entry["trigger_phrases"]
+        )
+
+    def detect(self, text: str) -> Dict[str, Any]:
+        found: Dict[str, Dict[str, Any]] = {}
+        for start, end, entry in self.automaton.find(text):
+            hit = found.get(entry["keyword"])
+            if hit is None:
+                found[entry["keyword"]] = {
+                    "keyword": entry["keyword"],
+                    "text": text[start:end],
+                    "start": start,
+                    "end": end,
+                    "count": 1,
+                    "score": entry["score"],
+                    "victim_reaction": entry["victim_reaction"],
+                }
+            else:
+                hit["count"] += 1
+
+        detected = sorted(found.values(), key=lambda hit: hit["start"])
+        total = sum(hit["score"] for hit in detected)
+        return {
+            "detected_triggers": detected,
+            "pressure_score": round(min(10.0, 10 * total / self.saturation), 1),
+        }
+
+
+_engines: Dict[tuple, TriggerWordEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_trigger_engine(paths: List[str] = None) -> TriggerWordEngine:
+    """One engine per set of trigger-word files per process."""
+    paths = paths or config.TRIGGER_WORD_FILES
+    key = tuple(os.path.abspath(path) for path in paths)
+    with _engines_lock:
+        if key not in _engines:
+            entries = load_trigger_words(paths)
+            logger.info(f"Compiled {len(entries)} trigger keywords from {len(paths)} files")
+            _engines[key] = TriggerWordEngine(entries)
+        return _engines[key]
@@ -0,0 +1,149 @@
+import os
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import config
+from streaming import SentenceChunker
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class TTSCache:
+    """
+    Synthesized speech on disk, one MP3 per sha256 of (model, voice, text),
+    shared by every session in the process and surviving restarts. Reads
+    refresh a clip's mtime; once the directory grows past max_bytes the
+    least recently used clips are deleted.
+    """
+
+    def __init__(self, directory, max_bytes: int = None):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes or config.TTS_CACHE_MAX_BYTES
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._size = sum(path.stat().st_size for path in self.directory.glob("*.mp3"))
+
+    @staticmethod
+    def key(model: str, voice: str, text: str) -> str:
+        return hashlib.sha256("\0".join((model, voice, text)).encode("utf-8")).hexdigest()
+
+    def _path(self, model: str, voice: str, text: str) -> Path:
+        return self.directory / f"{self.key(model, voice, text)}.mp3"
+
+    def has(self, model: str, voice: str, text: str) -> bool:
+        return self._path(model, voice, text).exists()
+
+    def get(self, model: str, voice: str, text: str) -> Optional[bytes]:
+        path = self._path(model, voice, text)
+        try:
+            audio = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return audio
+
+    def put(self, model: str, voice: str, text: str, audio: bytes) -> None:
+        path = self._path(model, voice, text)
+        # Unique temp name: several sessions may render the same text at once
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp.write_bytes(audio)
+        with self._lock:
+            existed = path.exists()
+            old_size = path.stat().st_size if existed else 0
+            os.replace(tmp, path)
+            self._size += len(audio) - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used clips until the cache is back under 90% of max_bytes."""
+        clips = sorted(self.directory.glob("*.mp3"), key=lambda p: p.stat().st_mtime)
+        for path in clips:
+            if self._size <= self.max_bytes * 0.9:
+                break
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                self._size -= size
+            except FileNotFoundError:
+                continue
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "bytes": self._size}
+
+
+_caches: Dict[str, TTSCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_tts_cache(directory=None) -> Optional[TTSCache]:
+    """One cache per directory per process; None when config.TTS_CACHE_DIR is unset."""
+    directory = directory or config.TTS_CACHE_DIR
+    if not directory:
+        return None
+    key = os.path.abspath(directory)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = TTSCache(key)
+        return _caches[key]
+
+
+def synthesize(client, text: str, model: str = None, voice: str = None) -> bytes:
+    """MP3 for text from the cache, or from the speech API (and then cached). Raises on API errors."""
+    model = model or config.TTS_MODEL
+    voice = voice or config.TTS_VOICE
+    cache = get_tts_cache()
+    if cache is not None:
+        audio = cache.get(model, voice, text)
+        if audio is not None:
+            return audio
+    audio = client.audio.speech.create(model=model, voice=voice, input=text).content
+    if cache is not None:
+        cache.put(model, voice, text, audio)
+    return audio
+
+
+def prewarm_texts(replies: Iterable[str]) -> List[str]:
+    """Each reply plus the sentence chunks it is spoken in when streamed, without duplicates."""
+    texts = []
+    for reply in replies:
+        chunker = SentenceChunker()
+        texts += [reply] + chunker.feed(reply) + [chunker.flush()]
+    return list(dict.fromkeys(text for text in texts if text))
+
+
+def prewarm(client, replies: Iterable[str]) -> threading.Thread:
+    """Render the missing clips for these replies on a daemon thread."""
+    texts = prewarm_texts(replies)
+
+    def run():
+        cache = get_tts_cache()
+        if cache is None:
+            return
+        rendered = 0
+        for text in texts:
+            if cache.has(config.TTS_MODEL, config.TTS_VOICE, text):
+                continue
+            try:
+                synthesize(client, text)
+                rendered += 1
+            except Exception as e:
+                logger.error(f"Error pre-rendering speech, stopping: {e}")
+                return
+        logger.info(f"TTS cache warm: {len(texts)} clips, {rendered} newly rendered")
+
+    thread = threading.Thread(target=run, daemon=True, name="tts-prewarm")
+    thread.start()
+    return thread
@@ -0,0 +1,103 @@
+"""
+Typed per-turn result record.
+
+An AgentState is the pipeline's working dict: it carries the analysis log,
+nested assessments and the conversation history. A TurnRecord holds only the
+fields read after the turn (UI banner, live metrics, feedback prompts,
+results store, batch output), as plain attributes with a fixed schema.
+
+Records serialize to one JSON object per line with the fields in schema
+order; from_json() ignores unknown keys and fills missing ones with their
+defaults, so files written by older or newer versions still load.
+"""
+import json
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+@dataclass(slots=True)
+class TurnRecord:
+    domain: str = ""
+    user_input: str = ""
+    agent_response: str = ""
+    user_role: str = ""
+    trust_score: float = 0.0
+    requested_info: List[str] = field(default_factory=list)
+    info_to_reveal: List[str] = field(default_factory=list)
+    # Keywords of the detected triggers, one per hit
+    triggers: List[str] = field(default_factory=list)
+    pressure_score: float = 0.0
+    # Analysis log lines flagged as a breach
+    mistakes: int = 0
+    turn_seconds: Optional[float] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "TurnRecord":
+        """The record of a finished AgentState."""
+        usage = state.get("token_usage", {}).values()
+        return cls(
+            domain=state.get("domain", "") or "",
+            user_input=state.get("user_input", "") or "",
+            agent_response=state.get("agent_response", "") or "",
+            user_role=state.get("user_role", "") or "",
+            trust_score=float(state.get("trust_score", 0) or 0),
+            requested_info=list(state.get("requested_info", [])),
+            info_to_reveal=list(state.get("info_to_reveal", [])),
+            triggers=[hit.get("keyword") or "" for hit in state.get("detected_triggers", [])],
+            pressure_score=float(state.get("pressure_score", 0) or 0),
+            mistakes=sum(1 for log in state.get("analysis_log", []) if "BREACH" in log),
+            turn_seconds=state.get("stage_timings", {}).get("turn"),
+            prompt_tokens=sum(entry.get("prompt_tokens", 0) for entry in usage),
+            completion_tokens=sum(entry.get("completion_tokens", 0) for entry in usage),
+        )
+
+    @property
+    def success(self) -> bool:
+        """A successful attack: high integrity and something was revealed."""
+        return self.trust_score > 5 and bool(self.info_to_reveal)
+
+    def summary(self) -> str:
+        """One-line analysis summary for the UI."""
+        return (
+            f"Domain: {self.domain} | "
+            f"User Role: {self.user_role or 'None'} | "
+            f"Integrity Score: {self.trust_score}/10 | "
+            f"Requested Info: {', '.join(self.requested_info) or 'None'} | "
+            f"Will Reveal: {', '.join(self.info_to_reveal) or 'None'}"
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in FIELD_NAMES}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TurnRecord":
+        return cls(**{name: data[name] for name in FIELD_NAMES if name in data})
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, line: str) -> "TurnRecord":
+        return cls.from_dict(json.loads(line))
+
+
+FIELD_NAMES = tuple(f.name for f in fields(TurnRecord))
+
+
+def dump_jsonl(records: Iterable[TurnRecord], file) -> int:
+    """Write records to an open text file, one per line; returns the count."""
+    count = 0
+    for record in records:
+        file.write(record.to_json() + "\n")
+        count += 1
+    return count
+
+
+def load_jsonl(path) -> Iterator[TurnRecord]:
+    """Read records back from a JSONL file, skipping blank lines."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield TurnRecord.from_json(line)
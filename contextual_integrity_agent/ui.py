@@ -1,15 +1,28 @@
 import streamlit as st 
 import pandas as pd
 import random
-from openai import OpenAI
 from dotenv import load_dotenv
 import os
 import sys
 import asyncio
-from agent4 import VoiceFishingAgent  # Changed from agent3 to agent4
+from clients import get_agent, get_client
 import config
 import base64
 import hashlib
+import json
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import streamlit.components.v1 as components
+from streaming import SentenceChunker, SpeechQueue
+import tts_cache
+import audio_prep
+from audio_store import AudioStore
+from conversation_store import ConversationStore, RecentSet
+from feedback_agent import MetricsAccumulator
+from results_store import get_results_sink
+from turn_record import TurnRecord
 
 
 st.set_page_config(page_title="🎯 Voice Phishing Training Agent", page_icon="🎯")
@@ -22,35 +35,105 @@ if not api_key:
     st.warning("Please enter your OpenAI API key to start.")
     st.stop()
 
-client = OpenAI(api_key=api_key)
+# Shared by every session and rerun using this key, so connections are reused
+client = get_client(api_key)
 st.session_state.llm = client
 st.session_state.openai_client = client
 
 
+# Per-turn upload size and transcription latency, newest last
+if 'audio_stats' not in st.session_state:
+    st.session_state.audio_stats = deque(maxlen=100)
+
 def transcribe_audio(audio_file):
     try:
+        upload, stats = audio_file, {"codec": "raw", "input_bytes": audio_file.size, "output_bytes": audio_file.size}
+        if st.session_state.get("preprocess_audio", config.AUDIO_PREPROCESS):
+            data, name, stats = audio_prep.preprocess(audio_file.getvalue())
+            if stats["output_seconds"] == 0:
+                st.warning("No speech detected in the recording. Please try again.")
+                return None
+            upload = (name, data)
+        start = time.perf_counter()
         transcript = client.audio.transcriptions.create(
             model="whisper-1",
-            file=audio_file,
+            file=upload,
             language="en"
         )
+        stats["transcribe_ms"] = round(1000 * (time.perf_counter() - start), 1)
+        # Modelled from the clip's own sizes, not measured (see audio_prep.estimated_raw_ms)
+        stats["estimated_raw_ms"] = audio_prep.estimated_raw_ms(stats)
+        st.session_state.audio_stats.append(stats)
         return transcript.text
+    except audio_prep.AudioTooLarge as e:
+        st.error(f"Recording rejected: {e}")
+        return None
     except Exception as e:
         st.error(f"Error transcribing audio: {str(e)}")
         return None
     
+def synthesize_speech(text):
+    """TTS (through the on-disk clip cache) without any st.* calls, so it can run on worker threads"""
+    return tts_cache.synthesize(client, text)
+
 def text_to_speech(text):
     try:
-        response = client.audio.speech.create(
-            model="tts-1",
-            voice="alloy",
-            input=text
-        )
-        return response.content
+        return synthesize_speech(text)
     except Exception as e:
         st.error(f"Error generating speech: {str(e)}")
         return None
 
+@st.cache_resource
+def tts_executor():
+    """Threads shared by all sessions for synthesizing streamed sentences"""
+    return ThreadPoolExecutor(max_workers=config.TTS_WORKERS, thread_name_prefix="tts")
+
+# Plays clips in order on the parent page, so playback survives the component iframes.
+# Created with the parent's Function so its callbacks don't belong to an iframe.
+TTS_PLAYER_JS = """
+if (q.playing || !(q.next in q.clips)) return;
+q.playing = true;
+const audio = q.audio = new Audio(q.clips[q.next]);
+delete q.clips[q.next];
+q.next += 1;
+const done = () => { q.playing = false; window.__ttsPlay(q); };
+audio.onended = done;
+audio.onerror = done;
+audio.play().catch(done);
+"""
+
+def play_clips(clips, turn_id, first_index):
+    """Queue MP3 clips for gapless in-order playback; clip numbers are per turn"""
+    if not clips:
+        return
+    sources = ["data:audio/mp3;base64," + base64.b64encode(clip).decode() for clip in clips]
+    components.html(f"""
+    <script>
+    const w = window.parent;
+    w.__ttsPlay = w.__ttsPlay || new w.Function("q", {json.dumps(TTS_PLAYER_JS)});
+    let q = w.__ttsQueue;
+    if (!q || q.turn !== {json.dumps(turn_id)}) {{
+        if (q && q.audio) q.audio.pause();
+        q = w.__ttsQueue = {{turn: {json.dumps(turn_id)}, next: 0, clips: {{}}, playing: false}};
+    }}
+    {json.dumps(sources)}.forEach((src, i) => {{ q.clips[{first_index} + i] = src; }});
+    w.__ttsPlay(q);
+    </script>
+    """, height=0)
+
+def audio_report(stats):
+    """One line on what preprocessing saved for a turn: measured bytes, audio
+    length and transcription time, plus the estimated time saving"""
+    saved = stats["input_bytes"] - stats["output_bytes"]
+    line = (f"🎙️ Upload {stats['input_bytes'] / 1024:.0f} KB → {stats['output_bytes'] / 1024:.0f} KB "
+            f"({saved / max(1, stats['input_bytes']):.0%} saved, {stats['codec']})")
+    if stats.get("input_seconds") is not None:
+        line += f" | audio {stats['input_seconds']} s → {stats['output_seconds']} s | prep {stats['prep_ms']} ms"
+    line += f" | transcription {stats['transcribe_ms']:.0f} ms"
+    if stats.get("estimated_raw_ms") is not None:
+        line += f" | estimated saving ≈{stats['estimated_raw_ms'] - stats['transcribe_ms']:.0f} ms (modelled, not measured)"
+    return line
+
 def get_audio_hash(audio_data):
     """Generate a hash of the audio content to uniquely identify it"""
     if audio_data is None:
@@ -64,20 +147,46 @@ def get_audio_hash(audio_data):
     return hashlib.md5(content).hexdigest()
 
 
-# Session state for each domain
+# Session state for each domain: a bounded message window (older turns spill to disk)
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 for domain in ["banking", "law", "government", "telecom"]:
     if f"{domain}_messages" not in st.session_state:
-        st.session_state[f"{domain}_messages"] = []
+        st.session_state[f"{domain}_messages"] = ConversationStore(f"{st.session_state.session_id}:{domain}")
     if f"{domain}_processed_audio_hashes" not in st.session_state:
-        st.session_state[f"{domain}_processed_audio_hashes"] = set()
+        st.session_state[f"{domain}_processed_audio_hashes"] = RecentSet(config.PROCESSED_AUDIO_HASHES_MAX)
+    if f"{domain}_older_pages" not in st.session_state:
+        st.session_state[f"{domain}_older_pages"] = 0
+
+# One agent per API key for the whole process; it keeps no per-conversation state
+st.session_state.agent = get_agent(api_key, data_folder="data")
 
-if 'agent' not in st.session_state:
-    st.session_state.agent = VoiceFishingAgent(client,data_folder="data")
+@st.cache_resource
+def prewarm_tts(_client, _replies):
+    """Once per process: render the personas' canned replies into the TTS cache in the background"""
+    return tts_cache.prewarm(_client, _replies)
+
+if config.TTS_PREWARM:
+    prewarm_tts(client, st.session_state.agent.canned_replies())
+
+# Reply audio of the latest turns, served to st.audio by id
+if 'audio_store' not in st.session_state:
+    st.session_state.audio_store = AudioStore()
+
+# Per-turn TurnRecords read by the feedback page
+if 'results' not in st.session_state:
+    st.session_state.results = []
+# Feedback metrics updated per turn, so the scores are live without rescanning the results
+if 'metrics_accumulator' not in st.session_state:
+    st.session_state.metrics_accumulator = MetricsAccumulator.from_results(st.session_state.results)
 
 # Initialize analysis display toggle
 if 'show_analysis' not in st.session_state:
     st.session_state.show_analysis = False
 
+if 'streaming_replies' not in st.session_state:
+    st.session_state.streaming_replies = config.STREAMING_REPLIES
+
 st.title("🎯 Voice Phishing Training Agent - Contextual Integrity")
 
 # Sidebar for analysis toggle
@@ -88,6 +197,16 @@ with st.sidebar:
         value=st.session_state.show_analysis,
         help="Display contextual integrity analysis for each interaction"
     )
+    st.session_state.preprocess_audio = st.checkbox(
+        "Preprocess Recordings",
+        value=st.session_state.get("preprocess_audio", config.AUDIO_PREPROCESS),
+        help="Trim silence, downmix and resample to 16 kHz before sending audio to Whisper"
+    )
+    st.session_state.streaming_replies = st.checkbox(
+        "Stream Replies",
+        value=st.session_state.streaming_replies,
+        help="Show the reply as it is generated and speak it sentence by sentence"
+    )
     
     st.markdown("---")
     st.markdown("""
@@ -101,6 +220,73 @@ with st.sidebar:
     st.markdown("---")
     st.markdown("**Tip:** Try claiming different roles and see how the agent responds!")
 
+    st.markdown("---")
+    # Filled in after the tabs so it includes this run's turn
+    live_metrics_slot = st.empty()
+
+
+def stream_agent_reply(user_input, domain_key, conversation_history, turn_id):
+    """
+    Run the agent with its reply streamed into an assistant bubble. Each
+    finished sentence goes to TTS straight away and plays as soon as it and
+    the sentences before it are ready. Returns (agent_result, full audio).
+    """
+    chunker = SentenceChunker()
+    speech = SpeechQueue(synthesize_speech, tts_executor())
+    parts = []
+    played = 0
+
+    def play_ready(wait=False):
+        nonlocal played
+        clips = speech.ready(wait=wait)
+        play_clips(clips, turn_id, played)
+        played += len(clips)
+
+    with st.chat_message("assistant", avatar='🤖'):
+        text_slot = st.empty()
+
+        def on_delta(delta):
+            parts.append(delta)
+            text_slot.markdown("".join(parts) + "▌")
+            for sentence in chunker.feed(delta):
+                speech.add(sentence)
+            play_ready()
+
+        agent_result = st.session_state.agent.process(
+            user_input,
+            domain_key.capitalize(),  # "banking" -> "Banking"
+            conversation_history,
+            on_delta=on_delta
+        )
+        rest = chunker.flush()
+        if rest:
+            speech.add(rest)
+        play_ready(wait=True)
+        text_slot.markdown(agent_result["agent_response"])
+
+        audio_content = speech.audio()
+        if audio_content:
+            # Replay control for the whole reply; the segments above already autoplayed
+            st.audio(audio_content, format="audio/mp3")
+    return agent_result, audio_content
+
+
+def render_message(message):
+    if message["role"] == "user":
+        with st.chat_message("user", avatar='👤'):
+            st.markdown(message["content"])
+    elif message["role"] == "assistant":
+        with st.chat_message("assistant", avatar='🤖'):
+            st.markdown(message["content"])
+            # Older turns' clips are evicted from the store and shown as text only
+            clip = st.session_state.audio_store.get(message.get("audio_id"))
+            if clip:
+                st.audio(clip, format="audio/mp3")
+    elif message["role"] == "analysis" and st.session_state.show_analysis:
+        with st.expander("🔍 Analysis Details", expanded=False):
+            for log_entry in message["content"]:
+                st.write(log_entry)
+
 
 # Function to handle chat in each domain
 def domain_chat(domain_key: str, domain_name: str, role_text: str):
@@ -112,18 +298,17 @@ def domain_chat(domain_key: str, domain_name: str, role_text: str):
 
     messages = st.session_state[f"{domain_key}_messages"]
 
-    # Display conversation for this domain only
-    for message in messages:
-        if message["role"] == "user":
-            with st.chat_message("user", avatar='👤'):
-                st.markdown(message["content"])
-        elif message["role"] == "assistant":
-            with st.chat_message("assistant", avatar='🤖'):
-                st.markdown(message["content"])
-        elif message["role"] == "analysis" and st.session_state.show_analysis:
-            with st.expander("🔍 Analysis Details", expanded=False):
-                for log_entry in message["content"]:
-                    st.write(log_entry)
+    # Display conversation for this domain only; spilled turns are read back a page at a time on request
+    pages = st.session_state[f"{domain_key}_older_pages"]
+    hidden = messages.spilled - pages * config.CONVERSATION_PAGE_SIZE
+    if hidden > 0 and st.button(f"⬆️ Show earlier messages ({hidden} more)", key=f"older_{domain_key}"):
+        st.session_state[f"{domain_key}_older_pages"] += 1
+        st.rerun()
+    if pages:
+        for message in messages.older(pages):
+            render_message(message)
+    for message in messages.recent():
+        render_message(message)
 
     # Process audio input if it exists and hasn't been processed before
     if audio_input is not None:
@@ -142,26 +327,44 @@ def domain_chat(domain_key: str, domain_name: str, role_text: str):
                 messages.append({"role": "user", "content": transcribed_text})
                 with st.chat_message("user", avatar='👤'):
                     st.markdown(transcribed_text)
+                    if st.session_state.show_analysis and st.session_state.audio_stats:
+                        st.caption(audio_report(st.session_state.audio_stats[-1]))
 
                 # Process with contextual integrity agent
+                reply_shown = False
                 with st.spinner("Analyzing contextual integrity..."):
                     try:
-                        # Get conversation history for this domain
-                        conversation_history = [
-                            {"role": msg["role"], "content": msg["content"]} 
-                            for msg in messages 
-                            if msg["role"] in ["user", "assistant"]
-                        ]
+                        # Get conversation history for this domain, newest turns within the token budget
+                        conversation_history = messages.history()
                         
-                        # Process with agent - capitalize domain to match config
-                        agent_result = st.session_state.agent.process(
-                            transcribed_text, 
-                            domain_key.capitalize(),  # "banking" -> "Banking"
-                            conversation_history[:-1]  # Exclude current message
-                        )
+                        if st.session_state.streaming_replies:
+                            # Reply text and speech are shown while the reply is generated
+                            agent_result, audio_content = stream_agent_reply(
+                                transcribed_text,
+                                domain_key,
+                                conversation_history[:-1],  # Exclude current message
+                                f"{domain_key}-{len(messages)}"
+                            )
+                            reply_shown = True
+                        else:
+                            # Process with agent - capitalize domain to match config
+                            agent_result = st.session_state.agent.process(
+                                transcribed_text, 
+                                domain_key.capitalize(),  # "banking" -> "Banking"
+                                conversation_history[:-1]  # Exclude current message
+                            )
                         
+                        # Only the typed record is kept; the full state (logs, history) is dropped after this turn
+                        record = TurnRecord.from_state(agent_result)
+                        st.session_state.results.append(record)
+                        st.session_state.metrics_accumulator.add(record)
+                        # Queued for the cross-session analytics store; written in the background
+                        results_sink = get_results_sink()
+                        if results_sink is not None:
+                            results_sink.add(record, st.session_state.session_id, len(st.session_state.results))
+
                         # Get agent response
-                        result = agent_result["agent_response"]
+                        result = record.agent_response
                         
                         # Add analysis to messages if show_analysis is enabled
                         if st.session_state.show_analysis:
@@ -171,34 +374,15 @@ def domain_chat(domain_key: str, domain_name: str, role_text: str):
                             })
                         
                         # Display analysis summary in real-time
-                        analysis_summary = st.session_state.agent.get_analysis_summary(agent_result)
-
-                        # Split the summary into key-value pairs
-                        parts = [part.strip() for part in analysis_summary.split('|')]
-
-                        # Convert to dictionary
-                        data = {}
-                        for part in parts:
-                            if ':' in part:
-                                key, value = part.split(':', 1)
-                                data[key.strip()] = value.strip()
-
-                        # Select only the fields you want
-                        filtered_summary = (
-                            f"Domain: {data.get('Domain', 'N/A')} | "
-                            f"User Role: {data.get('User Role', 'N/A')} | "
-                            f"Integrity Score: {data.get('Integrity Score', 'N/A')} | "
-                            f"Requested Info: {data.get('Requested Info', 'N/A')} | "
-                            f"Will Reveal: {data.get('Will Reveal', 'N/A')}"
-                        )
+                        filtered_summary = record.summary()
 
                         # Color code based on integrity score and info revealed
-                        # Using trust_score from agent_result (which comes from total_integrity_score)
-                        trust_score = agent_result.get("trust_score", 0)
-                        info_to_reveal = agent_result.get("info_to_reveal", [])
+                        # Using trust_score from the record (which comes from total_integrity_score)
+                        trust_score = record.trust_score
+                        info_to_reveal = record.info_to_reveal
                         
                         # Success = High integrity (>5) AND info was revealed
-                        if trust_score > 5 and len(info_to_reveal) > 0:
+                        if record.success:
                             st.success(f"🎯 SUCCESSFUL ATTACK (Integrity: {trust_score}/10): {filtered_summary}")
                         elif trust_score > 5 and len(info_to_reveal) == 0:
                             st.info(f"ℹ️ HIGH INTEGRITY BUT NO INFO REQUESTED: {filtered_summary}")
@@ -213,23 +397,25 @@ def domain_chat(domain_key: str, domain_name: str, role_text: str):
                         st.error(traceback.format_exc())
                         result = "I'm sorry, I'm having technical difficulties. Could you repeat that?"
 
+                if reply_shown:
+                    # Add assistant message
+                    messages.append({"role": "assistant", "content": result,
+                                     "audio_id": st.session_state.audio_store.put(audio_content)})
+                    return
+
                 # Generate audio response
                 audio_content = text_to_speech(result)
 
                 # Add assistant message
-                messages.append({"role": "assistant", "content": result})
+                messages.append({"role": "assistant", "content": result,
+                                 "audio_id": st.session_state.audio_store.put(audio_content)})
 
                 with st.chat_message("assistant", avatar='🤖'):
                     st.markdown(result)
                     
                     if audio_content:
-                        b64 = base64.b64encode(audio_content).decode()
-                        html = f"""
-                        <audio controls autoplay style="width: 100%;">
-                            <source src="data:audio/mp3;base64,{b64}" type="audio/mp3">
-                        </audio>
-                        """
-                        st.markdown(html, unsafe_allow_html=True)
+                        # Served from Streamlit's media store by URL rather than inlined into the page
+                        st.audio(audio_content, format="audio/mp3", autoplay=True)
 
 
 # Create tabs and handle them individually
@@ -279,4 +465,15 @@ with tab4:
     
     example : ["name", "location", "job", "organization", "billing_address", "phone", "email", "sim_number", "otp", "puk_code", "id_number", 'password]
    
-    """)
\ No newline at end of file
+    """)
+
+
+# Live session metrics, same numbers as the feedback page
+accumulator = st.session_state.metrics_accumulator
+if accumulator.turns:
+    live_metrics = accumulator.metrics()
+    with live_metrics_slot.container():
+        st.markdown("**Session so far**")
+        st.metric("Performance Score", f"{accumulator.score()}/10")
+        st.caption(f"{accumulator.turns} turns | triggers {live_metrics['trigger_count']} | "
+                   f"info obtained {live_metrics['info_revealed']} | mistakes {live_metrics['mistakes']}")